@@ -91,6 +91,34 @@ def client():
     return Client()
 
 
+@pytest.fixture
+def locmem_cache(settings):
+    """ذاكرة مؤقتة حقيقية (بدلاً من DummyCache) للاختبارات التي تعتمد على التخزين"""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'naebak-messaging-tests',
+        }
+    }
+    from django.core.cache import cache
+    from messages.integrations import shared_cache
+    cache.clear()
+    shared_cache.local.clear()
+    shared_cache.reset_stats()
+    yield cache
+    cache.clear()
+    shared_cache.local.clear()
+
+
+@pytest.fixture
+def fake_redis(mocker):
+    """خادم Redis في الذاكرة بدلاً من الاتصال الفعلي خلف django-redis"""
+    import fakeredis
+    server = fakeredis.FakeRedis()
+    mocker.patch('django_redis.get_redis_connection', return_value=server)
+    return server
+
+
 @pytest.fixture
 def user():
     """مستخدم عادي للاختبار"""
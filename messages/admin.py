@@ -2,16 +2,68 @@
 إعدادات لوحة الإدارة لخدمة الرسائل - منصة نائبك.كوم
 """
 
+from django.conf import settings
 from django.contrib import admin
+from django.forms.models import BaseInlineFormSet
 from django.utils.html import format_html
+from django.utils import timezone
 from django.urls import reverse
 from django.utils.safestring import mark_safe
+from . import bulk_actions
+from .pagination import EstimatedCountPaginator
 from .models import (
     UserProfile, Conversation, Message, MessageReport,
-    MessageStatistics, SystemNotification
+    MessageStatistics, SystemNotification, NotificationBroadcast, OutboxEvent,
+    NotificationDelivery, ConversationArchive, SpamCluster, ReportAggregate, AdminBulkJob
 )
 
 
+class BulkActionMixin:
+    """تنفيذ الإجراءات الجماعية مباشرة للاختيارات الصغيرة وكمهمة خلفية للكبيرة"""
+    
+    def run_bulk_action(self, request, queryset, action, done_message):
+        threshold = getattr(settings, 'ADMIN_BULK_ACTION_THRESHOLD', 1000)
+        ids = list(queryset.values_list('pk', flat=True)[:threshold + 1])
+        if len(ids) <= threshold:
+            updated = bulk_actions.apply(action, ids, request.user)
+            self.message_user(request, done_message.format(updated))
+            return
+        
+        job = bulk_actions.start(action, queryset, request.user)
+        url = reverse('admin:naebak_messages_adminbulkjob_change', args=[job.pk])
+        self.message_user(request, format_html(
+            'يجري تنفيذ الإجراء على {} صف في الخلفية، <a href="{}">متابعة التقدم</a>', job.total_count, url
+        ))
+
+
+class SenderTypeFilter(admin.SimpleListFilter):
+    """
+    تصفية حسب نوع المرسل بخيارات ثابتة، دون استعلام القيم المتاحة أو ربط
+    ملفات المستخدمين بالجدول الكبير (استعلام فرعي على فهرس user_type)
+    """
+    
+    title = 'نوع المرسل'
+    parameter_name = 'sender_type'
+    user_field = 'sender'
+    
+    def lookups(self, request, model_admin):
+        return UserProfile.USER_TYPES
+    
+    def queryset(self, request, queryset):
+        if self.value():
+            users = UserProfile.objects.filter(user_type=self.value()).values('user_id')
+            return queryset.filter(**{f'{self.user_field}__in': users})
+        return queryset
+
+
+class RecipientTypeFilter(SenderTypeFilter):
+    """تصفية حسب نوع المستخدم صاحب الإشعار"""
+    
+    title = 'نوع المستخدم'
+    parameter_name = 'user_type'
+    user_field = 'user'
+
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     """إدارة ملفات المستخدمين"""
@@ -22,7 +74,7 @@ class UserProfileAdmin(admin.ModelAdmin):
     ]
     list_filter = [
         'user_type', 'governorate', 'email_notifications', 
-        'sms_notifications', 'created_at'
+        'sms_notifications', 'notification_mode', 'created_at'
     ]
     search_fields = [
         'user__username', 'user__first_name', 'user__last_name',
@@ -39,7 +91,7 @@ class UserProfileAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('إعدادات الإشعارات', {
-            'fields': ('email_notifications', 'sms_notifications')
+            'fields': ('email_notifications', 'sms_notifications', 'notification_mode')
         }),
         ('الصورة الشخصية', {
             'fields': ('avatar',)
@@ -54,19 +106,52 @@ class UserProfileAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('user')
 
 
+class RecentMessagesFormSet(BaseInlineFormSet):
+    """صفحة واحدة من رسائل المحادثة (الأحدث أولاً) بدل تحميل جميع رسائلها"""
+    
+    page = 1
+    per_page = 50
+    page_param = 'messages_page'
+    has_older = False
+    
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            # صف إضافي لمعرفة وجود رسائل أقدم دون COUNT
+            offset = (self.page - 1) * self.per_page
+            messages = list(self.queryset.order_by('-created_at')[offset:offset + self.per_page + 1])
+            self.has_older = len(messages) > self.per_page
+            self._queryset = messages[:self.per_page]
+        return self._queryset
+
+
 class MessageInline(admin.TabularInline):
-    """عرض الرسائل داخل المحادثة"""
+    """عرض الرسائل داخل المحادثة على صفحات مع رابط للرسائل الأقدم"""
     model = Message
+    formset = RecentMessagesFormSet
+    template = 'admin/naebak_messages/message_inline.html'
     extra = 0
+    per_page = 50
     readonly_fields = ['sender', 'created_at', 'is_read', 'read_at']
     fields = ['sender', 'content', 'is_read', 'is_system_message', 'created_at']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('sender')
+    
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        try:
+            formset.page = max(1, int(request.GET.get(formset.page_param, 1)))
+        except ValueError:
+            formset.page = 1
+        formset.per_page = self.per_page
+        return formset
+    
     def has_add_permission(self, request, obj=None):
         return False
 
 
 @admin.register(Conversation)
-class ConversationAdmin(admin.ModelAdmin):
+class ConversationAdmin(BulkActionMixin, admin.ModelAdmin):
     """إدارة المحادثات"""
     
     list_display = [
@@ -74,7 +159,7 @@ class ConversationAdmin(admin.ModelAdmin):
         'is_closed', 'citizen_rating', 'last_message_at', 'created_at'
     ]
     list_filter = [
-        'is_closed', 'citizen_rating', 'created_at', 'last_message_at',
+        'is_closed', 'is_archived', 'citizen_rating', 'created_at', 'last_message_at',
         'representative__userprofile__governorate'
     ]
     search_fields = [
@@ -116,42 +201,41 @@ class ConversationAdmin(admin.ModelAdmin):
     
     def close_conversations(self, request, queryset):
         """إغلاق المحادثات المحددة"""
-        updated = queryset.filter(is_closed=False).update(
-            is_closed=True,
-            closed_by=request.user
+        self.run_bulk_action(
+            request, queryset.filter(is_closed=False), 'close_conversations', 'تم إغلاق {} محادثة'
         )
-        self.message_user(request, f'تم إغلاق {updated} محادثة')
     close_conversations.short_description = 'إغلاق المحادثات المحددة'
     
     def open_conversations(self, request, queryset):
         """فتح المحادثات المحددة"""
-        updated = queryset.filter(is_closed=True).update(
-            is_closed=False,
-            closed_at=None,
-            closed_by=None
+        self.run_bulk_action(
+            request, queryset.filter(is_closed=True), 'open_conversations', 'تم فتح {} محادثة'
         )
-        self.message_user(request, f'تم فتح {updated} محادثة')
     open_conversations.short_description = 'فتح المحادثات المحددة'
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(BulkActionMixin, admin.ModelAdmin):
     """إدارة الرسائل"""
     
     list_display = [
         'conversation_link', 'sender', 'content_preview', 
-        'is_read', 'is_system_message', 'created_at'
+        'is_read', 'is_system_message', 'is_hidden', 'report_count', 'created_at'
     ]
     list_filter = [
-        'is_read', 'is_system_message', 'created_at',
-        'sender__userprofile__user_type'
+        'is_read', 'is_system_message', 'is_hidden', 'created_at',
+        SenderTypeFilter, 'spam_cluster__status'
     ]
+    # عدد تقديري للجداول الكبيرة، ودون عدّ ثانٍ للجدول كاملاً عند التصفية
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = [
         'content', 'sender__first_name', 'sender__last_name',
         'conversation__subject'
     ]
     readonly_fields = [
-        'id', 'conversation', 'sender', 'created_at', 'updated_at'
+        'id', 'conversation', 'sender', 'spam_cluster', 'report_count', 'hidden_at',
+        'created_at', 'updated_at'
     ]
     
     fieldsets = (
@@ -159,7 +243,10 @@ class MessageAdmin(admin.ModelAdmin):
             'fields': ('conversation', 'sender', 'content')
         }),
         ('حالة الرسالة', {
-            'fields': ('is_read', 'read_at', 'is_system_message')
+            'fields': ('is_read', 'read_at', 'is_system_message', 'spam_cluster')
+        }),
+        ('الإبلاغات', {
+            'fields': ('report_count', 'is_hidden', 'hidden_at')
         }),
         ('الرد', {
             'fields': ('reply_to',)
@@ -186,12 +273,13 @@ class MessageAdmin(admin.ModelAdmin):
             'conversation', 'sender', 'reply_to'
         )
     
-    actions = ['mark_as_read', 'mark_as_unread']
+    actions = ['mark_as_read', 'mark_as_unread', 'hide_messages', 'unhide_messages']
     
     def mark_as_read(self, request, queryset):
         """تحديد الرسائل كمقروءة"""
-        updated = queryset.filter(is_read=False).update(is_read=True)
-        self.message_user(request, f'تم تحديد {updated} رسالة كمقروءة')
+        self.run_bulk_action(
+            request, queryset.filter(is_read=False), 'mark_messages_read', 'تم تحديد {} رسالة كمقروءة'
+        )
     mark_as_read.short_description = 'تحديد كمقروءة'
     
     def mark_as_unread(self, request, queryset):
@@ -199,10 +287,22 @@ class MessageAdmin(admin.ModelAdmin):
         updated = queryset.filter(is_read=True).update(is_read=False, read_at=None)
         self.message_user(request, f'تم تحديد {updated} رسالة كغير مقروءة')
     mark_as_unread.short_description = 'تحديد كغير مقروءة'
+    
+    def hide_messages(self, request, queryset):
+        """إخفاء الرسائل عن المشاركين"""
+        updated = queryset.filter(is_hidden=False).update(is_hidden=True, hidden_at=timezone.now())
+        self.message_user(request, f'تم إخفاء {updated} رسالة')
+    hide_messages.short_description = 'إخفاء عن المشاركين'
+    
+    def unhide_messages(self, request, queryset):
+        """إعادة إظهار الرسائل المخفية"""
+        updated = queryset.filter(is_hidden=True).update(is_hidden=False)
+        self.message_user(request, f'تم إظهار {updated} رسالة')
+    unhide_messages.short_description = 'إعادة الإظهار'
 
 
 @admin.register(MessageReport)
-class MessageReportAdmin(admin.ModelAdmin):
+class MessageReportAdmin(BulkActionMixin, admin.ModelAdmin):
     """إدارة الإبلاغات"""
     
     list_display = [
@@ -249,13 +349,9 @@ class MessageReportAdmin(admin.ModelAdmin):
     
     def mark_as_reviewed(self, request, queryset):
         """تحديد الإبلاغات كمراجعة"""
-        from django.utils import timezone
-        updated = queryset.filter(is_reviewed=False).update(
-            is_reviewed=True,
-            reviewed_at=timezone.now(),
-            reviewed_by=request.user
+        self.run_bulk_action(
+            request, queryset.filter(is_reviewed=False), 'review_reports', 'تم مراجعة {} إبلاغ'
         )
-        self.message_user(request, f'تم مراجعة {updated} إبلاغ')
     mark_as_reviewed.short_description = 'تحديد كمراجع'
 
 
@@ -283,8 +379,10 @@ class SystemNotificationAdmin(admin.ModelAdmin):
         'title', 'user', 'notification_type', 'is_read', 'created_at'
     ]
     list_filter = [
-        'notification_type', 'is_read', 'created_at'
+        'notification_type', 'is_read', 'created_at', RecipientTypeFilter
     ]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = [
         'title', 'message', 'user__first_name', 'user__last_name'
     ]
@@ -328,6 +426,190 @@ class SystemNotificationAdmin(admin.ModelAdmin):
     mark_as_unread.short_description = 'تحديد كغير مقروء'
 
 
+@admin.register(NotificationBroadcast)
+class NotificationBroadcastAdmin(admin.ModelAdmin):
+    """إدارة الإشعارات الجماعية"""
+    
+    list_display = [
+        'title', 'notification_type', 'delivery_mode', 'target_user_type', 'target_governorate',
+        'status', 'delivered_count', 'total_recipients', 'created_at'
+    ]
+    list_filter = ['status', 'delivery_mode', 'notification_type', 'target_user_type', 'created_at']
+    search_fields = ['title', 'message', 'target_governorate']
+    readonly_fields = [
+        'id', 'status', 'total_recipients', 'delivered_count', 'last_user_id',
+        'started_at', 'completed_at', 'last_error', 'created_at', 'updated_at'
+    ]
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    """إدارة صندوق الصادر"""
+    
+    list_display = [
+        'event_type', 'aggregate_id', 'attempts', 'next_attempt_at',
+        'processed_at', 'failed_at', 'created_at'
+    ]
+    list_filter = ['event_type', 'processed_at', 'failed_at', 'created_at']
+    search_fields = ['aggregate_id', 'last_error']
+    readonly_fields = [
+        'id', 'event_type', 'aggregate_id', 'payload', 'attempts',
+        'processed_at', 'failed_at', 'last_error', 'created_at', 'updated_at'
+    ]
+    
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        """إعادة محاولة التسليم فوراً (بما فيها الأحداث المتوقفة بعد استنفاد المحاولات)"""
+        updated = queryset.filter(processed_at__isnull=True).update(
+            next_attempt_at=timezone.now(), failed_at=None
+        )
+        self.message_user(request, f'تمت جدولة {updated} حدث لإعادة المحاولة')
+    retry_now.short_description = 'إعادة المحاولة الآن'
+
+
+@admin.register(NotificationDelivery)
+class NotificationDeliveryAdmin(admin.ModelAdmin):
+    """إدارة إرسال الإشعارات بالبريد والرسائل النصية"""
+    
+    list_display = ['user', 'channel', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at']
+    list_filter = ['channel', 'status', 'created_at']
+    search_fields = ['user__username', 'user__email', 'subject', 'last_error']
+    raw_id_fields = ['user', 'notification']
+    readonly_fields = [
+        'id', 'dedupe_key', 'attempts', 'sent_at', 'last_error', 'created_at', 'updated_at'
+    ]
+    
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        """إعادة محاولة الإرسال فوراً"""
+        updated = queryset.exclude(status='sent').update(status='pending', next_attempt_at=timezone.now())
+        self.message_user(request, f'تمت جدولة {updated} عملية إرسال لإعادة المحاولة')
+    retry_now.short_description = 'إعادة المحاولة الآن'
+
+
+@admin.register(ConversationArchive)
+class ConversationArchiveAdmin(admin.ModelAdmin):
+    """إدارة أرشيف المحادثات"""
+    
+    list_display = ['conversation', 'message_count', 'first_message_at', 'last_message_at', 'created_at']
+    search_fields = ['conversation__subject']
+    raw_id_fields = ['conversation']
+    exclude = ['payload']
+    readonly_fields = [
+        'id', 'conversation', 'checksum', 'message_count', 'first_message_at',
+        'last_message_at', 'created_at', 'updated_at'
+    ]
+    
+    actions = ['restore']
+    
+    def restore(self, request, queryset):
+        """إعادة الرسائل إلى الجدول الحي"""
+        from .archive import restore_conversation
+        for archive in queryset.select_related('conversation'):
+            restore_conversation(archive.conversation)
+        self.message_user(request, 'تمت استعادة المحادثات المحددة')
+    restore.short_description = 'استعادة الرسائل'
+
+
+@admin.register(ReportAggregate)
+class ReportAggregateAdmin(admin.ModelAdmin):
+    """عرض ملخصات الإبلاغات حسب الأولوية"""
+    
+    list_display = [
+        'message', 'pending_count', 'report_count', 'severity', 'last_reported_at', 'priority'
+    ]
+    list_filter = ['severity']
+    raw_id_fields = ['message']
+    readonly_fields = [
+        'id', 'message', 'report_count', 'pending_count', 'reason_counts', 'severity',
+        'first_reported_at', 'last_reported_at', 'priority', 'created_at', 'updated_at'
+    ]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('message__sender')
+
+
+@admin.register(SpamCluster)
+class SpamClusterAdmin(admin.ModelAdmin):
+    """إدارة مجموعات الرسائل المزعجة المكتشفة"""
+    
+    list_display = [
+        'sample_preview', 'message_count', 'conversation_count', 'sender_count',
+        'status', 'created_at'
+    ]
+    list_filter = ['status', 'created_at']
+    search_fields = ['sample_content']
+    readonly_fields = [
+        'id', 'sample_content', 'message_count', 'conversation_count', 'sender_count',
+        'reviewed_by', 'reviewed_at', 'created_at', 'updated_at'
+    ]
+    
+    def sample_preview(self, obj):
+        """معاينة المحتوى مع رابط لرسائل المجموعة"""
+        url = reverse('admin:naebak_messages_message_changelist') + f'?spam_cluster__id__exact={obj.id}'
+        preview = obj.sample_content[:50] + "..." if len(obj.sample_content) > 50 else obj.sample_content
+        return format_html('<a href="{}">{}</a>', url, preview)
+    sample_preview.short_description = 'المحتوى'
+    
+    actions = ['confirm_spam', 'dismiss']
+    
+    def _review(self, request, queryset, status):
+        return queryset.update(status=status, reviewed_by=request.user, reviewed_at=timezone.now())
+    
+    def confirm_spam(self, request, queryset):
+        """تأكيد أن المجموعات رسائل مزعجة"""
+        updated = self._review(request, queryset, 'confirmed')
+        self.message_user(request, f'تم تأكيد {updated} مجموعة كرسائل مزعجة')
+    confirm_spam.short_description = 'تأكيد كرسائل مزعجة'
+    
+    def dismiss(self, request, queryset):
+        """الرسائل المشابهة لاحقاً تنضم إلى المجموعة المرفوضة ولا تُبلغ من جديد"""
+        updated = self._review(request, queryset, 'dismissed')
+        self.message_user(request, f'تم رفض {updated} مجموعة')
+    dismiss.short_description = 'ليست رسائل مزعجة'
+
+
+@admin.register(AdminBulkJob)
+class AdminBulkJobAdmin(admin.ModelAdmin):
+    """متابعة الإجراءات الإدارية الجماعية"""
+    
+    list_display = [
+        'action', 'created_by', 'status', 'progress_display', 'processed_count',
+        'updated_count', 'total_count', 'created_at'
+    ]
+    list_filter = ['action', 'status', 'created_at']
+    # المعرفات قد تكون عشرات الآلاف، فلا تُعرض في الصفحة
+    exclude = ['object_ids']
+    readonly_fields = [
+        'id', 'action', 'created_by', 'status', 'total_count', 'processed_count', 'updated_count',
+        'started_at', 'completed_at', 'last_error', 'created_at', 'updated_at'
+    ]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('created_by').defer('object_ids')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def progress_display(self, obj):
+        """نسبة التقدم"""
+        return f'{obj.progress}%'
+    progress_display.short_description = 'التقدم'
+    
+    actions = ['resume_jobs']
+    
+    def resume_jobs(self, request, queryset):
+        """استئناف المهام المتوقفة بخطأ أو العالقة من حيث توقفت"""
+        from .tasks import run_admin_bulk_job
+        job_ids = list(queryset.filter(bulk_actions.resumable()).values_list('pk', flat=True))
+        for job_id in job_ids:
+            run_admin_bulk_job.delay(str(job_id))
+        self.message_user(request, f'تم استئناف {len(job_ids)} مهمة')
+    resume_jobs.short_description = 'استئناف المهام المتوقفة'
+
+
 # تخصيص لوحة الإدارة
 admin.site.site_header = "إدارة خدمة الرسائل - منصة نائبك.كوم"
 admin.site.site_title = "خدمة الرسائل"
@@ -0,0 +1,221 @@
+"""
+أرشفة المحادثات المغلقة القديمة - منصة نائبك.كوم
+
+Messages of conversations closed more than ARCHIVE_CLOSED_AFTER_MONTHS ago
+are moved out of the live Message table into one gzip-compressed JSONL
+segment per conversation (ConversationArchive); the archive row is the
+conversation's index into cold storage. Archived conversations stay
+readable through Conversation.message_history().
+
+A segment is built in memory inside the conversation's row lock, so
+conversations with more than ARCHIVE_MAX_MESSAGES messages are left in the
+live table and logged instead of archived.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Conversation, ConversationArchive, Message, MessageReport, SpamCluster
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_FIELDS = [
+    'id', 'sender_id', 'content', 'is_read', 'read_at', 'is_system_message',
+    'report_count', 'is_hidden', 'hidden_at', 'spam_cluster_id', 'reply_to_id', 'is_active',
+    'created_at', 'updated_at'
+]
+DATETIME_FIELDS = ('read_at', 'hidden_at', 'created_at', 'updated_at')
+UUID_FIELDS = ('id', 'spam_cluster_id', 'reply_to_id')
+# Read with the rows for the last message preview only; not written to the segment
+SENDER_FIELDS = ('sender__username', 'sender__first_name', 'sender__last_name')
+
+
+class ArchiveJSONEncoder(DjangoJSONEncoder):
+    """Keeps microseconds, which DjangoJSONEncoder truncates; read watermarks compare against them"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _encode(rows):
+    lines = ''.join(json.dumps(row, cls=ArchiveJSONEncoder, ensure_ascii=False) + '\n' for row in rows)
+    raw = lines.encode('utf-8')
+    return gzip.compress(raw), hashlib.sha256(raw).hexdigest()
+
+
+def _decode(payload):
+    for line in gzip.decompress(bytes(payload)).decode('utf-8').splitlines():
+        row = json.loads(line)
+        for field in DATETIME_FIELDS:
+            if row[field]:
+                row[field] = parse_datetime(row[field])
+        for field in UUID_FIELDS:
+            # spam_cluster_id is missing from segments written before it was archived
+            if row.get(field):
+                row[field] = uuid.UUID(row[field])
+        yield row
+
+
+def _last_message_preview(conversation, rows):
+    visible = [row for row in rows if not row['is_hidden']]
+    if not visible:
+        return {}
+    row = visible[-1]
+    message = Message(conversation=conversation, **{field: row[field] for field in ARCHIVED_FIELDS})
+    if 'sender__username' in row:
+        message.sender = User(
+            pk=row['sender_id'],
+            username=row['sender__username'],
+            first_name=row['sender__first_name'],
+            last_name=row['sender__last_name'],
+        )
+    else:
+        message.sender = User.objects.get(pk=row['sender_id'])
+    return message.preview()
+
+
+def max_messages():
+    return getattr(settings, 'ARCHIVE_MAX_MESSAGES', 10000)
+
+
+def archivable_conversations(months=None, now=None):
+    """المحادثات المغلقة منذ أكثر من N شهر وليس في رسائلها بلاغات"""
+    months = months or getattr(settings, 'ARCHIVE_CLOSED_AFTER_MONTHS', 24)
+    cutoff = (now or timezone.now()) - timedelta(days=30 * months)
+    # الرسائل المبلغ عنها تبقى في الجدول الحي لأن البلاغات مرتبطة بها
+    reported = MessageReport.objects.values('message__conversation_id')
+    return Conversation.objects.filter(
+        is_closed=True,
+        is_archived=False,
+        closed_at__lt=cutoff,
+        total_messages__lte=max_messages()
+    ).exclude(pk__in=reported).order_by('closed_at')
+
+
+def archive_conversation(conversation):
+    """نقل رسائل المحادثة إلى الأرشيف وحذفها من الجدول الحي في معاملة واحدة"""
+    with transaction.atomic():
+        conversation = Conversation.objects.select_for_update().get(pk=conversation.pk)
+        if conversation.is_archived:
+            return None
+        # total_messages قد لا يطابق العدد الفعلي، فيُتحقق منه قبل تحميل الرسائل في الذاكرة
+        count = conversation.messages.count()
+        if count > max_messages():
+            logger.warning(f"Conversation {conversation.pk} has {count} messages, too many to archive")
+            return None
+
+        rows = list(conversation.messages.order_by('created_at').values(*ARCHIVED_FIELDS, *SENDER_FIELDS))
+        payload, checksum = _encode([{field: row[field] for field in ARCHIVED_FIELDS} for row in rows])
+        archive = ConversationArchive.objects.create(
+            conversation=conversation,
+            payload=payload,
+            checksum=checksum,
+            message_count=len(rows),
+            first_message_at=rows[0]['created_at'] if rows else None,
+            last_message_at=rows[-1]['created_at'] if rows else None,
+            last_message=_last_message_preview(conversation, rows)
+        )
+        conversation.messages.all().delete()
+        Conversation.objects.filter(pk=conversation.pk).update(is_archived=True)
+    return archive
+
+
+def archive_closed_conversations(months=None, limit=None, dry_run=False):
+    """أرشفة المحادثات المؤهلة واحدة تلو الأخرى؛ يعيد عدد المحادثات والرسائل"""
+    limit = limit or getattr(settings, 'ARCHIVE_BATCH_SIZE', 100)
+    conversations = list(archivable_conversations(months)[:limit])
+
+    stats = {'conversations': 0, 'messages': 0, 'compressed_bytes': 0}
+    if dry_run:
+        stats['conversations'] = len(conversations)
+        stats['messages'] = Message.objects.filter(conversation__in=conversations).count()
+        return stats
+
+    for conversation in conversations:
+        archive = archive_conversation(conversation)
+        if archive is None:
+            continue
+        stats['conversations'] += 1
+        stats['messages'] += archive.message_count
+        stats['compressed_bytes'] += len(archive.payload)
+
+    logger.info(f"Archived conversations: {stats}")
+    return stats
+
+
+def archived_messages(conversation):
+    """
+    رسائل المحادثة المؤرشفة ككائنات Message غير محفوظة، بنفس ترتيب الجدول الحي
+    """
+    archive = ConversationArchive.objects.filter(conversation=conversation).first()
+    if archive is None:
+        return []
+
+    rows = list(_decode(archive.payload))
+    senders = User.objects.in_bulk({row['sender_id'] for row in rows})
+    messages = []
+    for row in rows:
+        message = Message(conversation=conversation, **row)
+        message.sender = senders.get(row['sender_id'])
+        message._state.adding = False
+        messages.append(message)
+    return messages
+
+
+def last_message(conversation):
+    """
+    ملخص آخر رسالة ظاهرة في المحادثة المؤرشفة، من صف الأرشيف دون فك ضغط الرسائل
+    """
+    archive = ConversationArchive.objects.filter(conversation=conversation).defer('payload').first()
+    if archive is None:
+        return None
+
+    if archive.last_message is None:
+        # أرشيف أُنشئ قبل حفظ الملخص: يُحسب مرة واحدة ويُحفظ
+        rows = list(_decode(ConversationArchive.objects.values_list('payload', flat=True).get(pk=archive.pk)))
+        archive.last_message = _last_message_preview(conversation, rows)
+        ConversationArchive.objects.filter(pk=archive.pk).update(last_message=archive.last_message)
+        # القيمة المحفوظة كـ JSON تُقرأ بنفس الصيغة في المرات التالية
+        archive.refresh_from_db(fields=['last_message'])
+
+    if not archive.last_message:
+        return None
+    return {**archive.last_message, 'created_at': parse_datetime(archive.last_message['created_at'])}
+
+
+def restore_conversation(conversation):
+    """إعادة رسائل محادثة مؤرشفة إلى الجدول الحي (مثلاً عند إعادة فتحها)"""
+    with transaction.atomic():
+        archive = ConversationArchive.objects.select_for_update().get(conversation=conversation)
+        rows = list(_decode(archive.payload))
+        # مجموعات الرسائل المزعجة قد تكون دُمجت أو حُذفت بعد الأرشفة
+        clusters = set(SpamCluster.objects.filter(
+            pk__in={row['spam_cluster_id'] for row in rows if row.get('spam_cluster_id')}
+        ).values_list('pk', flat=True))
+        for row in rows:
+            if row.get('spam_cluster_id') not in clusters:
+                row['spam_cluster_id'] = None
+        Message.objects.bulk_create([Message(conversation_id=conversation.pk, **row) for row in rows])
+        if rows:
+            # bulk_create يعيد تعيين created_at/updated_at (auto_now)، لذلك تُستعاد القيم الأصلية
+            Message.objects.filter(pk__in=[row['id'] for row in rows]).update(
+                created_at=Case(*[When(pk=row['id'], then=Value(row['created_at'])) for row in rows]),
+                updated_at=Case(*[When(pk=row['id'], then=Value(row['updated_at'])) for row in rows])
+            )
+        archive.delete()
+        Conversation.objects.filter(pk=conversation.pk).update(is_archived=False)
+    conversation.is_archived = False
@@ -0,0 +1,151 @@
+"""
+إرسال الإشعارات الجماعية على دفعات - منصة نائبك.كوم
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .dispatch import enqueue_for_notifications
+from .models import BroadcastReceipt, NotificationBroadcast, SystemNotification
+
+logger = logging.getLogger(__name__)
+
+
+def _stale_before(now=None):
+    stale_after = getattr(settings, 'BROADCAST_STALE_AFTER', 600)
+    return (now or timezone.now()) - timedelta(seconds=stale_after)
+
+
+def claimable(now=None):
+    """
+    شرط الإشعارات التي يمكن بدء إرسالها: الجديدة والمتوقفة بخطأ، والجارية
+    التي لم يتقدم مؤشرها منذ BROADCAST_STALE_AFTER ثانية (توقف عاملها)
+    """
+    return Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=_stale_before(now))
+
+
+def resumable(now=None):
+    """شرط الإشعارات التي يمكن استئنافها يدوياً: المتوقفة بخطأ، والعالقة جارية أو بانتظار مهمة ضاعت"""
+    return Q(status='failed') | Q(status__in=['pending', 'running'], updated_at__lt=_stale_before(now))
+
+
+def can_resume(broadcast):
+    """هل يمكن استئناف الإشعار يدوياً (متوقف بخطأ أو عالق)"""
+    return NotificationBroadcast.objects.filter(resumable(), pk=broadcast.pk).exists()
+
+
+def fan_out(broadcast_id, chunk_size=None):
+    """
+    إنشاء إشعار لكل مستلم على دفعات مرتبة حسب معرف المستخدم.
+
+    كل دفعة تُكتب مع تقديم المؤشر (last_user_id) في نفس المعاملة، لذلك يمكن
+    استئناف الإرسال بعد أي توقف دون تكرار أو فقدان. تقديم المؤشر مشروط بقيمته
+    السابقة: إذا تقدم به عامل آخر (استأنف الإشعار بعد أن عُدّ هذا العامل متوقفاً)
+    يتوقف هذا العامل دون إرسال الدفعة.
+    """
+    chunk_size = chunk_size or getattr(settings, 'BROADCAST_CHUNK_SIZE', 1000)
+    pause = getattr(settings, 'BROADCAST_CHUNK_PAUSE', 0)
+
+    broadcast = NotificationBroadcast.objects.get(pk=broadcast_id)
+    # حجز الإرسال بتحديث مشروط: عامل واحد فقط يرسل من المؤشر في كل وقت
+    now = timezone.now()
+    claimed = NotificationBroadcast.objects.filter(claimable(now), pk=broadcast.pk).update(
+        status='running', started_at=broadcast.started_at or now, last_error='', updated_at=now
+    )
+    if not claimed:
+        return broadcast
+    recipients = broadcast.recipients().order_by('pk')
+
+    try:
+        while True:
+            user_ids = list(
+                recipients.filter(pk__gt=broadcast.last_user_id).values_list('pk', flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                break
+
+            with transaction.atomic():
+                advanced = NotificationBroadcast.objects.filter(
+                    pk=broadcast.pk, last_user_id=broadcast.last_user_id
+                ).update(
+                    last_user_id=user_ids[-1],
+                    delivered_count=F('delivered_count') + len(user_ids),
+                    updated_at=timezone.now()
+                )
+                if not advanced:
+                    logger.warning(f"Broadcast {broadcast.pk} was taken over by another worker")
+                    broadcast.refresh_from_db()
+                    return broadcast
+                notifications = SystemNotification.objects.bulk_create([
+                    SystemNotification(
+                        user_id=user_id,
+                        notification_type=broadcast.notification_type,
+                        title=broadcast.title,
+                        message=broadcast.message,
+                        action_url=broadcast.action_url,
+                        related_object_id=broadcast.pk,
+                    )
+                    for user_id in user_ids
+                ])
+                enqueue_for_notifications(notifications)
+            broadcast.last_user_id = user_ids[-1]
+
+            if pause:
+                time.sleep(pause)
+    except Exception as e:
+        logger.error(f"Broadcast {broadcast.pk} stopped after user {broadcast.last_user_id}: {e}")
+        NotificationBroadcast.objects.filter(pk=broadcast.pk).update(status='failed', last_error=str(e))
+        raise
+
+    NotificationBroadcast.objects.filter(pk=broadcast.pk).update(
+        status='completed', completed_at=timezone.now()
+    )
+    broadcast.refresh_from_db()
+    return broadcast
+
+
+def start(broadcast):
+    """
+    نشر الإشعار الجماعي.
+
+    المشترك يظهر للمستخدمين فوراً دون إنشاء أي صفوف؛ الموزع يُجدول إرساله
+    بعد حفظ المعاملة الحالية.
+    """
+    if broadcast.delivery_mode == 'shared':
+        now = timezone.now()
+        NotificationBroadcast.objects.filter(pk=broadcast.pk).update(
+            status='completed',
+            delivered_count=broadcast.total_recipients,
+            started_at=now,
+            completed_at=now
+        )
+        broadcast.refresh_from_db()
+        return
+
+    from .tasks import fan_out_broadcast
+    transaction.on_commit(lambda: fan_out_broadcast.delay(str(broadcast.pk)))
+
+
+def mark_read(broadcast, user):
+    """تسجيل قراءة المستخدم لإشعار مشترك؛ القراءة الأولى هي التي تُحفظ"""
+    receipt, _ = BroadcastReceipt.objects.get_or_create(broadcast=broadcast, user=user)
+    broadcast.is_read = True
+    broadcast.read_at = receipt.read_at
+    return broadcast
+
+
+def mark_all_read(user):
+    """تسجيل قراءة جميع الإشعارات المشتركة غير المقروءة للمستخدم"""
+    unread = NotificationBroadcast.objects.visible_to(user).exclude(receipts__user=user)
+    now = timezone.now()
+    created = BroadcastReceipt.objects.bulk_create(
+        [BroadcastReceipt(broadcast_id=pk, user=user, read_at=now) for pk in unread.values_list('pk', flat=True)],
+        ignore_conflicts=True
+    )
+    return len(created)
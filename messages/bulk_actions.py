@@ -0,0 +1,165 @@
+"""
+تنفيذ الإجراءات الجماعية للوحة الإدارة في الخلفية - منصة نائبك.كوم
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import AdminBulkJob, Conversation, Message, MessageReport
+from .throttling import forget_open_conversations
+
+logger = logging.getLogger(__name__)
+
+
+def close_conversations(ids, user):
+    """إغلاق المحادثات بنفس آثار واجهة API (تاريخ الإغلاق ورسالة النظام)"""
+    conversations = Conversation.objects.filter(pk__in=ids, is_closed=False).select_related('citizen')
+    closed = 0
+    for conversation in conversations:
+        conversation.close(user, announce=True)
+        closed += 1
+    return closed
+
+
+def open_conversations(ids, user):
+    """إعادة فتح المحادثات المغلقة، مع استعادة رسائل المؤرشفة منها إلى الجدول الحي"""
+    from .archive import restore_conversation
+    queryset = Conversation.objects.filter(pk__in=ids, is_closed=True)
+    for conversation in queryset.filter(is_archived=True):
+        restore_conversation(conversation)
+    citizen_ids = set(queryset.values_list('citizen_id', flat=True))
+    updated = queryset.update(is_closed=False, closed_at=None, closed_by=None)
+    forget_open_conversations(*citizen_ids)
+    return updated
+
+
+def mark_messages_read(ids, user):
+    """تحديد الرسائل كمقروءة مع وقت القراءة كما في Message.mark_as_read"""
+    return Message.objects.filter(pk__in=ids, is_read=False).update(is_read=True, read_at=timezone.now())
+
+
+def review_reports(ids, user):
+    """تحديد الإبلاغات كمراجعة مع تحديث ملخصات قائمة المراجعة"""
+    from .moderation import refresh_aggregates
+    queryset = MessageReport.objects.filter(pk__in=ids, is_reviewed=False)
+    message_ids = set(queryset.values_list('message_id', flat=True))
+    updated = queryset.update(is_reviewed=True, reviewed_at=timezone.now(), reviewed_by=user)
+    refresh_aggregates(message_ids)
+    return updated
+
+
+ACTIONS = {
+    'close_conversations': close_conversations,
+    'open_conversations': open_conversations,
+    'mark_messages_read': mark_messages_read,
+    'review_reports': review_reports,
+}
+
+
+def _stale_before(now=None):
+    stale_after = getattr(settings, 'ADMIN_BULK_JOB_STALE_AFTER', 600)
+    return (now or timezone.now()) - timedelta(seconds=stale_after)
+
+
+def claimable(now=None):
+    """
+    شرط المهام التي يمكن لعامل أن يبدأ جزءها التالي: المنتظرة والمتوقفة بخطأ،
+    والجارية التي لم يتقدم مؤشرها منذ ADMIN_BULK_JOB_STALE_AFTER ثانية (توقف عاملها)
+    """
+    return Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=_stale_before(now))
+
+
+def resumable(now=None):
+    """شرط المهام التي يمكن استئنافها يدوياً: المتوقفة بخطأ، والعالقة جارية أو بانتظار مهمة ضاعت"""
+    return Q(status='failed') | Q(status__in=['pending', 'running'], updated_at__lt=_stale_before(now))
+
+
+def apply(action, ids, user, batch_size=None):
+    """تنفيذ الإجراء على المعرفات دفعة بعد دفعة، كل دفعة في معاملة مستقلة"""
+    batch_size = batch_size or getattr(settings, 'ADMIN_BULK_JOB_BATCH_SIZE', 500)
+    updated = 0
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            updated += ACTIONS[action](ids[start:start + batch_size], user)
+    return updated
+
+
+def start(action, queryset, user):
+    """
+    تسجيل الإجراء كمهمة خلفية على الصفوف المحددة حالياً
+
+    المعرفات تُحفظ مع المهمة حتى لا يتغير نطاق الإجراء أثناء تنفيذه، والتنفيذ
+    يُجدول بعد حفظ المعاملة الحالية.
+    """
+    ids = [str(pk) for pk in queryset.order_by('pk').values_list('pk', flat=True)]
+    job = AdminBulkJob.objects.create(action=action, created_by=user, object_ids=ids, total_count=len(ids))
+
+    from .tasks import run_admin_bulk_job
+    transaction.on_commit(lambda: run_admin_bulk_job.delay(str(job.pk)))
+    return job
+
+
+def run(job_id, chunk_size=None, batch_size=None):
+    """
+    تنفيذ جزء واحد من المهمة (chunk_size صف) على دفعات من batch_size صف.
+
+    كل دفعة تُكتب مع تقديم المؤشر (processed_count) في نفس المعاملة، لذلك يمكن
+    استئناف المهمة بعد أي توقف دون تكرار. يعيد True إذا بقيت صفوف لجزء تالٍ.
+
+    بين الأجزاء تعود المهمة إلى الانتظار، ولا يبدأ جزءاً إلا عامل يحجزها بتحديث
+    مشروط، فلا يعمل عاملان على نفس المهمة معاً. تقديم المؤشر مشروط أيضاً بقيمته
+    السابقة: إذا تقدم به عامل آخر (استأنف المهمة بعد أن عُدّ هذا العامل متوقفاً)
+    يتوقف هذا العامل دون تنفيذ الدفعة.
+    """
+    chunk_size = chunk_size or getattr(settings, 'ADMIN_BULK_JOB_CHUNK_SIZE', 5000)
+    batch_size = batch_size or getattr(settings, 'ADMIN_BULK_JOB_BATCH_SIZE', 500)
+    pause = getattr(settings, 'ADMIN_BULK_JOB_PAUSE', 0)
+
+    now = timezone.now()
+    claimed = AdminBulkJob.objects.filter(claimable(now), pk=job_id).update(
+        status='running', last_error='', updated_at=now
+    )
+    if not claimed:
+        return False
+    job = AdminBulkJob.objects.select_related('created_by').get(pk=job_id)
+    if job.started_at is None:
+        AdminBulkJob.objects.filter(pk=job.pk).update(started_at=now)
+
+    apply_batch = ACTIONS[job.action]
+    end = min(job.processed_count + chunk_size, job.total_count)
+
+    try:
+        while job.processed_count < end:
+            ids = job.object_ids[job.processed_count:min(job.processed_count + batch_size, end)]
+            with transaction.atomic():
+                advanced = AdminBulkJob.objects.filter(
+                    pk=job.pk, processed_count=job.processed_count
+                ).update(
+                    processed_count=F('processed_count') + len(ids),
+                    updated_at=timezone.now()
+                )
+                if not advanced:
+                    logger.warning(f"Admin bulk job {job.pk} was taken over by another worker")
+                    return False
+                updated = apply_batch(ids, job.created_by)
+                AdminBulkJob.objects.filter(pk=job.pk).update(updated_count=F('updated_count') + updated)
+            job.processed_count += len(ids)
+
+            if pause:
+                time.sleep(pause)
+    except Exception as e:
+        logger.error(f"Admin bulk job {job.pk} stopped after {job.processed_count} rows: {e}")
+        AdminBulkJob.objects.filter(pk=job.pk).update(status='failed', last_error=str(e))
+        raise
+
+    if job.processed_count < job.total_count:
+        AdminBulkJob.objects.filter(pk=job.pk).update(status='pending', updated_at=timezone.now())
+        return True
+    AdminBulkJob.objects.filter(pk=job.pk).update(status='completed', completed_at=timezone.now())
+    return False
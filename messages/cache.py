@@ -0,0 +1,203 @@
+"""
+Two-tier cache for naebak-messaging-service
+Serves hot keys from an in-process LRU in front of the shared Django cache (Redis)
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def redis_client():
+    """Raw Redis client behind the Django cache, or None for other backends"""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        return None
+
+
+class LocalLRUCache:
+    """Size-bounded, thread-safe LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value); expired entries count as misses and are dropped"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, timeout: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TwoTierCache:
+    """
+    In-process LRU (tier 1) in front of the Django cache (tier 2).
+
+    Writes and deletes are published on a Redis pub/sub channel so that every
+    worker drops its local copy; the listener is only started when the Django
+    cache is backed by django-redis.
+    """
+
+    def __init__(self, max_entries: int = None, local_timeout: int = None, channel: str = None):
+        self.local = LocalLRUCache(
+            max_entries or getattr(settings, 'LOCAL_CACHE_MAX_ENTRIES', 1024)
+        )
+        self.local_timeout = local_timeout or getattr(settings, 'LOCAL_CACHE_TIMEOUT', 60)
+        self.channel = channel or getattr(
+            settings, 'CACHE_INVALIDATION_CHANNEL', 'naebak:messaging:cache-invalidation'
+        )
+        self.instance_id = uuid.uuid4().hex
+        self._counters = {
+            'local': {'hits': 0, 'misses': 0},
+            'shared': {'hits': 0, 'misses': 0},
+        }
+        self._counters_lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._listener_lock = threading.Lock()
+
+    def _count(self, tier: str, outcome: str) -> None:
+        with self._counters_lock:
+            self._counters[tier][outcome] += 1
+
+    def get(self, key: str, default: Any = None, miss_timeout: float = None) -> Any:
+        """
+        Look the key up locally first, then in the shared cache.
+
+        With `miss_timeout`, a shared-tier miss is remembered locally as `default`
+        for that many seconds; a later set() on any worker still drops it.
+        """
+        self._ensure_listener()
+
+        hit, value = self.local.get(key)
+        if hit:
+            self._count('local', 'hits')
+            return value
+        self._count('local', 'misses')
+
+        value = cache.get(key)
+        if value is None:
+            self._count('shared', 'misses')
+            if miss_timeout:
+                self.local.set(key, default, miss_timeout)
+            return default
+        self._count('shared', 'hits')
+
+        self.local.set(key, value, self.local_timeout)
+        return value
+
+    def set(self, key: str, value: Any, timeout: int) -> None:
+        """Store in both tiers and tell other workers to drop their copy"""
+        cache.set(key, value, timeout)
+        self.local.set(key, value, min(timeout, self.local_timeout))
+        self._publish(key)
+
+    def delete(self, key: str) -> None:
+        """Remove from both tiers on every worker"""
+        cache.delete(key)
+        self.local.delete(key)
+        self._publish(key)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters per tier"""
+        with self._counters_lock:
+            stats = {tier: dict(counters) for tier, counters in self._counters.items()}
+        stats['local']['entries'] = len(self.local)
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._counters_lock:
+            for counters in self._counters.values():
+                counters['hits'] = counters['misses'] = 0
+
+    # Cross-worker invalidation
+
+    def _publish(self, key: str) -> None:
+        connection = redis_client()
+        if connection is None:
+            return
+        try:
+            connection.publish(self.channel, f"{self.instance_id}:{key}")
+        except Exception as e:
+            logger.error(f"Failed to publish cache invalidation for {key}: {e}")
+
+    def handle_invalidation(self, payload) -> None:
+        """Apply an invalidation message published by another worker"""
+        if isinstance(payload, bytes):
+            payload = payload.decode('utf-8')
+        sender, _, key = payload.partition(':')
+        if sender == self.instance_id:
+            return
+        if key == '*':
+            self.local.clear()
+        else:
+            self.local.delete(key)
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None:
+            return
+        with self._listener_lock:
+            # Another request thread may have started it while we waited
+            if self._listener is not None:
+                return
+            connection = redis_client()
+            if connection is None:
+                # No Redis behind the cache: nothing to listen to, and no need to retry per call
+                self._listener = threading.Thread()
+                return
+
+            listener = threading.Thread(
+                target=self._listen, args=(connection,), name='cache-invalidation', daemon=True
+            )
+            listener.start()
+            self._listener = listener
+
+    def _listen(self, connection) -> None:
+        while True:
+            try:
+                pubsub = connection.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Anything cached before (re)subscribing may have missed an invalidation
+                self.local.clear()
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self.handle_invalidation(message['data'])
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {e}")
+                self.local.clear()
+                time.sleep(1)
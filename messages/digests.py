@@ -0,0 +1,99 @@
+"""
+الملخص اليومي للإشعارات منخفضة الأولوية - منصة نائبك.كوم
+
+المستخدمون في وضع الملخص لا يستلمون هذه الإشعارات فوراً عبر البريد أو الرسائل
+النصية؛ بدلاً من ذلك يُجمع كل ما لم يُقرأ خلال اليوم في رسالة واحدة تُرسل عبر
+مرسل الإشعارات المجمع.
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import NotificationDelivery, SystemNotification
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIGEST_TYPES = ['new_message', 'conversation_closed']
+
+
+def digest_types():
+    """أنواع الإشعارات التي تُجمع في الملخص"""
+    return getattr(settings, 'DIGEST_NOTIFICATION_TYPES', DEFAULT_DIGEST_TYPES)
+
+
+def is_digested(profile, notification):
+    """هل يُؤجل إرسال الإشعار إلى الملخص اليومي لهذا المستخدم"""
+    return profile.notification_mode == 'digest' and notification.notification_type in digest_types()
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def build_daily_digests(day=None, batch_size=500):
+    """
+    إنشاء ملخص واحد لكل مستخدم لإشعارات اليوم غير المقروءة.
+
+    جميع المستلمين يُقرؤون باستعلام واحد مرتب حسب المستخدم؛ مفتاح منع التكرار
+    (القناة والمستخدم واليوم) يجعل إعادة التشغيل لنفس اليوم آمنة.
+
+    التصفية على updated_at لا created_at: إشعار الرسائل الجديدة يُجمع في نفس
+    الصف ويُحدّث وقته، فيدخل ملخص كل يوم وصلته فيه رسائل جديدة.
+    """
+    day = day or timezone.localdate() - timedelta(days=1)
+    start, end = _day_bounds(day)
+
+    rows = SystemNotification.objects.filter(
+        user__userprofile__notification_mode='digest',
+        notification_type__in=digest_types(),
+        is_read=False,
+        updated_at__gte=start,
+        updated_at__lt=end
+    ).order_by('user_id', 'updated_at').values(
+        'user_id', 'user__email', 'user__first_name', 'user__username',
+        'user__userprofile__email_notifications', 'user__userprofile__sms_notifications',
+        'user__userprofile__phone', 'title', 'message', 'event_count'
+    )
+
+    stats = {'users': 0, 'notifications': 0, 'deliveries': 0}
+    pending = []
+    for user_id, items in groupby(rows.iterator(chunk_size=batch_size), key=lambda row: row['user_id']):
+        items = list(items)
+        first = items[0]
+        total = sum(item['event_count'] for item in items)
+        subject = f'ملخص إشعاراتك ليوم {day:%Y-%m-%d}: {total} إشعار'
+        body = render_to_string('messages/email/daily_digest.txt', {
+            'name': first['user__first_name'] or first['user__username'],
+            'day': day,
+            'total': total,
+            'items': items,
+        })
+
+        channels = []
+        if first['user__userprofile__email_notifications'] and first['user__email']:
+            channels.append('email')
+        if first['user__userprofile__sms_notifications'] and first['user__userprofile__phone']:
+            channels.append('sms')
+        for channel in channels:
+            pending.append(NotificationDelivery(
+                user_id=user_id, channel=channel, subject=subject, body=body,
+                dedupe_key=f'{channel}:digest:{user_id}:{day.isoformat()}'
+            ))
+
+        stats['users'] += 1
+        stats['notifications'] += len(items)
+        if len(pending) >= batch_size:
+            stats['deliveries'] += len(NotificationDelivery.objects.bulk_create(pending, ignore_conflicts=True))
+            pending = []
+
+    if pending:
+        stats['deliveries'] += len(NotificationDelivery.objects.bulk_create(pending, ignore_conflicts=True))
+
+    logger.info(f"Built daily digests for {day}: {stats}")
+    return stats
@@ -0,0 +1,221 @@
+"""
+Outbound email/SMS dispatcher for naebak-messaging-service
+Deliveries are queued in the database alongside the notification that caused
+them; a periodic worker sends everything queued for a user since its last run
+as one message per channel, over a single pooled connection per channel
+"""
+
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from . import sms
+from .digests import is_digested
+from .models import NotificationDelivery, UserProfile
+from .outbox import retry_delay
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ('email', 'sms')
+
+
+def enqueue_for_notifications(notifications: Iterable) -> List[NotificationDelivery]:
+    """
+    Queue email/SMS deliveries for notifications, honouring each user's
+    UserProfile preferences. Notifications covered by the user's daily digest
+    are skipped. Re-queuing the same notification is a no-op.
+    """
+    notifications = list(notifications)
+    profiles = {
+        profile.user_id: profile
+        for profile in UserProfile.objects.filter(
+            user_id__in={notification.user_id for notification in notifications}
+        ).select_related('user')
+    }
+
+    deliveries = []
+    for notification in notifications:
+        profile = profiles.get(notification.user_id)
+        if profile is None or is_digested(profile, notification):
+            continue
+        if profile.email_notifications and profile.user.email:
+            deliveries.append(NotificationDelivery(
+                user_id=notification.user_id, notification=notification, channel='email',
+                dedupe_key=f'email:{notification.pk}',
+            ))
+        if profile.sms_notifications and profile.phone:
+            deliveries.append(NotificationDelivery(
+                user_id=notification.user_id, notification=notification, channel='sms',
+                dedupe_key=f'sms:{notification.pk}',
+            ))
+    return NotificationDelivery.objects.bulk_create(deliveries, ignore_conflicts=True)
+
+
+def _claim_due_deliveries(batch_size: int) -> List[NotificationDelivery]:
+    """
+    Lease due deliveries to this worker (same scheme as the outbox); results
+    are only written while next_attempt_at still holds the lease
+    """
+    now = timezone.now()
+    leased_until = now + timedelta(seconds=getattr(settings, 'NOTIFICATION_DISPATCH_CLAIM_TIMEOUT', 120))
+
+    with transaction.atomic():
+        queryset = NotificationDelivery.objects.filter(
+            status='pending',
+            next_attempt_at__lte=now,
+        ).order_by('next_attempt_at')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True, of=('self',))
+
+        deliveries = list(queryset.select_related('user', 'user__userprofile', 'notification')[:batch_size])
+        NotificationDelivery.objects.filter(pk__in=[d.pk for d in deliveries]).update(
+            next_attempt_at=leased_until
+        )
+    for delivery in deliveries:
+        delivery.next_attempt_at = leased_until
+    return deliveries
+
+
+def _leased(deliveries: List[NotificationDelivery]):
+    """The deliveries that are still pending under this worker's lease"""
+    return NotificationDelivery.objects.filter(
+        pk__in=[d.pk for d in deliveries], status='pending', next_attempt_at=deliveries[0].next_attempt_at
+    )
+
+
+def _reserve(channel: str, wanted: int) -> int:
+    """
+    Take up to `wanted` sends from the channel's per-minute budget, shared by
+    all workers through the cache. Without a counting cache there is no limit.
+    """
+    limit = getattr(settings, 'NOTIFICATION_RATE_LIMITS', {}).get(channel)
+    if not limit or not wanted:
+        return wanted
+
+    key = f'notification_rate:{channel}:{int(time.time() // 60)}'
+    cache.add(key, 0, timeout=120)
+    try:
+        used = cache.incr(key, wanted)
+    except ValueError:
+        return wanted
+    granted = max(0, min(wanted, limit - (used - wanted)))
+    if granted < wanted:
+        # Give back what was not granted, so the budget is not spent on deferred sends
+        try:
+            cache.decr(key, wanted - granted)
+        except ValueError:
+            pass
+    return granted
+
+
+def _compose(channel: str, user, deliveries: List[NotificationDelivery]):
+    """One message for everything queued for the user on this channel"""
+    rendered = [delivery.render() for delivery in deliveries]
+
+    if channel == 'sms':
+        if len(rendered) == 1:
+            body = rendered[0][0]
+        else:
+            body = f'لديك {len(rendered)} إشعارات جديدة على نائبك'
+        return sms.SMSMessage(to=user.userprofile.phone, body=body)
+
+    if len(rendered) == 1:
+        subject, body = rendered[0]
+    else:
+        subject = f'لديك {len(rendered)} إشعارات جديدة'
+        body = '\n\n'.join(f'{title}\n{message}' for title, message in rendered)
+    return mail.EmailMessage(subject=subject, body=body, to=[user.email])
+
+
+def _open_connection(channel: str):
+    if channel == 'sms':
+        return sms.get_connection()
+    return mail.get_connection()
+
+
+def dispatch_pending(batch_size: int = None) -> Dict[str, float]:
+    """
+    Send due deliveries batched per user and channel.
+
+    Returns counters plus `per_second`, the messages sent per second by this
+    worker for the run.
+    """
+    started = time.perf_counter()
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_DISPATCH_BATCH_SIZE', 500)
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+    deliveries = _claim_due_deliveries(batch_size)
+
+    groups = defaultdict(list)
+    for delivery in deliveries:
+        groups[(delivery.channel, delivery.user_id)].append(delivery)
+
+    stats = {'deliveries': len(deliveries), 'messages': 0, 'sent': 0, 'failed': 0, 'deferred': 0}
+    for channel in CHANNELS:
+        channel_groups = [group for (group_channel, _), group in groups.items() if group_channel == channel]
+        allowed = _reserve(channel, len(channel_groups))
+
+        # Over the rate limit: retry in the next minute without counting an attempt
+        deferred = [d for group in channel_groups[allowed:] for d in group]
+        if deferred:
+            _leased(deferred).update(
+                next_attempt_at=timezone.now() + timedelta(seconds=60)
+            )
+            stats['deferred'] += len(deferred)
+
+        sent, failed = [], []
+        if channel_groups[:allowed]:
+            backend = _open_connection(channel)
+            try:
+                backend.open()
+                for group in channel_groups[:allowed]:
+                    message = _compose(channel, group[0].user, group)
+                    try:
+                        backend.send_messages([message])
+                        sent.extend(group)
+                        stats['messages'] += 1
+                    except Exception as e:
+                        failed.append((group, str(e)))
+            except Exception as e:
+                logger.error(f"Could not open {channel} connection: {e}")
+                done = {d.pk for d in sent}
+                failed.extend(
+                    (group, str(e)) for group in channel_groups[:allowed] if group[0].pk not in done
+                )
+            finally:
+                backend.close()
+
+        if sent:
+            if _leased(sent).update(status='sent', sent_at=timezone.now()) < len(sent):
+                logger.warning(f"{channel} dispatch lease expired before some sends were recorded")
+            stats['sent'] += len(sent)
+
+        for group, error in failed:
+            # Each row is backed off and failed by its own attempt count
+            now = timezone.now()
+            attempts = sorted({d.attempts + 1 for d in group})
+            _leased(group).update(
+                attempts=F('attempts') + 1,
+                status=Case(When(attempts__gte=max_attempts - 1, then=Value('failed')), default=Value('pending')),
+                next_attempt_at=Case(*[
+                    When(attempts=n - 1, then=Value(now + retry_delay(n))) for n in attempts
+                ], default=Value(now + retry_delay(attempts[-1]))),
+                last_error=error,
+            )
+            attempts = attempts[-1]
+            stats['failed'] += len(group)
+            logger.warning(f"{channel} delivery to user {group[0].user_id} failed (attempt {attempts}): {error}")
+
+    elapsed = time.perf_counter() - started
+    stats['per_second'] = round(stats['messages'] / elapsed, 1) if elapsed else 0.0
+    if stats['messages']:
+        logger.info(f"Dispatched {stats['messages']} notification messages in {elapsed:.2f}s ({stats['per_second']}/s)")
+    return stats
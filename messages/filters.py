@@ -6,6 +6,7 @@ import django_filters
 from django.db.models import Q
 from django.contrib.auth.models import User
 from .models import Conversation, Message, MessageReport, SystemNotification
+from . import receipts as read_receipts
 
 
 class ConversationFilter(django_filters.FilterSet):
@@ -68,18 +69,11 @@ class ConversationFilter(django_filters.FilterSet):
     
     def filter_has_unread(self, queryset, name, value):
         """فلترة المحادثات التي تحتوي على رسائل غير مقروءة"""
-        user = self.request.user
         if value:
-            if hasattr(user, 'userprofile') and user.userprofile.user_type == 'citizen':
-                return queryset.filter(
-                    messages__sender=F('representative'),
-                    messages__is_read=False
-                ).distinct()
-            elif hasattr(user, 'userprofile') and user.userprofile.user_type == 'representative':
-                return queryset.filter(
-                    messages__sender=F('citizen'),
-                    messages__is_read=False
-                ).distinct()
+            unread = Message.objects.unread_for(self.request.user).exclude(
+                pk__in=list(read_receipts.pending_for_reader(self.request.user))
+            )
+            return queryset.filter(id__in=unread.values('conversation_id'))
         return queryset
 
 
@@ -92,8 +86,8 @@ class MessageFilter(django_filters.FilterSet):
     # فلترة حسب المرسل
     sender = django_filters.ModelChoiceFilter(queryset=User.objects.all())
     
-    # فلترة حسب حالة القراءة
-    is_read = django_filters.BooleanFilter()
+    # فلترة حسب حالة القراءة (تشمل علامة قراءة المحادثة)
+    is_read = django_filters.BooleanFilter(method='filter_is_read')
     
     # فلترة حسب نوع الرسالة
     is_system_message = django_filters.BooleanFilter()
@@ -119,6 +113,12 @@ class MessageFilter(django_filters.FilterSet):
             'search', 'from_citizens', 'from_representatives'
         ]
     
+    def filter_is_read(self, queryset, name, value):
+        """فلترة الرسائل حسب قراءة المستلم لها"""
+        if value:
+            return queryset.read_by_recipient()
+        return queryset.unread_by_recipient()
+    
     def filter_from_citizens(self, queryset, name, value):
         """فلترة الرسائل من المواطنين"""
         if value:
@@ -0,0 +1,88 @@
+"""
+Idempotency-Key support for create endpoints of naebak-messaging-service
+
+The first successful response for a (user, endpoint, key) triple is stored in
+the cache and replayed for retries carrying the same key. A short lock taken
+with cache.add() keeps concurrent duplicates from running the create twice.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request) -> str:
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = {key: values for key, values in data.lists()}
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method}:{request.path}:{payload}'.encode('utf-8')).hexdigest()
+
+
+class IdempotentCreateMixin:
+    """
+    ViewSet mixin that honours the Idempotency-Key header on create().
+
+    Requests without the header are processed as before. Only 2xx responses
+    are stored; a failed attempt can be retried with the same key.
+    """
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'يجب ألا يتجاوز {HEADER} {MAX_KEY_LENGTH} حرفاً'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache_key = f'idempotency:{request.user.pk}:{self.basename}:{hashlib.sha256(key.encode()).hexdigest()}'
+        fingerprint = _fingerprint(request)
+
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return self._replay(stored, fingerprint)
+
+        lock_key = f'{cache_key}:lock'
+        if not cache.add(lock_key, 1, timeout=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 30)):
+            return Response(
+                {'error': 'طلب بنفس مفتاح التكرار قيد المعالجة، أعد المحاولة بعد قليل'},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            # The first attempt may have finished between the lookup and taking the lock
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return self._replay(stored, fingerprint)
+
+            response = super().create(request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                cache.set(cache_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                    'location': response.get('Location'),
+                }, timeout=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    def _replay(self, stored, fingerprint):
+        if stored['fingerprint'] != fingerprint:
+            return Response(
+                {'error': f'تم استخدام {HEADER} نفسه مع طلب مختلف'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        headers = {REPLAY_HEADER: 'true'}
+        if stored['location']:
+            headers['Location'] = stored['location']
+        return Response(stored['data'], status=stored['status'], headers=headers)
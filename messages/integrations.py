@@ -3,33 +3,45 @@ Integration services for naebak-messaging-service
 Handles communication with other naebak services
 """
 
+import hashlib
+import time
+import jwt
 import requests
 import logging
 from django.conf import settings
-from django.core.cache import cache
 from typing import Dict, List, Optional, Any
 import json
 
+from .cache import TwoTierCache
+
 logger = logging.getLogger(__name__)
 
+# One cache (and one invalidation listener thread) per process for all integrations
+shared_cache = TwoTierCache()
+
 
 class ContentServiceIntegration:
     """Integration with naebak-content-service"""
     
-    def __init__(self):
+    def __init__(self, cache: TwoTierCache = None):
         self.base_url = getattr(settings, 'CONTENT_SERVICE_URL', 'http://localhost:8001')
         self.timeout = getattr(settings, 'SERVICE_TIMEOUT', 10)
         self.cache_timeout = getattr(settings, 'CACHE_TIMEOUT', 300)  # 5 minutes
+        self.cache = cache or shared_cache
     
-    def _make_request(self, endpoint: str, method: str = 'GET', data: Dict = None) -> Optional[Dict]:
+    def _make_request(self, endpoint: str, method: str = 'GET', data: Dict = None, headers: Dict = None) -> Optional[Dict]:
         """Make HTTP request to content service"""
         try:
             url = f"{self.base_url}/api/{endpoint.lstrip('/')}"
-            headers = {
+            default_headers = {
                 'Content-Type': 'application/json',
                 'User-Agent': 'naebak-messaging-service/1.0'
             }
             
+            if headers:
+                default_headers.update(headers)
+            headers = default_headers
+            
             if method.upper() == 'GET':
                 response = requests.get(url, headers=headers, timeout=self.timeout)
             elif method.upper() == 'POST':
@@ -57,35 +69,37 @@ class ContentServiceIntegration:
     def get_representative_by_id(self, representative_id: int) -> Optional[Dict]:
         """Get representative details by ID"""
         cache_key = f"representative_{representative_id}"
-        cached_data = cache.get(cache_key)
+        cached_data = self.cache.get(cache_key)
         
         if cached_data:
             return cached_data
         
         data = self._make_request(f"representatives/{representative_id}/")
         if data:
-            cache.set(cache_key, data, self.cache_timeout)
+            self.cache.set(cache_key, data, self.cache_timeout)
         
         return data
     
     def get_representative_by_slug(self, slug: str) -> Optional[Dict]:
         """Get representative details by slug"""
         cache_key = f"representative_slug_{slug}"
-        cached_data = cache.get(cache_key)
+        cached_data = self.cache.get(cache_key)
         
         if cached_data:
             return cached_data
         
         data = self._make_request(f"representatives/{slug}/")
         if data:
-            cache.set(cache_key, data, self.cache_timeout)
+            self.cache.set(cache_key, data, self.cache_timeout)
         
         return data
     
     def search_representatives(self, filters: Dict = None) -> List[Dict]:
         """Search representatives with filters"""
-        cache_key = f"representatives_search_{hash(str(sorted((filters or {}).items())))}"
-        cached_data = cache.get(cache_key)
+        # Stable across workers, unlike hash() which is salted per process
+        filters_digest = hashlib.md5(str(sorted((filters or {}).items())).encode()).hexdigest()
+        cache_key = f"representatives_search_{filters_digest}"
+        cached_data = self.cache.get(cache_key)
         
         if cached_data:
             return cached_data
@@ -99,7 +113,7 @@ class ContentServiceIntegration:
         data = self._make_request(endpoint)
         if data and 'results' in data:
             results = data['results']
-            cache.set(cache_key, results, self.cache_timeout)
+            self.cache.set(cache_key, results, self.cache_timeout)
             return results
         
         return []
@@ -107,7 +121,7 @@ class ContentServiceIntegration:
     def get_governorates(self) -> List[Dict]:
         """Get list of governorates"""
         cache_key = "governorates_list"
-        cached_data = cache.get(cache_key)
+        cached_data = self.cache.get(cache_key)
         
         if cached_data:
             return cached_data
@@ -115,7 +129,7 @@ class ContentServiceIntegration:
         data = self._make_request("governorates/")
         if data and 'results' in data:
             results = data['results']
-            cache.set(cache_key, results, self.cache_timeout * 4)  # Cache longer
+            self.cache.set(cache_key, results, self.cache_timeout * 4)  # Cache longer
             return results
         
         return []
@@ -123,7 +137,7 @@ class ContentServiceIntegration:
     def get_districts_by_governorate(self, governorate_id: int) -> List[Dict]:
         """Get districts by governorate"""
         cache_key = f"districts_gov_{governorate_id}"
-        cached_data = cache.get(cache_key)
+        cached_data = self.cache.get(cache_key)
         
         if cached_data:
             return cached_data
@@ -131,7 +145,7 @@ class ContentServiceIntegration:
         data = self._make_request(f"districts/?governorate={governorate_id}")
         if data and 'results' in data:
             results = data['results']
-            cache.set(cache_key, results, self.cache_timeout * 2)
+            self.cache.set(cache_key, results, self.cache_timeout * 2)
             return results
         
         return []
@@ -139,7 +153,7 @@ class ContentServiceIntegration:
     def get_political_parties(self) -> List[Dict]:
         """Get list of political parties"""
         cache_key = "political_parties_list"
-        cached_data = cache.get(cache_key)
+        cached_data = self.cache.get(cache_key)
         
         if cached_data:
             return cached_data
@@ -147,7 +161,7 @@ class ContentServiceIntegration:
         data = self._make_request("parties/")
         if data and 'results' in data:
             results = data['results']
-            cache.set(cache_key, results, self.cache_timeout * 4)  # Cache longer
+            self.cache.set(cache_key, results, self.cache_timeout * 4)  # Cache longer
             return results
         
         return []
@@ -177,12 +191,24 @@ class ContentServiceIntegration:
             'complaints_received': representative.get('complaints_received', 0)
         }
     
-    def increment_message_count(self, representative_id: int) -> bool:
+    def invalidate(self, cache_key: str) -> None:
+        """Drop a cached entry on every worker"""
+        self.cache.delete(cache_key)
+    
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters for the local and shared cache tiers"""
+        return self.cache.stats()
+    
+    def increment_message_count(self, representative_id: int, count: int = 1,
+                                idempotency_key: str = None, event_ids: List[str] = None) -> bool:
         """Increment message count for representative statistics"""
         try:
+            headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
             data = self._make_request(
                 f"representatives/{representative_id}/increment_messages/",
-                method='POST'
+                method='POST',
+                data={'count': count, 'event_ids': event_ids or []},
+                headers=headers
             )
             return data is not None
         except Exception as e:
@@ -193,9 +219,14 @@ class ContentServiceIntegration:
 class AuthServiceIntegration:
     """Integration with naebak-auth-service"""
     
-    def __init__(self):
+    def __init__(self, cache: TwoTierCache = None):
         self.base_url = getattr(settings, 'AUTH_SERVICE_URL', 'http://localhost:8002')
         self.timeout = getattr(settings, 'SERVICE_TIMEOUT', 10)
+        self.verifying_key = getattr(settings, 'AUTH_JWT_VERIFYING_KEY', '')
+        self.algorithm = getattr(settings, 'AUTH_JWT_ALGORITHM', 'HS256')
+        self.validation_cache_timeout = getattr(settings, 'TOKEN_VALIDATION_CACHE_TIMEOUT', 300)
+        self.revocation_local_timeout = getattr(settings, 'TOKEN_REVOCATION_LOCAL_TIMEOUT', 5)
+        self.cache = cache or shared_cache
     
     def _make_request(self, endpoint: str, method: str = 'GET', data: Dict = None, headers: Dict = None) -> Optional[Dict]:
         """Make HTTP request to auth service"""
@@ -224,10 +255,77 @@ class AuthServiceIntegration:
             logger.error(f"Error calling auth service: {e}")
             return None
     
+    @staticmethod
+    def _token_hash(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _token_expiry(token: str) -> Optional[int]:
+        """Read the `exp` claim without verifying the signature"""
+        try:
+            claims = jwt.decode(token, options={'verify_signature': False})
+        except jwt.InvalidTokenError:
+            return None
+        exp = claims.get('exp')
+        return int(exp) if exp is not None else None
+    
+    def _verify_locally(self, token: str) -> Optional[Dict]:
+        """Verify signature and expiry with the shared key; raises on invalid tokens"""
+        return jwt.decode(token, self.verifying_key, algorithms=[self.algorithm])
+    
     def validate_token(self, token: str) -> Optional[Dict]:
-        """Validate JWT token with auth service"""
-        headers = {'Authorization': f'Bearer {token}'}
-        return self._make_request('auth/validate/', headers=headers)
+        """Validate JWT token, locally when a verifying key is configured, else with auth service"""
+        token_hash = self._token_hash(token)
+        
+        # Checked before the positive cache: another worker's local copy of a
+        # revoked token may not have been invalidated yet. "Not revoked" is kept
+        # locally for a few seconds so that hot tokens don't hit Redis every call
+        revoked = self.cache.get(
+            f"auth_token_revoked_{token_hash}", False, miss_timeout=self.revocation_local_timeout
+        )
+        if revoked:
+            return None
+        
+        cache_key = f"auth_token_{token_hash}"
+        cached_data = self.cache.get(cache_key)
+        
+        if cached_data:
+            return cached_data
+        
+        if self.verifying_key:
+            try:
+                data = self._verify_locally(token)
+            except jwt.InvalidTokenError as e:
+                logger.info(f"Rejected token during local verification: {e}")
+                return None
+        else:
+            headers = {'Authorization': f'Bearer {token}'}
+            data = self._make_request('auth/validate/', headers=headers)
+        
+        if data:
+            # Never trust a cached result past the token's own expiry
+            timeout = self.validation_cache_timeout
+            exp = self._token_expiry(token)
+            if exp is not None:
+                timeout = min(timeout, exp - int(time.time()))
+            if timeout > 0:
+                self.cache.set(cache_key, data, timeout)
+        
+        return data
+    
+    def revoke_token(self, token: str) -> None:
+        """Evict a revoked token from the validation cache on every worker"""
+        token_hash = self._token_hash(token)
+        
+        # Keep rejecting it until it would have expired anyway
+        timeout = self.validation_cache_timeout
+        exp = self._token_expiry(token)
+        if exp is not None:
+            timeout = max(exp - int(time.time()), 0)
+        if timeout > 0:
+            self.cache.set(f"auth_token_revoked_{token_hash}", True, timeout)
+        
+        self.cache.delete(f"auth_token_{token_hash}")
     
     def get_user_profile(self, user_id: int, token: str) -> Optional[Dict]:
         """Get user profile from auth service"""
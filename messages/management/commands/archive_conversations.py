@@ -0,0 +1,27 @@
+"""
+أمر أرشفة المحادثات المغلقة القديمة - منصة نائبك.كوم
+"""
+
+from django.core.management.base import BaseCommand
+
+from messages.archive import archive_closed_conversations
+
+
+class Command(BaseCommand):
+    help = 'نقل رسائل المحادثات المغلقة منذ أكثر من ARCHIVE_CLOSED_AFTER_MONTHS شهر إلى الأرشيف'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help='عمر الإغلاق بالأشهر')
+        parser.add_argument('--limit', type=int, help='الحد الأقصى لعدد المحادثات في هذا التشغيل')
+        parser.add_argument('--dry-run', action='store_true', help='عرض العدد فقط دون أرشفة')
+
+    def handle(self, *args, **options):
+        stats = archive_closed_conversations(
+            months=options['months'],
+            limit=options['limit'],
+            dry_run=options['dry_run']
+        )
+        verb = 'سيتم أرشفة' if options['dry_run'] else 'تمت أرشفة'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['conversations']} محادثة ({stats['messages']} رسالة)"
+        ))
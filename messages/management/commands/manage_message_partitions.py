@@ -0,0 +1,35 @@
+"""
+أمر إدارة أقسام جدول الرسائل الشهرية على PostgreSQL - منصة نائبك.كوم
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from messages import partitioning
+
+
+class Command(BaseCommand):
+    help = 'تحويل جدول الرسائل إلى أقسام شهرية وإنشاء الأقسام القادمة وفصل المنتهية'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true', help='تحويل الجدول الحالي (مرة واحدة في نافذة صيانة)')
+        parser.add_argument('--ahead', type=int, help='عدد الأشهر القادمة التي تُنشأ أقسامها')
+        parser.add_argument('--detach-older-than', type=int, metavar='MONTHS', help='فصل الأقسام الأقدم من عدد الأشهر')
+        parser.add_argument('--drop', action='store_true', help='حذف الأقسام المفصولة')
+
+    def handle(self, *args, **options):
+        if not partitioning.is_supported():
+            raise CommandError('تقسيم جدول الرسائل مدعوم على PostgreSQL فقط')
+
+        if options['convert'] and partitioning.convert_to_partitioned(options['ahead']):
+            self.stdout.write(self.style.SUCCESS('تم تحويل جدول الرسائل إلى أقسام شهرية'))
+
+        if not partitioning.is_partitioned():
+            raise CommandError('جدول الرسائل غير مقسم؛ استخدم --convert أولاً')
+
+        for name in partitioning.ensure_partitions(options['ahead']):
+            self.stdout.write(f'تم إنشاء {name}')
+        for name in partitioning.detach_expired(options['detach_older_than'], drop=options['drop']):
+            self.stdout.write(f"تم {'حذف' if options['drop'] else 'فصل'} {name}")
+        self.stdout.write(self.style.SUCCESS(
+            f'الأقسام الحالية: {len(partitioning.existing_partitions())}'
+        ))
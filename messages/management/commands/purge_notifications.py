@@ -0,0 +1,29 @@
+"""
+أمر حذف الإشعارات المنتهية حسب سياسة الاحتفاظ - منصة نائبك.كوم
+"""
+
+from django.core.management.base import BaseCommand
+
+from messages.retention import purge_notifications
+
+
+class Command(BaseCommand):
+    help = 'حذف إشعارات النظام المنتهية حسب NOTIFICATION_RETENTION على دفعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='عدد الصفوف في كل دفعة')
+        parser.add_argument('--pause', type=float, help='التوقف بين الدفعات بالثواني')
+        parser.add_argument('--dry-run', action='store_true', help='عرض العدد فقط دون حذف')
+
+    def handle(self, *args, **options):
+        stats = purge_notifications(
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run']
+        )
+        for label, count in sorted(stats['removed'].items()):
+            self.stdout.write(f'{label}: {count}')
+        verb = 'سيتم حذف' if options['dry_run'] else 'تم حذف'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['total']} إشعار في {stats['batches']} دفعة ({stats['elapsed']} ثانية)"
+        ))
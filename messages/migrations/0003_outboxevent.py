@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:48
+
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0002_alter_userprofile_phone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('is_active', models.BooleanField(default=True, verbose_name='نشط')),
+                ('event_type', models.CharField(choices=[('increment_message_count', 'زيادة عدد رسائل النائب')], max_length=50, verbose_name='نوع الحدث')),
+                ('aggregate_id', models.CharField(max_length=64, verbose_name='معرف الكائن المستهدف')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='بيانات الحدث')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='موعد المحاولة التالية')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ التسليم')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+            ],
+            options={
+                'verbose_name': 'حدث صادر',
+                'verbose_name_plural': 'صندوق الصادر',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['processed_at', 'next_attempt_at'], name='naebak_mess_process_0d861b_idx'), models.Index(fields=['event_type', 'aggregate_id'], name='naebak_mess_event_t_4d2055_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0003_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='citizen_last_read_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر قراءة للمواطن'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='representative_last_read_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر قراءة للنائب'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('naebak_messages', '0004_conversation_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationBroadcast',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('is_active', models.BooleanField(default=True, verbose_name='نشط')),
+                ('notification_type', models.CharField(choices=[('new_message', 'رسالة جديدة'), ('conversation_closed', 'إغلاق محادثة'), ('system_update', 'تحديث النظام'), ('maintenance', 'صيانة')], max_length=20, verbose_name='نوع الإشعار')),
+                ('title', models.CharField(max_length=200, verbose_name='عنوان الإشعار')),
+                ('message', models.TextField(verbose_name='محتوى الإشعار')),
+                ('action_url', models.URLField(blank=True, verbose_name='رابط الإجراء')),
+                ('target_user_type', models.CharField(blank=True, choices=[('citizen', 'مواطن'), ('representative', 'نائب'), ('admin', 'مدير')], max_length=20, verbose_name='نوع المستخدمين المستهدفين')),
+                ('target_governorate', models.CharField(blank=True, max_length=50, verbose_name='المحافظة المستهدفة')),
+                ('status', models.CharField(choices=[('pending', 'في الانتظار'), ('running', 'قيد الإرسال'), ('completed', 'مكتمل'), ('failed', 'فشل')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('total_recipients', models.PositiveIntegerField(default=0, verbose_name='إجمالي المستلمين')),
+                ('delivered_count', models.PositiveIntegerField(default=0, verbose_name='تم الإرسال إلى')),
+                ('last_user_id', models.BigIntegerField(default=0, verbose_name='آخر مستخدم تم الإرسال إليه')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='بدأ في')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='اكتمل في')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notification_broadcasts', to=settings.AUTH_USER_MODEL, verbose_name='أنشأه')),
+            ],
+            options={
+                'verbose_name': 'إشعار جماعي',
+                'verbose_name_plural': 'الإشعارات الجماعية',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='naebak_mess_status_ef3124_idx')],
+            },
+        ),
+    ]
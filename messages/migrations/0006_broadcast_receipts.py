@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('naebak_messages', '0005_notificationbroadcast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ القراءة')),
+            ],
+            options={
+                'verbose_name': 'إيصال قراءة إشعار جماعي',
+                'verbose_name_plural': 'إيصالات قراءة الإشعارات الجماعية',
+            },
+        ),
+        # الإشعارات الموجودة أُرسلت بالفعل صفاً لكل مستخدم
+        migrations.AddField(
+            model_name='notificationbroadcast',
+            name='delivery_mode',
+            field=models.CharField(choices=[('shared', 'صف واحد مشترك'), ('fan_out', 'إشعار لكل مستخدم')], default='fan_out', max_length=10, verbose_name='طريقة التوصيل'),
+        ),
+        migrations.AlterField(
+            model_name='notificationbroadcast',
+            name='delivery_mode',
+            field=models.CharField(choices=[('shared', 'صف واحد مشترك'), ('fan_out', 'إشعار لكل مستخدم')], default='shared', max_length=10, verbose_name='طريقة التوصيل'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationbroadcast',
+            index=models.Index(fields=['delivery_mode', 'status', 'created_at'], name='naebak_mess_deliver_8e0e48_idx'),
+        ),
+        migrations.AddField(
+            model_name='broadcastreceipt',
+            name='broadcast',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='naebak_messages.notificationbroadcast', verbose_name='الإشعار الجماعي'),
+        ),
+        migrations.AddField(
+            model_name='broadcastreceipt',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_receipts', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم'),
+        ),
+        migrations.AddConstraint(
+            model_name='broadcastreceipt',
+            constraint=models.UniqueConstraint(fields=('user', 'broadcast'), name='unique_broadcast_receipt'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0006_broadcast_receipts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemnotification',
+            name='event_count',
+            field=models.PositiveIntegerField(default=1, verbose_name='عدد الأحداث'),
+        ),
+        migrations.AddConstraint(
+            model_name='systemnotification',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_read', False), ('notification_type', 'new_message')), fields=('user', 'related_object_id'), name='unique_pending_new_message_notification'),
+        ),
+    ]
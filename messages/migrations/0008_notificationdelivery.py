@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('naebak_messages', '0007_coalesced_new_message_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationDelivery',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('is_active', models.BooleanField(default=True, verbose_name='نشط')),
+                ('channel', models.CharField(choices=[('email', 'البريد الإلكتروني'), ('sms', 'رسالة نصية')], max_length=10, verbose_name='القناة')),
+                ('dedupe_key', models.CharField(max_length=128, unique=True, verbose_name='مفتاح منع التكرار')),
+                ('subject', models.CharField(blank=True, max_length=200, verbose_name='الموضوع')),
+                ('body', models.TextField(blank=True, verbose_name='المحتوى')),
+                ('status', models.CharField(choices=[('pending', 'في الانتظار'), ('sent', 'تم الإرسال'), ('failed', 'فشل')], default='pending', max_length=10, verbose_name='الحالة')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='موعد المحاولة التالية')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإرسال')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('notification', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='naebak_messages.systemnotification', verbose_name='الإشعار')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_deliveries', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'إرسال إشعار',
+                'verbose_name_plural': 'إرسال الإشعارات',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='naebak_mess_status_3ab3fa_idx'), models.Index(fields=['user', 'channel'], name='naebak_mess_user_id_c0437e_idx')],
+            },
+        ),
+    ]
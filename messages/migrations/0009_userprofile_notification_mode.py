@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0008_notificationdelivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='notification_mode',
+            field=models.CharField(choices=[('instant', 'فوري'), ('digest', 'ملخص يومي')], default='instant', max_length=10, verbose_name='طريقة استلام الإشعارات'),
+        ),
+    ]
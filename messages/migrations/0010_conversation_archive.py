@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0009_userprofile_notification_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='is_archived',
+            field=models.BooleanField(default=False, verbose_name='مؤرشفة'),
+        ),
+        migrations.CreateModel(
+            name='ConversationArchive',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('is_active', models.BooleanField(default=True, verbose_name='نشط')),
+                ('payload', models.BinaryField(verbose_name='الرسائل المضغوطة')),
+                ('checksum', models.CharField(max_length=64, verbose_name='بصمة المحتوى')),
+                ('message_count', models.PositiveIntegerField(default=0, verbose_name='عدد الرسائل')),
+                ('first_message_at', models.DateTimeField(blank=True, null=True, verbose_name='أول رسالة')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True, verbose_name='آخر رسالة')),
+                ('conversation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='naebak_messages.conversation', verbose_name='المحادثة')),
+            ],
+            options={
+                'verbose_name': 'أرشيف محادثة',
+                'verbose_name_plural': 'أرشيف المحادثات',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0010_conversation_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='reply_to',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='naebak_messages.message', verbose_name='رد على'),
+        ),
+        migrations.AlterField(
+            model_name='messagereport',
+            name='message',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='reports', to='naebak_messages.message', verbose_name='الرسالة'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0011_message_partitioning_prep'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='naebak_mess_is_clos_9da79b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='naebak_mess_sender__1dbfc1_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='messagereport',
+            name='naebak_mess_is_revi_b2e508_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='systemnotification',
+            name='naebak_mess_user_id_417d20_idx',
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(condition=models.Q(('is_closed', False)), fields=['last_message_at'], name='conversation_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['conversation', 'sender', 'created_at'], name='message_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='messagereport',
+            index=models.Index(condition=models.Q(('is_reviewed', False)), fields=['created_at'], name='report_unreviewed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemnotification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', 'created_at'], name='notification_unread_idx'),
+        ),
+    ]
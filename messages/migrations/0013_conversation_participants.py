@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_participants(apps, schema_editor):
+    """صفا مشاركة (مواطن ونائب) لكل محادثة موجودة"""
+    Conversation = apps.get_model('naebak_messages', 'Conversation')
+    ConversationParticipant = apps.get_model('naebak_messages', 'ConversationParticipant')
+
+    batch = []
+    for conversation in Conversation.objects.values('id', 'citizen_id', 'representative_id', 'last_message_at').iterator():
+        for role in ('citizen', 'representative'):
+            batch.append(ConversationParticipant(
+                user_id=conversation[f'{role}_id'], conversation_id=conversation['id'], role=role,
+                last_message_at=conversation['last_message_at'],
+            ))
+        if len(batch) >= 1000:
+            ConversationParticipant.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    ConversationParticipant.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('naebak_messages', '0012_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('citizen', 'مواطن'), ('representative', 'نائب')], max_length=20, verbose_name='الدور')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True, verbose_name='آخر رسالة')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='naebak_messages.conversation', verbose_name='المحادثة')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_participations', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'مشارك في محادثة',
+                'verbose_name_plural': 'المشاركون في المحادثات',
+                'indexes': [models.Index(fields=['user', '-last_message_at'], name='participant_inbox_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='conversationparticipant',
+            constraint=models.UniqueConstraint(fields=('user', 'conversation'), name='unique_conversation_participant'),
+        ),
+        migrations.RunPython(create_participants, migrations.RunPython.noop),
+    ]
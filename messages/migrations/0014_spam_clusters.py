@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('naebak_messages', '0013_conversation_participants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpamCluster',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('is_active', models.BooleanField(default=True, verbose_name='نشط')),
+                ('sample_content', models.TextField(verbose_name='نموذج من المحتوى')),
+                ('message_count', models.PositiveIntegerField(default=0, verbose_name='عدد الرسائل')),
+                ('sender_count', models.PositiveIntegerField(default=0, verbose_name='عدد المرسلين')),
+                ('conversation_count', models.PositiveIntegerField(default=0, verbose_name='عدد المحادثات')),
+                ('status', models.CharField(choices=[('pending', 'بانتظار المراجعة'), ('confirmed', 'رسائل مزعجة'), ('dismissed', 'ليست مزعجة')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ المراجعة')),
+            ],
+            options={
+                'verbose_name': 'مجموعة رسائل مزعجة',
+                'verbose_name_plural': 'مجموعات الرسائل المزعجة',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['created_at', 'id'], name='message_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='spamcluster',
+            name='reviewed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviewed_spam_clusters', to=settings.AUTH_USER_MODEL, verbose_name='راجعها'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='spam_cluster',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='messages', to='naebak_messages.spamcluster', verbose_name='مجموعة رسائل مزعجة'),
+        ),
+        migrations.AddIndex(
+            model_name='spamcluster',
+            index=models.Index(fields=['status', 'created_at'], name='naebak_mess_status_90dbc5_idx'),
+        ),
+    ]
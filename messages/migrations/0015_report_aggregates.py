@@ -0,0 +1,86 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:27
+
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def build_aggregates(apps, schema_editor):
+    """ملخصات الإبلاغات الموجودة (نسخة ثابتة من الحساب، لا تعتمد على messages.moderation)"""
+    MessageReport = apps.get_model('naebak_messages', 'MessageReport')
+    ReportAggregate = apps.get_model('naebak_messages', 'ReportAggregate')
+
+    weights = getattr(settings, 'REPORT_REASON_WEIGHTS', {})
+    decay = getattr(settings, 'REPORT_PRIORITY_DECAY', 45000)
+    epoch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def weight(reason):
+        return weights.get(reason, weights.get('other', 1))
+
+    rows = MessageReport.objects.values('message_id', 'reason').annotate(
+        total=models.Count('id'),
+        pending=models.Count('id', filter=models.Q(is_reviewed=False)),
+        first=models.Min('created_at'),
+        last=models.Max('created_at'),
+    ).order_by()
+    by_message = defaultdict(list)
+    for row in rows:
+        by_message[row['message_id']].append(row)
+
+    aggregates = []
+    for message_id, reasons in by_message.items():
+        pending = [row for row in reasons if row['pending']]
+        last_reported_at = max(row['last'] for row in reasons)
+        weighted = sum(row['pending'] * weight(row['reason']) for row in pending)
+        aggregates.append(ReportAggregate(
+            message_id=message_id,
+            report_count=sum(row['total'] for row in reasons),
+            pending_count=sum(row['pending'] for row in reasons),
+            reason_counts={row['reason']: row['total'] for row in reasons},
+            severity=max(weight(row['reason']) for row in (pending or reasons)),
+            first_reported_at=min(row['first'] for row in reasons),
+            last_reported_at=last_reported_at,
+            priority=round(
+                math.log10(weighted) + (last_reported_at - epoch).total_seconds() / decay, 6
+            ) if weighted else 0.0,
+        ))
+    ReportAggregate.objects.bulk_create(aggregates, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0014_spam_clusters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportAggregate',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('is_active', models.BooleanField(default=True, verbose_name='نشط')),
+                ('report_count', models.PositiveIntegerField(default=0, verbose_name='عدد الإبلاغات')),
+                ('pending_count', models.PositiveIntegerField(default=0, verbose_name='إبلاغات بانتظار المراجعة')),
+                ('reason_counts', models.JSONField(default=dict, verbose_name='الإبلاغات حسب السبب')),
+                ('severity', models.PositiveSmallIntegerField(default=0, verbose_name='أعلى خطورة')),
+                ('first_reported_at', models.DateTimeField(blank=True, null=True, verbose_name='أول إبلاغ')),
+                ('last_reported_at', models.DateTimeField(blank=True, null=True, verbose_name='آخر إبلاغ')),
+                ('priority', models.FloatField(default=0, verbose_name='الأولوية')),
+                ('message', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='report_aggregate', to='naebak_messages.message', verbose_name='الرسالة')),
+            ],
+            options={
+                'verbose_name': 'ملخص إبلاغات رسالة',
+                'verbose_name_plural': 'ملخصات الإبلاغات',
+                'ordering': ['-priority'],
+                'indexes': [models.Index(condition=models.Q(('pending_count__gt', 0)), fields=['-priority'], name='report_queue_idx')],
+            },
+        ),
+        migrations.RunPython(build_aggregates, migrations.RunPython.noop),
+    ]
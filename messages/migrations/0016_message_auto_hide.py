@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:32
+
+from django.db import migrations, models
+
+
+def count_reports(apps, schema_editor):
+    """عدادات الإبلاغات للرسائل المبلغ عنها سابقاً من ملخصات الإبلاغات (دون إخفاء بأثر رجعي)"""
+    Message = apps.get_model('naebak_messages', 'Message')
+    ReportAggregate = apps.get_model('naebak_messages', 'ReportAggregate')
+    for message_id, report_count in ReportAggregate.objects.values_list('message_id', 'report_count').iterator():
+        Message.objects.filter(pk=message_id).update(report_count=report_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0015_report_aggregates'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='message',
+            name='naebak_mess_convers_a078f4_idx',
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='hidden_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإخفاء'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='is_hidden',
+            field=models.BooleanField(default=False, verbose_name='مخفية'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='report_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='عدد الإبلاغات'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_hidden', False)), fields=['conversation', 'created_at'], name='message_visible_idx'),
+        ),
+        migrations.RunPython(count_reports, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('naebak_messages', '0016_message_auto_hide'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminBulkJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('is_active', models.BooleanField(default=True, verbose_name='نشط')),
+                ('action', models.CharField(choices=[('close_conversations', 'إغلاق المحادثات'), ('open_conversations', 'فتح المحادثات'), ('mark_messages_read', 'تحديد الرسائل كمقروءة'), ('review_reports', 'تحديد الإبلاغات كمراجعة')], max_length=30, verbose_name='الإجراء')),
+                ('object_ids', models.JSONField(default=list, verbose_name='معرفات الصفوف')),
+                ('status', models.CharField(choices=[('pending', 'في الانتظار'), ('running', 'قيد التنفيذ'), ('completed', 'مكتمل'), ('failed', 'فشل')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='إجمالي الصفوف')),
+                ('processed_count', models.PositiveIntegerField(default=0, verbose_name='تمت معالجتها')),
+                ('updated_count', models.PositiveIntegerField(default=0, verbose_name='تم تعديلها')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='بدأ في')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='اكتمل في')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='admin_bulk_jobs', to=settings.AUTH_USER_MODEL, verbose_name='أنشأه')),
+            ],
+            options={
+                'verbose_name': 'إجراء إداري جماعي',
+                'verbose_name_plural': 'الإجراءات الإدارية الجماعية',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
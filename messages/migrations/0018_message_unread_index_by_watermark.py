@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0017_admin_bulk_jobs'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='message',
+            name='message_unread_idx',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'sender', 'created_at'], name='message_sender_timeline_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0018_message_unread_index_by_watermark'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='systemnotification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['updated_at'], name='notification_digest_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:59
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0019_notification_digest_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationarchive',
+            name='last_message',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='ملخص آخر رسالة'),
+        ),
+    ]
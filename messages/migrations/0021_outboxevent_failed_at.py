@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0020_conversationarchive_last_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='تاريخ التوقف عن المحاولة'),
+        ),
+    ]
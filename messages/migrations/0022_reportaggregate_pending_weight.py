@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def weigh_pending(apps, schema_editor):
+    """وزن الإبلاغات المعلقة للملخصات الموجودة (تُزاد بعدها مع كل إبلاغ جديد)"""
+    MessageReport = apps.get_model('naebak_messages', 'MessageReport')
+    ReportAggregate = apps.get_model('naebak_messages', 'ReportAggregate')
+
+    weights = getattr(settings, 'REPORT_REASON_WEIGHTS', {})
+    rows = MessageReport.objects.filter(is_reviewed=False).values('message_id', 'reason').annotate(
+        pending=models.Count('id')
+    ).order_by()
+    pending_weight = {}
+    for row in rows:
+        weight = weights.get(row['reason'], weights.get('other', 1))
+        pending_weight[row['message_id']] = pending_weight.get(row['message_id'], 0) + row['pending'] * weight
+    for message_id, weight in pending_weight.items():
+        ReportAggregate.objects.filter(message_id=message_id).update(pending_weight=weight)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('naebak_messages', '0021_outboxevent_failed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportaggregate',
+            name='pending_weight',
+            field=models.PositiveIntegerField(default=0, verbose_name='وزن الإبلاغات المعلقة'),
+        ),
+        migrations.RunPython(weigh_pending, migrations.RunPython.noop),
+    ]
@@ -4,9 +4,11 @@
 
 import uuid
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Q, Subquery
 from django.contrib.auth.models import User
 from django.core.validators import MaxLengthValidator, RegexValidator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
 
@@ -30,6 +32,11 @@ class UserProfile(BaseModel):
         ('admin', 'مدير'),
     ]
     
+    NOTIFICATION_MODES = [
+        ('instant', 'فوري'),
+        ('digest', 'ملخص يومي'),
+    ]
+    
     user = models.OneToOneField(User, on_delete=models.CASCADE, verbose_name="المستخدم")
     user_type = models.CharField(max_length=20, choices=USER_TYPES, verbose_name="نوع المستخدم")
     phone = models.CharField(
@@ -51,6 +58,12 @@ class UserProfile(BaseModel):
     # إعدادات الإشعارات
     email_notifications = models.BooleanField(default=True, verbose_name="إشعارات البريد الإلكتروني")
     sms_notifications = models.BooleanField(default=False, verbose_name="إشعارات الرسائل النصية")
+    notification_mode = models.CharField(
+        max_length=10, 
+        choices=NOTIFICATION_MODES, 
+        default='instant', 
+        verbose_name="طريقة استلام الإشعارات"
+    )
     
     class Meta:
         verbose_name = "ملف المستخدم"
@@ -81,6 +94,19 @@ class UserProfile(BaseModel):
         return self.user.get_full_name() or self.user.username
 
 
+class ConversationQuerySet(models.QuerySet):
+    """استعلامات المحادثات"""
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        """إنشاء المحادثات مع صفوف المشاركين فيها (bulk_create لا يستدعي save)"""
+        conversations = super().bulk_create(objs, *args, **kwargs)
+        ConversationParticipant.objects.bulk_create(
+            [participant for conversation in conversations for participant in conversation.participant_rows()],
+            ignore_conflicts=True
+        )
+        return conversations
+
+
 class Conversation(BaseModel):
     """نموذج المحادثة بين المواطن والنائب"""
     
@@ -132,16 +158,37 @@ class Conversation(BaseModel):
     )
     citizen_feedback = models.TextField(blank=True, verbose_name="تعليق المواطن")
     
+    # علامات القراءة: كل ما أرسله الطرف الآخر حتى هذا الوقت يعتبر مقروءاً
+    citizen_last_read_at = models.DateTimeField(null=True, blank=True, verbose_name="آخر قراءة للمواطن")
+    representative_last_read_at = models.DateTimeField(null=True, blank=True, verbose_name="آخر قراءة للنائب")
+    
+    # رسائل المحادثة المؤرشفة نُقلت إلى ConversationArchive
+    is_archived = models.BooleanField(default=False, verbose_name="مؤرشفة")
+    
     class Meta:
         verbose_name = "محادثة"
         verbose_name_plural = "المحادثات"
         indexes = [
             models.Index(fields=['citizen', 'representative']),
-            models.Index(fields=['is_closed', 'last_message_at']),
+            # المحادثات المفتوحة فقط؛ المغلقة لا تُستعلم بهذا الترتيب
+            models.Index(
+                fields=['last_message_at'],
+                condition=Q(is_closed=False),
+                name='conversation_open_idx',
+            ),
             models.Index(fields=['created_at']),
         ]
         ordering = ['-last_message_at', '-created_at']
 
+    objects = ConversationQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # طرفا المحادثة كما حُملا، لمعرفة تغييرهما عند الحفظ
+        instance._loaded_parties = (instance.__dict__.get('citizen_id'), instance.__dict__.get('representative_id'))
+        return instance
+
     def __str__(self):
         if len(self.subject) > 50:
             return f"{self.subject[:50]}..."
@@ -151,14 +198,76 @@ class Conversation(BaseModel):
         # تحديث آخر رسالة عند إنشاء المحادثة
         if not self.last_message_at:
             self.last_message_at = timezone.now()
+        is_new = self._state.adding
+        parties = (self.citizen_id, self.representative_id)
+        parties_changed = not is_new and getattr(self, '_loaded_parties', None) != parties
+        if not is_new and self.is_archived and not self.is_closed:
+            # إعادة فتح محادثة مؤرشفة: تعود رسائلها إلى الجدول الحي قبل أي رسالة جديدة
+            from .archive import restore_conversation
+            restore_conversation(self)
+            self.total_messages = self.messages.count()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'total_messages'}
         super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if is_new:
+            ConversationParticipant.objects.bulk_create(self.participant_rows(), ignore_conflicts=True)
+            if not self.is_closed:
+                from .throttling import conversation_opened
+                conversation_opened(self.citizen_id)
+        elif parties_changed:
+            # تغيير أحد الطرفين (مثلاً من لوحة الإدارة) ينقل صلاحية الوصول معه
+            self.sync_participants()
+            # عدادات المحادثات المفتوحة تُعاد من قاعدة البيانات للمواطن السابق والحالي
+            from .throttling import forget_open_conversations
+            previous_citizen_id = getattr(self, '_loaded_parties', (None, None))[0]
+            for citizen_id in {previous_citizen_id, self.citizen_id} - {None}:
+                forget_open_conversations(citizen_id)
+        elif update_fields is None or 'last_message_at' in update_fields:
+            self.participants.exclude(last_message_at=self.last_message_at).update(
+                last_message_at=self.last_message_at
+            )
+        self._loaded_parties = parties
+    
+    def participant_rows(self):
+        """صفا المشاركة (غير محفوظين) لطرفي المحادثة"""
+        return [
+            ConversationParticipant(
+                user_id=self.citizen_id, conversation=self, role='citizen',
+                last_message_at=self.last_message_at
+            ),
+            ConversationParticipant(
+                user_id=self.representative_id, conversation=self, role='representative',
+                last_message_at=self.last_message_at
+            ),
+        ]
+    
+    def sync_participants(self):
+        """مطابقة صفوف المشاركة مع طرفي المحادثة الحاليين"""
+        self.participants.exclude(
+            Q(role='citizen', user_id=self.citizen_id) | Q(role='representative', user_id=self.representative_id)
+        ).delete()
+        ConversationParticipant.objects.bulk_create(self.participant_rows(), ignore_conflicts=True)
+        self.participants.update(last_message_at=self.last_message_at)
     
-    def close(self, closed_by):
-        """إغلاق المحادثة"""
+    def close(self, closed_by, announce=False):
+        """إغلاق المحادثة (announce لإضافة رسالة نظام كما في واجهة API)"""
         self.is_closed = True
         self.closed_at = timezone.now()
         self.closed_by = closed_by
         self.save()
+        
+        from .throttling import forget_open_conversations
+        forget_open_conversations(self.citizen_id)
+        
+        if announce:
+            Message.objects.create(
+                conversation=self,
+                sender=closed_by,
+                content=f"تم إغلاق المحادثة بواسطة {closed_by.get_full_name() or closed_by.username}",
+                is_system_message=True
+            )
     
     def update_last_message(self, message):
         """تحديث آخر رسالة"""
@@ -167,21 +276,132 @@ class Conversation(BaseModel):
         self.total_messages = self.messages.count()
         self.save()
 
+    def message_history(self):
+        """رسائل المحادثة الظاهرة من الجدول الحي أو من الأرشيف"""
+        if self.is_archived:
+            # الأرشيف ثم أي رسائل حية أُضيفت بعده (إن أعيد فتح المحادثة دون استعادتها)
+            from .archive import archived_messages
+            archived = [message for message in archived_messages(self) if not message.is_hidden]
+            return archived + list(self.messages.visible().select_related('sender'))
+        return self.messages.visible()
+
+    def last_read_field_for(self, user):
+        """اسم حقل علامة القراءة الخاص بالمشارك"""
+        if user.pk == self.citizen_id:
+            return 'citizen_last_read_at'
+        if user.pk == self.representative_id:
+            return 'representative_last_read_at'
+        return None
+    
+    def mark_read_by(self, user, read_at=None):
+        """تحديد المحادثة كمقروءة للمشارك بتحديث صف واحد (العلامة لا تعود للخلف)"""
+        field = self.last_read_field_for(user)
+        if field is None:
+            return False
+        
+        read_at = read_at or timezone.now()
+        updated = Conversation.objects.filter(pk=self.pk).filter(
+            Q(**{f'{field}__isnull': True}) | Q(**{f'{field}__lt': read_at})
+        ).update(**{field: read_at})
+        if updated:
+            setattr(self, field, read_at)
+        return bool(updated)
+
+    def _unread_from(self, sender, last_read_at):
+        messages = self.messages.visible().filter(sender=sender, is_read=False)
+        if last_read_at:
+            messages = messages.filter(created_at__gt=last_read_at)
+        return messages
+
     @property
     def unread_count_for_citizen(self):
         """عدد الرسائل غير المقروءة للمواطن"""
-        return self.messages.filter(
-            sender=self.representative,
-            is_read=False
-        ).count()
+        return self._unread_from(self.representative, self.citizen_last_read_at).count()
 
     @property
     def unread_count_for_representative(self):
         """عدد الرسائل غير المقروءة للنائب"""
-        return self.messages.filter(
-            sender=self.citizen,
-            is_read=False
-        ).count()
+        return self._unread_from(self.citizen, self.representative_last_read_at).count()
+
+    def unread_count_for(self, user, pending_receipts=()):
+        """عدد الرسائل غير المقروءة للمشارك، دون الرسائل التي قرأها وإيصالها ما زال في Redis"""
+        if user.pk == self.citizen_id:
+            messages = self._unread_from(self.representative_id, self.citizen_last_read_at)
+        elif user.pk == self.representative_id:
+            messages = self._unread_from(self.citizen_id, self.representative_last_read_at)
+        else:
+            return 0
+        if pending_receipts:
+            messages = messages.exclude(pk__in=list(pending_receipts))
+        return messages.count()
+
+
+class ConversationParticipant(models.Model):
+    """
+    فهرس المشاركين: صف لكل مشارك في كل محادثة، حتى تكون محادثات المستخدم
+    مسحاً لنطاق واحد في الفهرس بدل citizen OR representative مع DISTINCT
+    """
+    
+    ROLES = [
+        ('citizen', 'مواطن'),
+        ('representative', 'نائب'),
+    ]
+    
+    user = models.ForeignKey(
+        User, 
+        on_delete=models.CASCADE, 
+        related_name='conversation_participations',
+        verbose_name="المستخدم"
+    )
+    conversation = models.ForeignKey(
+        Conversation, 
+        on_delete=models.CASCADE, 
+        related_name='participants',
+        verbose_name="المحادثة"
+    )
+    role = models.CharField(max_length=20, choices=ROLES, verbose_name="الدور")
+    # نسخة من Conversation.last_message_at لترتيب صندوق المستخدم من الفهرس
+    last_message_at = models.DateTimeField(null=True, blank=True, verbose_name="آخر رسالة")
+    
+    class Meta:
+        verbose_name = "مشارك في محادثة"
+        verbose_name_plural = "المشاركون في المحادثات"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'conversation'], name='unique_conversation_participant'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_message_at'], name='participant_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.conversation}"
+
+
+class MessageQuerySet(models.QuerySet):
+    """استعلامات الرسائل مع حالة القراءة المشتقة من علامات القراءة"""
+    
+    # مقروءة إذا حُددت منفردة أو كانت قبل علامة قراءة المستلم
+    READ_BY_RECIPIENT = (
+        Q(is_read=True) |
+        Q(sender=F('conversation__citizen'), created_at__lte=F('conversation__representative_last_read_at')) |
+        Q(sender=F('conversation__representative'), created_at__lte=F('conversation__citizen_last_read_at'))
+    )
+    
+    def read_by_recipient(self):
+        return self.filter(self.READ_BY_RECIPIENT)
+    
+    def unread_by_recipient(self):
+        return self.exclude(self.READ_BY_RECIPIENT)
+    
+    def visible(self):
+        """الرسائل الظاهرة للمشاركين (غير المخفية بسبب الإبلاغات)"""
+        return self.filter(is_hidden=False)
+    
+    def unread_for(self, user):
+        """الرسائل غير المقروءة للمستخدم في جميع محادثاته"""
+        return self.visible().filter(
+            conversation__participants__user=user
+        ).exclude(sender=user).unread_by_recipient()
 
 
 class Message(BaseModel):
@@ -213,21 +433,52 @@ class Message(BaseModel):
     
     # معلومات إضافية
     is_system_message = models.BooleanField(default=False, verbose_name="رسالة نظام")
+    
+    # الإخفاء التلقائي: عداد يزيد مع كل إبلاغ، وتُخفى الرسالة عن المشاركين
+    # عند بلوغه REPORT_AUTO_HIDE_THRESHOLD (انظر moderation.py)
+    report_count = models.PositiveIntegerField(default=0, verbose_name="عدد الإبلاغات")
+    is_hidden = models.BooleanField(default=False, verbose_name="مخفية")
+    hidden_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ الإخفاء")
+    # مجموعة الرسائل شبه المتطابقة التي اكتشفها فحص الرسائل المزعجة (spam.py)
+    spam_cluster = models.ForeignKey(
+        'SpamCluster', 
+        on_delete=models.SET_NULL, 
+        null=True, 
+        blank=True,
+        related_name='messages',
+        verbose_name="مجموعة رسائل مزعجة"
+    )
+    # بدون قيد في قاعدة البيانات لأن جدول الرسائل مقسم شهرياً على PostgreSQL (انظر partitioning.py)
     reply_to = models.ForeignKey(
         'self', 
         on_delete=models.SET_NULL, 
         null=True, 
         blank=True,
+        db_constraint=False,
         verbose_name="رد على"
     )
     
+    objects = MessageQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "رسالة"
         verbose_name_plural = "الرسائل"
         indexes = [
-            models.Index(fields=['conversation', 'created_at']),
-            models.Index(fields=['sender', 'is_read']),
+            # الرسائل الظاهرة فقط؛ الاستعلامات التي لا تستثني المخفية تستخدم فهرس المحادثة
+            models.Index(
+                fields=['conversation', 'created_at'],
+                condition=Q(is_hidden=False),
+                name='message_visible_idx',
+            ),
+            # عدادات غير المقروء: رسائل الطرف الآخر بعد علامة قراءة المستلم مسحٌ لنطاق
+            # في هذا الفهرس. بدون شرط is_read لأن القراءة تحرك العلامة ولا تغير is_read
+            models.Index(
+                fields=['conversation', 'sender', 'created_at'],
+                name='message_sender_timeline_idx',
+            ),
             models.Index(fields=['is_system_message']),
+            # مؤشر فحص الرسائل المزعجة يمر على الرسائل بترتيب الإنشاء
+            models.Index(fields=['created_at', 'id'], name='message_created_idx'),
         ]
         ordering = ['created_at']
 
@@ -239,15 +490,42 @@ class Message(BaseModel):
         return f"رسالة من {sender_name}: {content_preview}"
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
+        # المعرف UUID يُولد عند الإنشاء، لذلك لا يصلح pk للتحقق من أن الرسالة جديدة
+        is_new = self._state.adding
+        conversation = self.conversation
+        if is_new and conversation.is_archived and not conversation.is_closed:
+            # محادثة مؤرشفة أعيد فتحها: تعود رسائلها إلى الجدول الحي قبل الرسالة الجديدة
+            from .archive import restore_conversation
+            restore_conversation(conversation)
         super().save(*args, **kwargs)
         
         if is_new:
-            # تحديث إحصائيات المحادثة
-            self.conversation.total_messages = self.conversation.messages.count()
-            self.conversation.last_message_at = self.created_at
-            self.conversation.last_message_by = self.sender
-            self.conversation.save(update_fields=['total_messages', 'last_message_at', 'last_message_by'])
+            # تحديث إحصائيات المحادثة بجملة واحدة دون عد الرسائل (كما في الإرسال الجماعي)
+            Conversation.objects.filter(pk=conversation.pk).update(
+                total_messages=F('total_messages') + 1,
+                last_message_at=self.created_at,
+                last_message_by=self.sender,
+                updated_at=timezone.now()
+            )
+            ConversationParticipant.objects.filter(conversation_id=conversation.pk).update(
+                last_message_at=self.created_at
+            )
+            conversation.total_messages += 1
+            conversation.last_message_at = self.created_at
+            conversation.last_message_by = self.sender
+            
+            from .notifications import schedule_for_message
+            schedule_for_message(self)
+
+    def preview(self):
+        """ملخص الرسالة كما يُعرض كآخر رسالة في قائمة المحادثات"""
+        return {
+            'id': str(self.id),
+            'content': self.content[:100] + "..." if len(self.content) > 100 else self.content,
+            'sender': self.sender.get_full_name() or self.sender.username,
+            'created_at': self.created_at,
+            'is_read': self.read_by_recipient
+        }
 
     def mark_as_read(self, user=None):
         """تحديد الرسالة كمقروءة"""
@@ -256,6 +534,29 @@ class Message(BaseModel):
             self.read_at = timezone.now()
             self.save(update_fields=['is_read', 'read_at'])
 
+    def _recipient_last_read_at(self):
+        conversation = self.conversation
+        if self.sender_id == conversation.citizen_id:
+            return conversation.representative_last_read_at
+        if self.sender_id == conversation.representative_id:
+            return conversation.citizen_last_read_at
+        return None
+
+    @property
+    def read_by_recipient(self):
+        """هل قرأ المستلم الرسالة (تحديد منفرد أو علامة قراءة المحادثة)"""
+        if self.is_read:
+            return True
+        last_read_at = self._recipient_last_read_at()
+        return last_read_at is not None and self.created_at <= last_read_at
+
+    @property
+    def read_by_recipient_at(self):
+        """وقت قراءة المستلم للرسالة إن وجد"""
+        if self.read_at or not self.read_by_recipient:
+            return self.read_at
+        return self._recipient_last_read_at()
+
     @property
     def is_from_citizen(self):
         """هل الرسالة من المواطن"""
@@ -288,6 +589,7 @@ class MessageReport(BaseModel):
         Message, 
         on_delete=models.CASCADE, 
         related_name='reports',
+        db_constraint=False,
         verbose_name="الرسالة"
     )
     reporter = models.ForeignKey(
@@ -319,7 +621,12 @@ class MessageReport(BaseModel):
         verbose_name_plural = "الإبلاغات عن الرسائل"
         unique_together = ['message', 'reporter']
         indexes = [
-            models.Index(fields=['is_reviewed', 'created_at']),
+            # قائمة البلاغات التي تنتظر المراجعة
+            models.Index(
+                fields=['created_at'],
+                condition=Q(is_reviewed=False),
+                name='report_unreviewed_idx',
+            ),
             models.Index(fields=['reason']),
         ]
 
@@ -327,6 +634,24 @@ class MessageReport(BaseModel):
         reporter_name = self.reporter.get_full_name() or self.reporter.username
         return f"إبلاغ عن رسالة - {reporter_name} - {self.get_reason_display()}"
     
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        from .moderation import add_report, count_report, refresh_aggregates
+        if is_new:
+            count_report(self.message_id)
+            add_report(self)
+        else:
+            refresh_aggregates([self.message_id])
+    
+    def delete(self, *args, **kwargs):
+        message_id = self.message_id
+        result = super().delete(*args, **kwargs)
+        from .moderation import refresh_aggregates, uncount_report
+        uncount_report(message_id)
+        refresh_aggregates([message_id])
+        return result
+    
     def mark_as_reviewed(self, reviewed_by, action_taken=''):
         """تمييز الإبلاغ كمراجع"""
         self.is_reviewed = True
@@ -336,6 +661,95 @@ class MessageReport(BaseModel):
         self.save()
 
 
+class ReportAggregate(BaseModel):
+    """
+    ملخص الإبلاغات لكل رسالة، يُحدّث مع كل إبلاغ أو مراجعة، وتُرتب منه
+    قائمة المراجعة حسب الأولوية (انظر moderation.py)
+    """
+    
+    message = models.OneToOneField(
+        Message, 
+        on_delete=models.CASCADE, 
+        related_name='report_aggregate',
+        db_constraint=False,
+        verbose_name="الرسالة"
+    )
+    report_count = models.PositiveIntegerField(default=0, verbose_name="عدد الإبلاغات")
+    pending_count = models.PositiveIntegerField(default=0, verbose_name="إبلاغات بانتظار المراجعة")
+    pending_weight = models.PositiveIntegerField(default=0, verbose_name="وزن الإبلاغات المعلقة")
+    reason_counts = models.JSONField(default=dict, verbose_name="الإبلاغات حسب السبب")
+    severity = models.PositiveSmallIntegerField(default=0, verbose_name="أعلى خطورة")
+    first_reported_at = models.DateTimeField(null=True, blank=True, verbose_name="أول إبلاغ")
+    last_reported_at = models.DateTimeField(null=True, blank=True, verbose_name="آخر إبلاغ")
+    priority = models.FloatField(default=0, verbose_name="الأولوية")
+    
+    class Meta:
+        verbose_name = "ملخص إبلاغات رسالة"
+        verbose_name_plural = "ملخصات الإبلاغات"
+        indexes = [
+            # قائمة المراجعة: الرسائل التي لها إبلاغات معلقة مرتبة بالأولوية
+            models.Index(
+                fields=['-priority'],
+                condition=Q(pending_count__gt=0),
+                name='report_queue_idx',
+            ),
+        ]
+        ordering = ['-priority']
+
+    def __str__(self):
+        return f"{self.message_id} ({self.pending_count}/{self.report_count})"
+
+
+class SpamCluster(BaseModel):
+    """مجموعة رسائل شبه متطابقة أرسلت إلى عدة محادثات (حملة رسائل مزعجة محتملة)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'بانتظار المراجعة'),
+        ('confirmed', 'رسائل مزعجة'),
+        ('dismissed', 'ليست مزعجة'),
+    ]
+    
+    sample_content = models.TextField(verbose_name="نموذج من المحتوى")
+    message_count = models.PositiveIntegerField(default=0, verbose_name="عدد الرسائل")
+    sender_count = models.PositiveIntegerField(default=0, verbose_name="عدد المرسلين")
+    conversation_count = models.PositiveIntegerField(default=0, verbose_name="عدد المحادثات")
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="الحالة")
+    reviewed_by = models.ForeignKey(
+        User, 
+        on_delete=models.SET_NULL, 
+        null=True, 
+        blank=True,
+        related_name='reviewed_spam_clusters',
+        verbose_name="راجعها"
+    )
+    reviewed_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ المراجعة")
+    
+    class Meta:
+        verbose_name = "مجموعة رسائل مزعجة"
+        verbose_name_plural = "مجموعات الرسائل المزعجة"
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        preview = self.sample_content[:50]
+        return f"{preview} ({self.message_count})"
+
+    def refresh_counts(self):
+        """إعادة حساب العدادات من الرسائل المرتبطة باستعلام واحد"""
+        counts = self.messages.aggregate(
+            messages=models.Count('id'),
+            senders=models.Count('sender', distinct=True),
+            conversations=models.Count('conversation', distinct=True),
+        )
+        self.message_count = counts['messages']
+        self.sender_count = counts['senders']
+        self.conversation_count = counts['conversations']
+        self.save(update_fields=['message_count', 'sender_count', 'conversation_count', 'updated_at'])
+
+
 class MessageStatistics(BaseModel):
     """نموذج إحصائيات الرسائل"""
     
@@ -393,14 +807,36 @@ class SystemNotification(BaseModel):
     is_read = models.BooleanField(default=False, verbose_name="مقروء")
     read_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ القراءة")
     
+    # عدد الأحداث المجمعة في هذا الإشعار (مثل عدد الرسائل الجديدة)
+    event_count = models.PositiveIntegerField(default=1, verbose_name="عدد الأحداث")
+    
     class Meta:
         verbose_name = "إشعار النظام"
         verbose_name_plural = "إشعارات النظام"
         indexes = [
-            models.Index(fields=['user', 'is_read']),
+            # الإشعارات غير المقروءة لكل مستخدم
+            models.Index(
+                fields=['user', 'created_at'],
+                condition=Q(is_read=False),
+                name='notification_unread_idx',
+            ),
+            # الملخص اليومي يقرأ غير المقروء حسب وقت آخر تحديث
+            models.Index(
+                fields=['updated_at'],
+                condition=Q(is_read=False),
+                name='notification_digest_idx',
+            ),
             models.Index(fields=['notification_type']),
             models.Index(fields=['created_at']),
         ]
+        constraints = [
+            # إشعار رسائل جديدة واحد غير مقروء لكل مستخدم ومحادثة
+            models.UniqueConstraint(
+                fields=['user', 'related_object_id'],
+                condition=Q(notification_type='new_message', is_read=False),
+                name='unique_pending_new_message_notification'
+            ),
+        ]
         ordering = ['-created_at']
 
     def __str__(self):
@@ -412,3 +848,332 @@ class SystemNotification(BaseModel):
             self.is_read = True
             self.read_at = timezone.now()
             self.save(update_fields=['is_read', 'read_at'])
+
+
+class NotificationBroadcastQuerySet(models.QuerySet):
+    """استعلامات الإشعارات الجماعية المخزنة كصف واحد"""
+    
+    def visible_to(self, user):
+        """الإشعارات المشتركة التي تستهدف المستخدم وصدرت بعد تسجيله"""
+        queryset = self.filter(
+            delivery_mode='shared',
+            status='completed',
+            is_active=True,
+            created_at__gte=user.date_joined
+        )
+        profile = getattr(user, 'userprofile', None)
+        if profile is None:
+            return queryset.filter(target_user_type='', target_governorate='')
+        return queryset.filter(
+            Q(target_user_type='') | Q(target_user_type=profile.user_type),
+            Q(target_governorate='') | Q(target_governorate=profile.governorate)
+        )
+    
+    def with_read_state(self, user):
+        """إضافة is_read و read_at للمستخدم من جدول إيصالات القراءة"""
+        receipts = BroadcastReceipt.objects.filter(broadcast=OuterRef('pk'), user=user)
+        return self.annotate(
+            is_read=Exists(receipts),
+            read_at=Subquery(receipts.values('read_at')[:1])
+        )
+
+
+class NotificationBroadcast(BaseModel):
+    """نموذج إشعار جماعي يرسل لجميع المستخدمين أو لشريحة منهم"""
+    
+    DELIVERY_MODES = [
+        ('shared', 'صف واحد مشترك'),
+        ('fan_out', 'إشعار لكل مستخدم'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'في الانتظار'),
+        ('running', 'قيد الإرسال'),
+        ('completed', 'مكتمل'),
+        ('failed', 'فشل'),
+    ]
+    
+    created_by = models.ForeignKey(
+        User, 
+        on_delete=models.SET_NULL, 
+        null=True, 
+        blank=True,
+        related_name='notification_broadcasts',
+        verbose_name="أنشأه"
+    )
+    
+    notification_type = models.CharField(
+        max_length=20, 
+        choices=SystemNotification.NOTIFICATION_TYPES, 
+        verbose_name="نوع الإشعار"
+    )
+    title = models.CharField(max_length=200, verbose_name="عنوان الإشعار")
+    message = models.TextField(verbose_name="محتوى الإشعار")
+    action_url = models.URLField(blank=True, verbose_name="رابط الإجراء")
+    
+    # الشريحة المستهدفة (فارغ = الجميع)
+    target_user_type = models.CharField(
+        max_length=20, 
+        choices=UserProfile.USER_TYPES, 
+        blank=True, 
+        verbose_name="نوع المستخدمين المستهدفين"
+    )
+    target_governorate = models.CharField(max_length=50, blank=True, verbose_name="المحافظة المستهدفة")
+    
+    # المشترك يُخزن مرة واحدة وتُسجل القراءة لكل مستخدم في BroadcastReceipt
+    delivery_mode = models.CharField(
+        max_length=10, 
+        choices=DELIVERY_MODES, 
+        default='shared', 
+        verbose_name="طريقة التوصيل"
+    )
+    
+    # تقدم الإرسال (last_user_id يسمح باستئناف الإرسال من حيث توقف)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="الحالة")
+    total_recipients = models.PositiveIntegerField(default=0, verbose_name="إجمالي المستلمين")
+    delivered_count = models.PositiveIntegerField(default=0, verbose_name="تم الإرسال إلى")
+    last_user_id = models.BigIntegerField(default=0, verbose_name="آخر مستخدم تم الإرسال إليه")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="بدأ في")
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name="اكتمل في")
+    last_error = models.TextField(blank=True, verbose_name="آخر خطأ")
+    
+    class Meta:
+        verbose_name = "إشعار جماعي"
+        verbose_name_plural = "الإشعارات الجماعية"
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['delivery_mode', 'status', 'created_at']),
+        ]
+        ordering = ['-created_at']
+    
+    objects = NotificationBroadcastQuerySet.as_manager()
+
+    def __str__(self):
+        return self.title
+
+    def recipients(self):
+        """المستخدمون المستهدفون بالإشعار"""
+        users = User.objects.filter(is_active=True)
+        if self.target_user_type:
+            users = users.filter(userprofile__user_type=self.target_user_type)
+        if self.target_governorate:
+            users = users.filter(userprofile__governorate=self.target_governorate)
+        return users
+
+    @property
+    def progress(self):
+        """نسبة التقدم المئوية"""
+        if self.status == 'completed':
+            return 100
+        if not self.total_recipients:
+            return 0
+        return min(100, round(self.delivered_count * 100 / self.total_recipients, 1))
+
+
+class BroadcastReceipt(models.Model):
+    """إيصال قراءة إشعار جماعي مشترك (يُكتب عند القراءة فقط)"""
+    
+    broadcast = models.ForeignKey(
+        NotificationBroadcast, 
+        on_delete=models.CASCADE, 
+        related_name='receipts',
+        verbose_name="الإشعار الجماعي"
+    )
+    user = models.ForeignKey(
+        User, 
+        on_delete=models.CASCADE, 
+        related_name='broadcast_receipts',
+        verbose_name="المستخدم"
+    )
+    read_at = models.DateTimeField(default=timezone.now, verbose_name="تاريخ القراءة")
+    
+    class Meta:
+        verbose_name = "إيصال قراءة إشعار جماعي"
+        verbose_name_plural = "إيصالات قراءة الإشعارات الجماعية"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'broadcast'], name='unique_broadcast_receipt'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.broadcast}"
+
+
+class OutboxEvent(BaseModel):
+    """نموذج صندوق الصادر للآثار الجانبية على الخدمات الأخرى"""
+    
+    EVENT_TYPES = [
+        ('increment_message_count', 'زيادة عدد رسائل النائب'),
+    ]
+    
+    event_type = models.CharField(max_length=50, choices=EVENT_TYPES, verbose_name="نوع الحدث")
+    aggregate_id = models.CharField(max_length=64, verbose_name="معرف الكائن المستهدف")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="بيانات الحدث")
+    
+    # حالة التسليم
+    attempts = models.PositiveIntegerField(default=0, verbose_name="عدد المحاولات")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="موعد المحاولة التالية")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ التسليم")
+    # يُضبط عند استنفاد OUTBOX_MAX_ATTEMPTS محاولة، فلا يُعاد إرسال الحدث تلقائياً
+    failed_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ التوقف عن المحاولة")
+    last_error = models.TextField(blank=True, verbose_name="آخر خطأ")
+    
+    class Meta:
+        verbose_name = "حدث صادر"
+        verbose_name_plural = "صندوق الصادر"
+        indexes = [
+            models.Index(fields=['processed_at', 'next_attempt_at']),
+            models.Index(fields=['event_type', 'aggregate_id']),
+        ]
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} - {self.aggregate_id}"
+
+
+class NotificationDelivery(BaseModel):
+    """نموذج إرسال إشعار عبر البريد الإلكتروني أو الرسائل النصية"""
+    
+    CHANNELS = [
+        ('email', 'البريد الإلكتروني'),
+        ('sms', 'رسالة نصية'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'في الانتظار'),
+        ('sent', 'تم الإرسال'),
+        ('failed', 'فشل'),
+    ]
+    
+    user = models.ForeignKey(
+        User, 
+        on_delete=models.CASCADE, 
+        related_name='notification_deliveries',
+        verbose_name="المستخدم"
+    )
+    notification = models.ForeignKey(
+        SystemNotification, 
+        on_delete=models.CASCADE, 
+        null=True, 
+        blank=True,
+        related_name='deliveries',
+        verbose_name="الإشعار"
+    )
+    channel = models.CharField(max_length=10, choices=CHANNELS, verbose_name="القناة")
+    
+    # يمنع إرسال نفس الإشعار مرتين على نفس القناة
+    dedupe_key = models.CharField(max_length=128, unique=True, verbose_name="مفتاح منع التكرار")
+    
+    # المحتوى المخزن يُستخدم فقط عند عدم وجود إشعار مرتبط
+    subject = models.CharField(max_length=200, blank=True, verbose_name="الموضوع")
+    body = models.TextField(blank=True, verbose_name="المحتوى")
+    
+    # حالة الإرسال
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="الحالة")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="عدد المحاولات")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="موعد المحاولة التالية")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ الإرسال")
+    last_error = models.TextField(blank=True, verbose_name="آخر خطأ")
+    
+    class Meta:
+        verbose_name = "إرسال إشعار"
+        verbose_name_plural = "إرسال الإشعارات"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['user', 'channel']),
+        ]
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.get_channel_display()} - {self.user}"
+
+    def render(self):
+        """العنوان والمحتوى الحاليان (من الإشعار المرتبط إن وجد)"""
+        if self.notification_id:
+            return self.notification.title, self.notification.message
+        return self.subject, self.body
+
+
+class ConversationArchive(BaseModel):
+    """أرشيف رسائل محادثة مغلقة قديمة (JSONL مضغوط بـ gzip)"""
+    
+    conversation = models.OneToOneField(
+        Conversation, 
+        on_delete=models.CASCADE, 
+        related_name='archive',
+        verbose_name="المحادثة"
+    )
+    payload = models.BinaryField(verbose_name="الرسائل المضغوطة")
+    checksum = models.CharField(max_length=64, verbose_name="بصمة المحتوى")
+    message_count = models.PositiveIntegerField(default=0, verbose_name="عدد الرسائل")
+    first_message_at = models.DateTimeField(null=True, blank=True, verbose_name="أول رسالة")
+    last_message_at = models.DateTimeField(null=True, blank=True, verbose_name="آخر رسالة")
+    # ملخص آخر رسالة ظاهرة ({} إن لم توجد)، حتى لا يُفك ضغط الأرشيف لعرض قائمة المحادثات
+    last_message = models.JSONField(
+        null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="ملخص آخر رسالة"
+    )
+    
+    class Meta:
+        verbose_name = "أرشيف محادثة"
+        verbose_name_plural = "أرشيف المحادثات"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.conversation} ({self.message_count})"
+
+
+class AdminBulkJob(BaseModel):
+    """
+    إجراء جماعي من لوحة الإدارة على عدد كبير من الصفوف، يُنفذ في الخلفية
+    على دفعات محدودة (انظر bulk_actions.py)
+    """
+    
+    ACTIONS = [
+        ('close_conversations', 'إغلاق المحادثات'),
+        ('open_conversations', 'فتح المحادثات'),
+        ('mark_messages_read', 'تحديد الرسائل كمقروءة'),
+        ('review_reports', 'تحديد الإبلاغات كمراجعة'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'في الانتظار'),
+        ('running', 'قيد التنفيذ'),
+        ('completed', 'مكتمل'),
+        ('failed', 'فشل'),
+    ]
+    
+    action = models.CharField(max_length=30, choices=ACTIONS, verbose_name="الإجراء")
+    created_by = models.ForeignKey(
+        User, 
+        on_delete=models.SET_NULL, 
+        null=True, 
+        blank=True,
+        related_name='admin_bulk_jobs',
+        verbose_name="أنشأه"
+    )
+    # معرفات الصفوف المحددة وقت تنفيذ الإجراء؛ processed_count هو موضع الاستئناف فيها
+    object_ids = models.JSONField(default=list, verbose_name="معرفات الصفوف")
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="الحالة")
+    total_count = models.PositiveIntegerField(default=0, verbose_name="إجمالي الصفوف")
+    processed_count = models.PositiveIntegerField(default=0, verbose_name="تمت معالجتها")
+    updated_count = models.PositiveIntegerField(default=0, verbose_name="تم تعديلها")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="بدأ في")
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name="اكتمل في")
+    last_error = models.TextField(blank=True, verbose_name="آخر خطأ")
+    
+    class Meta:
+        verbose_name = "إجراء إداري جماعي"
+        verbose_name_plural = "الإجراءات الإدارية الجماعية"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_action_display()} ({self.total_count})"
+
+    @property
+    def progress(self):
+        """نسبة التقدم المئوية"""
+        if self.status == 'completed':
+            return 100
+        if not self.total_count:
+            return 0
+        return min(100, round(self.processed_count * 100 / self.total_count, 1))
@@ -0,0 +1,199 @@
+"""
+قائمة مراجعة الإبلاغات حسب الأولوية - منصة نائبك.كوم
+
+ReportAggregate keeps one row per reported message. Its priority is a "hot"
+score: the log of the severity-weighted pending reports plus the time of the
+latest report divided by REPORT_PRIORITY_DECAY. Ten times the weighted reports
+is worth being REPORT_PRIORITY_DECAY seconds more recent. Because recency is
+part of the stored value, newer activity outranks older activity without ever
+re-scoring old rows, and the queue is a plain index scan on priority.
+
+A new report is added to its aggregate incrementally: one UPDATE bumps the
+counters with F() expressions (and locks the row), then the reason breakdown
+and priority are written from the locked row. The grouped COUNT over the
+message's reports only runs on review, resolve and delete, and for the first
+report of a message, which creates the row.
+
+Auto-hide does not go through the aggregate: every new report bumps
+Message.report_count with a single-row UPDATE, and a second conditional UPDATE
+hides the message the first time the counter reaches
+REPORT_AUTO_HIDE_THRESHOLD. Both statements touch one row whatever the number of
+reports, and the row lock taken by the increment means exactly one report wins
+the hide even under concurrency. hidden_at is kept when a moderator restores
+the message, so it is never auto-hidden twice.
+"""
+
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, PositiveSmallIntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Message, MessageReport, ReportAggregate
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def reason_weight(reason: str) -> int:
+    weights = getattr(settings, 'REPORT_REASON_WEIGHTS', {})
+    return weights.get(reason, weights.get('other', 1))
+
+
+def priority_for(weighted_reports: float, last_reported_at) -> float:
+    if not weighted_reports or last_reported_at is None:
+        return 0.0
+    decay = getattr(settings, 'REPORT_PRIORITY_DECAY', 45000)
+    return round(math.log10(weighted_reports) + (last_reported_at - EPOCH).total_seconds() / decay, 6)
+
+
+def aggregate_fields(rows: Iterable[dict]) -> Dict:
+    """
+    قيم ReportAggregate لكل رسالة من صفوف مجمعة حسب (الرسالة، السبب)
+    بالمفاتيح: message_id, reason, total, pending, first, last
+    """
+    by_message = defaultdict(list)
+    for row in rows:
+        by_message[row['message_id']].append(row)
+
+    fields = {}
+    for message_id, reasons in by_message.items():
+        pending = [row for row in reasons if row['pending']]
+        last_reported_at = max(row['last'] for row in reasons)
+        fields[message_id] = {
+            'report_count': sum(row['total'] for row in reasons),
+            'pending_count': sum(row['pending'] for row in reasons),
+            'reason_counts': {row['reason']: row['total'] for row in reasons},
+            'pending_weight': sum(row['pending'] * reason_weight(row['reason']) for row in pending),
+            'severity': max(reason_weight(row['reason']) for row in (pending or reasons)),
+            'first_reported_at': min(row['first'] for row in reasons),
+            'last_reported_at': last_reported_at,
+            'priority': priority_for(
+                sum(row['pending'] * reason_weight(row['reason']) for row in pending), last_reported_at
+            ),
+        }
+    return fields
+
+
+def grouped_reports(report_model, message_ids=None):
+    queryset = report_model.objects.all()
+    if message_ids is not None:
+        queryset = queryset.filter(message_id__in=message_ids)
+    return queryset.values('message_id', 'reason').annotate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(is_reviewed=False)),
+        first=Min('created_at'),
+        last=Max('created_at'),
+    ).order_by()
+
+
+def refresh_aggregates(message_ids: Iterable) -> int:
+    """
+    إعادة حساب ملخصات الرسائل المحددة باستعلام تجميع واحد وكتابة واحدة
+
+    صفوف الرسائل تُقفل قبل التجميع، فلا يكتب حساب قديم فوق حساب أحدث عند
+    تزامن الإبلاغات على نفس الرسالة: من ينتظر القفل يرى إبلاغات من سبقه.
+    """
+    message_ids = sorted(set(message_ids))
+    if not message_ids:
+        return 0
+
+    with transaction.atomic():
+        # ترتيب ثابت للأقفال حتى لا تتعارض تحديثات الدفعات المتداخلة
+        list(Message.objects.select_for_update().filter(pk__in=message_ids).order_by('pk').values_list('pk'))
+        fields = aggregate_fields(grouped_reports(MessageReport, message_ids))
+
+        # رسائل لم يعد لها أي إبلاغ
+        ReportAggregate.objects.filter(message_id__in=message_ids).exclude(message_id__in=list(fields)).delete()
+        if not fields:
+            return 0
+
+        now = timezone.now()
+        update_fields = list(next(iter(fields.values()))) + ['updated_at']
+        ReportAggregate.objects.bulk_create(
+            [ReportAggregate(message_id=message_id, updated_at=now, **values) for message_id, values in fields.items()],
+            update_conflicts=True,
+            unique_fields=['message'],
+            update_fields=update_fields,
+        )
+    return len(fields)
+
+
+def add_report(report) -> None:
+    """
+    إضافة إبلاغ جديد إلى ملخص رسالته دون إعادة التجميع
+
+    العدادات تُزاد بتعبيرات F() في تحديث واحد يقفل صف الملخص حتى نهاية المعاملة،
+    ثم تُكتب الأسباب والأولوية من الصف المقفول. أول إبلاغ عن الرسالة (لا يوجد
+    ملخص بعد) يمر بإعادة الحساب التي تنشئ الصف.
+    """
+    weight = Value(reason_weight(report.reason), output_field=PositiveSmallIntegerField())
+    with transaction.atomic():
+        updated = ReportAggregate.objects.filter(message_id=report.message_id).update(
+            report_count=F('report_count') + 1,
+            pending_count=F('pending_count') + 1,
+            pending_weight=F('pending_weight') + weight,
+            # الخطورة لأعلى سبب معلق، فإن لم يكن هناك معلق قبل هذا الإبلاغ فهي خطورته وحده
+            severity=Case(When(pending_count=0, then=weight), default=Greatest('severity', weight)),
+            last_reported_at=Greatest('last_reported_at', Value(report.created_at)),
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            refresh_aggregates([report.message_id])
+            return
+
+        aggregate = ReportAggregate.objects.get(message_id=report.message_id)
+        reason_counts = aggregate.reason_counts
+        reason_counts[report.reason] = reason_counts.get(report.reason, 0) + 1
+        ReportAggregate.objects.filter(pk=aggregate.pk).update(
+            reason_counts=reason_counts,
+            priority=priority_for(aggregate.pending_weight, aggregate.last_reported_at),
+        )
+
+
+def count_report(message_id) -> bool:
+    """
+    زيادة عداد إبلاغات الرسالة وإخفاؤها عند بلوغ الحد
+    يعيد True إذا كان هذا الإبلاغ هو الذي أخفى الرسالة
+    """
+    Message.objects.filter(pk=message_id).update(report_count=F('report_count') + 1)
+    threshold = getattr(settings, 'REPORT_AUTO_HIDE_THRESHOLD', None)
+    if not threshold:
+        return False
+    return bool(Message.objects.filter(
+        pk=message_id, report_count__gte=threshold, hidden_at__isnull=True
+    ).update(is_hidden=True, hidden_at=timezone.now()))
+
+
+def uncount_report(message_id) -> None:
+    """إنقاص العداد عند حذف إبلاغ (لا تعود الرسالة ظاهرة إلا بقرار مشرف)"""
+    Message.objects.filter(pk=message_id, report_count__gt=0).update(report_count=F('report_count') - 1)
+
+
+def queue(hidden=None):
+    """الرسائل التي لها إبلاغات معلقة، الأعلى أولوية أولاً (hidden لتصفية المخفية تلقائياً)"""
+    queryset = ReportAggregate.objects.filter(pending_count__gt=0)
+    if hidden is not None:
+        queryset = queryset.filter(message__is_hidden=hidden)
+    return queryset.select_related(
+        'message__sender', 'message__conversation'
+    ).order_by('-priority')
+
+
+def resolve(message_id, reviewed_by, action_taken: str = '', restore: bool = False) -> int:
+    """مراجعة جميع الإبلاغات المعلقة عن الرسالة دفعة واحدة، مع إعادة إظهارها إن طُلب"""
+    updated = MessageReport.objects.filter(message_id=message_id, is_reviewed=False).update(
+        is_reviewed=True,
+        reviewed_at=timezone.now(),
+        reviewed_by=reviewed_by,
+        action_taken=action_taken,
+    )
+    if restore:
+        Message.objects.filter(pk=message_id).update(is_hidden=False)
+    refresh_aggregates([message_id])
+    return updated
+
@@ -0,0 +1,101 @@
+"""
+إشعارات الرسائل الجديدة خارج مسار الطلب - منصة نائبك.كوم
+
+كل دفعة رسائل في محادثة تنتج إشعاراً واحداً غير مقروء لكل مستلم يُحدَّث في
+مكانه (event_count) بدلاً من إشعار لكل رسالة.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .dispatch import enqueue_for_notifications
+from .models import Conversation, Message, SystemNotification
+
+
+def _debounce_key(conversation_id, recipient_id):
+    return f'new_message_notification:{conversation_id}:{recipient_id}'
+
+
+def schedule_new_message(conversation_id, recipient_id):
+    """
+    جدولة تحديث إشعار المستلم بعد حفظ المعاملة الحالية.
+
+    مهمة واحدة فقط تُجدول لكل محادثة ومستلم خلال نافذة التجميع؛ الرسائل التالية
+    في النافذة تُحتسب عند تنفيذها.
+    """
+    delay = getattr(settings, 'NEW_MESSAGE_NOTIFICATION_DELAY', 10)
+
+    def enqueue():
+        from .tasks import notify_new_messages
+        # المهمة تحذف المفتاح عند بدايتها؛ المهلة تحمي فقط من مهمة ضائعة
+        if cache.add(_debounce_key(conversation_id, recipient_id), 1, timeout=delay + 60):
+            notify_new_messages.apply_async(
+                args=[str(conversation_id), recipient_id], countdown=delay
+            )
+
+    transaction.on_commit(enqueue)
+
+
+def schedule_for_message(message):
+    """جدولة إشعار الطرف الآخر في المحادثة"""
+    conversation = message.conversation
+    if message.sender_id == conversation.citizen_id:
+        recipient_id = conversation.representative_id
+    else:
+        recipient_id = conversation.citizen_id
+    schedule_new_message(conversation.pk, recipient_id)
+
+
+def notify_new_messages(conversation_id, recipient_id):
+    """
+    إنشاء أو تحديث إشعار الرسائل غير المقروءة للمستلم في المحادثة.
+
+    العدد يُحسب من حالة القراءة الفعلية، لذلك تكرار التنفيذ لا يضاعفه.
+    """
+    # رسائل تصل بعد هذه اللحظة تجدول تشغيلاً جديداً
+    cache.delete(_debounce_key(conversation_id, recipient_id))
+
+    conversation = Conversation.objects.filter(pk=conversation_id).first()
+    if conversation is None:
+        return None
+
+    # الرسائل المخفية بسبب الإبلاغات لا تُحتسب ولا يُنسخ نصها في الإشعار
+    unread = Message.objects.visible().filter(
+        conversation=conversation
+    ).exclude(sender_id=recipient_id).unread_by_recipient()
+    count = unread.count()
+    if not count:
+        return None
+    latest = unread.select_related('sender').order_by('-created_at').first()
+
+    sender_name = latest.sender.get_full_name() or latest.sender.username
+    fields = {
+        'title': 'رسالة جديدة' if count == 1 else f'{count} رسائل جديدة',
+        'message': f'{sender_name}: {latest.content[:100]}',
+        'event_count': count,
+    }
+    pending = SystemNotification.objects.filter(
+        user_id=recipient_id,
+        notification_type='new_message',
+        related_object_id=conversation.pk,
+        is_read=False
+    )
+
+    if pending.update(updated_at=timezone.now(), **fields):
+        return pending.first()
+    try:
+        with transaction.atomic():
+            notification = SystemNotification.objects.create(
+                user_id=recipient_id,
+                notification_type='new_message',
+                related_object_id=conversation.pk,
+                **fields
+            )
+            enqueue_for_notifications([notification])
+            return notification
+    except IntegrityError:
+        # أنشأه عامل آخر في نفس اللحظة
+        pending.update(updated_at=timezone.now(), **fields)
+        return pending.first()
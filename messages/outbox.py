@@ -0,0 +1,146 @@
+"""
+Transactional outbox for naebak-messaging-service
+Side effects on other naebak services are stored in the same transaction as the
+change that caused them, then delivered by a background worker.
+
+Events that still fail after OUTBOX_MAX_ATTEMPTS deliveries are dead-lettered
+(failed_at is set) and are no longer claimed; the admin "retry now" action
+puts them back in the queue.
+"""
+
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_message_count_increment(representative_id, count: int = 1) -> OutboxEvent:
+    """Record a pending message-count increment for a representative"""
+    return OutboxEvent.objects.create(
+        event_type='increment_message_count',
+        aggregate_id=str(representative_id),
+        payload={'count': count},
+    )
+
+
+def _claim_due_events(batch_size: int) -> List[OutboxEvent]:
+    """
+    Lease due events to this worker.
+
+    Pushing next_attempt_at forward by the claim timeout keeps concurrent
+    workers off the same rows without holding locks during HTTP calls; if the
+    worker dies the lease simply expires and the events are retried. The
+    lease end stays on the returned events: results are only written while
+    next_attempt_at still holds it, i.e. no other worker has taken over.
+    """
+    now = timezone.now()
+    leased_until = now + timedelta(seconds=getattr(settings, 'OUTBOX_CLAIM_TIMEOUT', 60))
+
+    with transaction.atomic():
+        queryset = OutboxEvent.objects.filter(
+            processed_at__isnull=True,
+            failed_at__isnull=True,
+            next_attempt_at__lte=now,
+        ).order_by('next_attempt_at')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+
+        events = list(queryset[:batch_size])
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            next_attempt_at=leased_until
+        )
+    for event in events:
+        event.next_attempt_at = leased_until
+    return events
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff before the next attempt, capped at OUTBOX_RETRY_MAX_DELAY"""
+    base = getattr(settings, 'OUTBOX_RETRY_BASE_DELAY', 10)
+    cap = getattr(settings, 'OUTBOX_RETRY_MAX_DELAY', 3600)
+    return timedelta(seconds=min(base * (2 ** attempts), cap))
+
+
+def idempotency_key(events: List[OutboxEvent]) -> str:
+    """Stable key for a batch of events, so a replayed delivery can be recognised"""
+    digest = hashlib.sha256()
+    for event_id in sorted(str(event.pk) for event in events):
+        digest.update(event_id.encode())
+    return digest.hexdigest()
+
+
+def drain_outbox(batch_size: int = None) -> Dict[str, int]:
+    """Deliver due events, coalescing increments into one call per representative"""
+    from .integrations import integration_manager
+
+    batch_size = batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 500)
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 10)
+    events = _claim_due_events(batch_size)
+
+    groups = defaultdict(list)
+    for event in events:
+        groups[(event.event_type, event.aggregate_id)].append(event)
+
+    stats = {'events': len(events), 'calls': 0, 'delivered': 0, 'failed': 0}
+    for (event_type, aggregate_id), group in groups.items():
+        event_ids = [event.pk for event in group]
+        # Only rows still under this worker's lease
+        leased = OutboxEvent.objects.filter(
+            pk__in=event_ids, processed_at__isnull=True, next_attempt_at=group[0].next_attempt_at
+        )
+        stats['calls'] += 1
+
+        if event_type == 'increment_message_count':
+            delivered = integration_manager.content_service.increment_message_count(
+                aggregate_id,
+                count=sum(event.payload.get('count', 1) for event in group),
+                idempotency_key=idempotency_key(group),
+                event_ids=[str(event_id) for event_id in event_ids],
+            )
+        else:
+            logger.error(f"Unknown outbox event type: {event_type}")
+            delivered = False
+
+        if delivered:
+            if leased.update(processed_at=timezone.now()) < len(group):
+                logger.warning(f"Outbox lease on {event_type} for {aggregate_id} expired before completion")
+            stats['delivered'] += len(group)
+        else:
+            # Coalesced events keep their own attempt counts: a new increment grouped
+            # with an old failing one is backed off and dead-lettered on its own schedule
+            now = timezone.now()
+            attempts = sorted({event.attempts + 1 for event in group})
+            leased.update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=Case(*[
+                    When(attempts=n - 1, then=Value(now + retry_delay(n))) for n in attempts
+                ], default=Value(now + retry_delay(attempts[-1]))),
+                failed_at=Case(When(attempts__gte=max_attempts - 1, then=Value(now)), default=Value(None)),
+                last_error=Case(*[
+                    When(attempts=n - 1, then=Value(f"Delivery failed on attempt {n}")) for n in attempts
+                ], default=Value("Delivery failed")),
+            )
+            stats['failed'] += len(group)
+            dead = sum(event.attempts + 1 >= max_attempts for event in group)
+            if dead:
+                logger.error(
+                    f"Outbox delivery of {event_type} for {aggregate_id} gave up after {max_attempts} attempts "
+                    f"({dead} of {len(group)} events dead-lettered)"
+                )
+            else:
+                logger.warning(
+                    f"Outbox delivery of {event_type} for {aggregate_id} failed "
+                    f"({len(group)} events, attempt {attempts[-1]})"
+                )
+
+    return stats
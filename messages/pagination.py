@@ -0,0 +1,73 @@
+"""
+Estimated counts for admin changelists on the large tables
+naebak-messaging-service
+
+An exact COUNT(*) over tens of millions of messages or notifications is a full
+scan on every changelist page. On PostgreSQL the planner already knows roughly
+how many rows a query returns: pg_class.reltuples for the whole table (summed
+over the monthly partitions of the message table, see partitioning.py) and
+the top plan node's row estimate for a filtered queryset. Above
+ADMIN_ESTIMATED_COUNT_THRESHOLD rows the estimate is shown instead of the exact
+count; small tables and small filtered results are still counted exactly.
+
+Pages past the real end of an over-estimated result are simply empty.
+
+On other database backends counts are always exact.
+"""
+
+import json
+import logging
+from typing import Optional
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+TABLE_ESTIMATE_SQL = """
+    SELECT CASE WHEN parent.relkind = 'p' THEN (
+        SELECT COALESCE(SUM(GREATEST(child.reltuples, 0)), 0)
+        FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = parent.oid
+    ) ELSE GREATEST(parent.reltuples, 0) END
+    FROM pg_class parent
+    WHERE parent.oid = %s::regclass
+"""
+
+
+def estimated_count(queryset) -> Optional[int]:
+    """Planner row estimate for the queryset, or None where it is not available."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    try:
+        # savepoint, so a failed estimate does not abort an enclosing transaction
+        with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(TABLE_ESTIMATE_SQL, [queryset.model._meta.db_table])
+                return int(cursor.fetchone()[0])
+
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+    except DatabaseError as e:
+        logger.warning(f"Falling back to an exact count for {queryset.model._meta.label}: {e}")
+        return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that reports the planner estimate for large results."""
+
+    @cached_property
+    def count(self):
+        threshold = getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000)
+        estimate = estimated_count(self.object_list) if hasattr(self.object_list, 'query') else None
+        if estimate is not None and estimate >= threshold:
+            return estimate
+        return super().count
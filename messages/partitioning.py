@@ -0,0 +1,191 @@
+"""
+Monthly range partitioning of the Message table on PostgreSQL
+naebak-messaging-service
+
+The message table is converted once (convert_to_partitioned) into a table
+partitioned by RANGE (created_at), with one partition per calendar month and a
+DEFAULT partition as a safety net. Afterwards ensure_partitions() creates the
+coming months ahead of time and detach_expired() detaches (and optionally
+drops) months that fell out of retention, so index maintenance and VACUUM only
+ever work on one month's data.
+
+PostgreSQL requires the primary key of a partitioned table to include the
+partition key, so the database key becomes (id, created_at). Django keeps
+treating `id` as the primary key; UUIDs stay unique in practice. Foreign keys
+that point at messages (MessageReport.message, Message.reply_to) are enforced
+by Django instead of the database (db_constraint=False), because PostgreSQL
+cannot reference a partitioned table by `id` alone.
+
+On other database backends every function here is a no-op.
+"""
+
+import logging
+from datetime import date
+from typing import List, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+TABLE = Message._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def is_supported() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month: date) -> Tuple[date, date]:
+    start = month.replace(day=1)
+    return start, add_months(start, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'{TABLE}_y{month.year}m{month.month:02d}'
+
+
+def create_partition_sql(month: date) -> str:
+    start, end = month_bounds(month)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(start)}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def is_partitioned() -> bool:
+    if not is_supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def existing_partitions() -> List[str]:
+    """Names of the partitions currently attached to the message table"""
+    if not is_supported():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s ORDER BY child.relname
+            """,
+            [TABLE],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def ensure_partitions(months_ahead: int = None, today: date = None) -> List[str]:
+    """Create partitions for the current month and the next `months_ahead` months"""
+    if not is_partitioned():
+        return []
+    months_ahead = getattr(settings, 'MESSAGE_PARTITIONS_AHEAD', 3) if months_ahead is None else months_ahead
+    current = (today or timezone.localdate()).replace(day=1)
+
+    existing = set(existing_partitions())
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if partition_name(month) in existing:
+                continue
+            cursor.execute(create_partition_sql(month))
+            created.append(partition_name(month))
+    if created:
+        logger.info(f"Created message partitions: {created}")
+    return created
+
+
+def detach_expired(retention_months: int = None, drop: bool = False, today: date = None) -> List[str]:
+    """
+    Detach monthly partitions entirely older than `retention_months`.
+
+    Detaching is a metadata change; the detached table keeps its rows until it
+    is dropped (drop=True) or archived elsewhere.
+    """
+    retention_months = retention_months or getattr(settings, 'MESSAGE_PARTITION_RETENTION_MONTHS', None)
+    if not retention_months or not is_partitioned():
+        return []
+    oldest_kept = partition_name(add_months((today or timezone.localdate()).replace(day=1), -retention_months))
+
+    detached = []
+    with connection.cursor() as cursor:
+        for name in existing_partitions():
+            if name == DEFAULT_PARTITION or name >= oldest_kept:
+                continue
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            if drop:
+                cursor.execute(f'DROP TABLE "{name}"')
+            detached.append(name)
+    if detached:
+        logger.info(f"{'Dropped' if drop else 'Detached'} message partitions: {detached}")
+    return detached
+
+
+def convert_to_partitioned(months_ahead: int = None) -> bool:
+    """
+    One-off conversion of the existing message table (run during a maintenance window).
+
+    The rows are copied into a new partitioned table in one transaction; the
+    secondary indexes and outgoing foreign keys of the old table are recreated
+    on the parent so that every partition gets them.
+    """
+    if not is_supported() or is_partitioned():
+        return False
+    legacy = f'{TABLE}_legacy'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN ("
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p')",
+            [TABLE, TABLE],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT min(created_at) FROM "{TABLE}"')
+        first_message_at = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (created_at)'
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, created_at)')
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+        today = timezone.localdate()
+        month = (timezone.localtime(first_message_at).date() if first_message_at else today).replace(day=1)
+        last = add_months(today.replace(day=1), getattr(settings, 'MESSAGE_PARTITIONS_AHEAD', 3)
+                          if months_ahead is None else months_ahead)
+        while month <= last:
+            cursor.execute(create_partition_sql(month))
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{legacy}"')
+        cursor.execute(f'DROP TABLE "{legacy}"')
+        for definition in index_definitions:
+            cursor.execute(definition.replace(' ONLY ', ' '))
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+
+    logger.info(f"Converted {TABLE} to monthly partitions")
+    return True
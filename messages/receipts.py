@@ -0,0 +1,189 @@
+"""
+تجميع إيصالات القراءة في Redis وتطبيقها على دفعات - منصة نائبك.كوم
+
+Layout in Redis:
+    read_receipts:pending                 set of conversation ids with buffered receipts
+    read_receipts:conversation:<id>       hash message id -> "<reader id>:<epoch read_at>"
+    read_receipts:reader:<user id>        set of message ids buffered for that reader
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from .cache import redis_client
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'read_receipts:pending'
+FLUSH_LOCK_KEY = 'read_receipts:flush-lock'
+
+
+def _conversation_key(conversation_id):
+    return f'read_receipts:conversation:{conversation_id}'
+
+
+def _reader_key(user_id):
+    return f'read_receipts:reader:{user_id}'
+
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def _parse_receipt(value):
+    reader_id, _, read_at = _decode(value).partition(':')
+    return int(reader_id), datetime.fromtimestamp(float(read_at), tz=dt_timezone.utc)
+
+
+def record(message, reader):
+    """
+    تسجيل إيصال قراءة في المخزن المؤقت.
+
+    يعيد وقت القراءة، أو None إذا لم يكن Redis متاحاً أو فشل (وعندها يطبق المستدعي القراءة مباشرة).
+    """
+    client = redis_client()
+    if client is None:
+        return None
+
+    read_at = timezone.now()
+    ttl = getattr(settings, 'READ_RECEIPT_BUFFER_TTL', 3600)
+    conversation_key = _conversation_key(message.conversation_id)
+    reader_key = _reader_key(reader.pk)
+    pipe = client.pipeline()
+    # أول قراءة هي التي تُحفظ؛ تكرار الإيصال لا يغير الوقت
+    pipe.hsetnx(conversation_key, str(message.pk), f'{reader.pk}:{read_at.timestamp()}')
+    pipe.sadd(PENDING_KEY, str(message.conversation_id))
+    pipe.sadd(reader_key, str(message.pk))
+    # نفس المدة للمفتاحين، فلا يبقى أحدهما بعد انتهاء الآخر
+    pipe.expire(conversation_key, ttl)
+    pipe.expire(reader_key, ttl)
+    try:
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Read receipt not buffered, writing it directly: {e}")
+        return None
+    return read_at
+
+
+def pending_for_reader(user):
+    """معرفات الرسائل التي قرأها المستخدم ولم تُكتب بعد في قاعدة البيانات"""
+    client = redis_client()
+    if client is None:
+        return set()
+    try:
+        return {_decode(message_id) for message_id in client.smembers(_reader_key(user.pk))}
+    except RedisError as e:
+        logger.warning(f"Pending read receipts unavailable: {e}")
+        return set()
+
+
+def overlay(messages):
+    """تطبيق الإيصالات المعلقة على كائنات الرسائل حتى لا تبدو القراءة متراجعة"""
+    client = redis_client()
+    if client is None:
+        return messages
+
+    if isinstance(messages, Message):
+        instances = [messages]
+    else:
+        instances = list(messages)
+    by_conversation = defaultdict(list)
+    for message in instances:
+        if not message.is_read:
+            by_conversation[message.conversation_id].append(message)
+    if not by_conversation:
+        return messages
+
+    pipe = client.pipeline()
+    conversation_ids = list(by_conversation)
+    for conversation_id in conversation_ids:
+        pipe.hmget(_conversation_key(conversation_id), [str(m.pk) for m in by_conversation[conversation_id]])
+    try:
+        results = pipe.execute()
+    except RedisError as e:
+        # بدون الإيصالات المعلقة تظهر الحالة المحفوظة في قاعدة البيانات فقط
+        logger.warning(f"Read receipts overlay skipped: {e}")
+        return messages
+    for conversation_id, receipts in zip(conversation_ids, results):
+        for message, receipt in zip(by_conversation[conversation_id], receipts):
+            if receipt is not None:
+                message.is_read = True
+                message.read_at = _parse_receipt(receipt)[1]
+    return messages
+
+
+def _flush_conversation(client, conversation_id):
+    """كتابة إيصالات محادثة واحدة؛ يعيد عدد الرسائل المحدثة أو None إن لم يكن لها إيصالات"""
+    key = _conversation_key(conversation_id)
+    raw = client.hgetall(key)
+    if not raw:
+        return None
+
+    receipts = {_decode(mid): _parse_receipt(value) for mid, value in raw.items()}
+    updated = Message.objects.filter(
+        conversation_id=conversation_id,
+        pk__in=list(receipts),
+        is_read=False
+    ).update(
+        is_read=True,
+        read_at=Case(
+            *[When(pk=mid, then=Value(read_at)) for mid, (_, read_at) in receipts.items()],
+            output_field=DateTimeField()
+        )
+    )
+
+    # إزالة ما كُتب فقط من المخزن بعد نجاح التحديث
+    pipe = client.pipeline()
+    pipe.hdel(key, *receipts)
+    for mid, (reader_id, _) in receipts.items():
+        pipe.srem(_reader_key(reader_id), mid)
+    pipe.execute()
+    return updated
+
+
+def flush():
+    """كتابة الإيصالات المعلقة: جملة UPDATE واحدة لكل محادثة"""
+    client = redis_client()
+    stats = {'conversations': 0, 'messages': 0}
+    if client is None:
+        return stats
+
+    lock = client.lock(FLUSH_LOCK_KEY, timeout=30, blocking=False)
+    try:
+        if not lock.acquire():
+            return stats
+        conversation_ids = client.smembers(PENDING_KEY)
+    except RedisError as e:
+        logger.error(f"Read receipt flush skipped: {e}")
+        return stats
+    try:
+        for conversation_id in conversation_ids:
+            conversation_id = _decode(conversation_id)
+            try:
+                # الحذف من قائمة الانتظار قبل القراءة: أي إيصال جديد سيعيد إضافتها
+                client.srem(PENDING_KEY, conversation_id)
+                updated = _flush_conversation(client, conversation_id)
+            except Exception as e:
+                # تبقى الإيصالات في المخزن وتُعاد المحاولة في التشغيل التالي
+                logger.error(f"Read receipts of conversation {conversation_id} not flushed: {e}")
+                try:
+                    client.sadd(PENDING_KEY, conversation_id)
+                except RedisError:
+                    pass
+                continue
+            if updated is not None:
+                stats['conversations'] += 1
+                stats['messages'] += updated
+    finally:
+        try:
+            lock.release()
+        except Exception as e:
+            logger.warning(f"Read receipt flush lock expired before release: {e}")
+    return stats
@@ -0,0 +1,105 @@
+"""
+سياسة الاحتفاظ بإشعارات النظام وحذف المنتهي منها على دفعات - منصة نائبك.كوم
+
+NOTIFICATION_RETENTION maps a notification type (or 'default') to the number
+of days to keep read and unread notifications:
+
+    {'default': {'read': 90, 'unread': 365}, 'new_message': {'read': 30, 'unread': 180}}
+
+Read notifications age from read_at, unread ones from created_at. A value of
+None keeps them forever.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SystemNotification
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION = {'default': {'read': 90, 'unread': 365}}
+
+
+def policy_for(notification_type):
+    """أيام الاحتفاظ {'read': ..., 'unread': ...} لنوع الإشعار"""
+    policies = getattr(settings, 'NOTIFICATION_RETENTION', DEFAULT_RETENTION)
+    policy = dict(policies.get('default', DEFAULT_RETENTION['default']))
+    policy.update(policies.get(notification_type, {}))
+    return policy
+
+
+def expired_notifications(notification_type, state, now=None):
+    """الإشعارات المنتهية لنوع وحالة قراءة معينين، أو None إذا لم يكن لها حد"""
+    days = policy_for(notification_type).get(state)
+    if days is None:
+        return None
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    queryset = SystemNotification.objects.filter(notification_type=notification_type)
+    if state == 'read':
+        return queryset.filter(is_read=True, read_at__lt=cutoff)
+    return queryset.filter(is_read=False, created_at__lt=cutoff)
+
+
+def purge_notifications(batch_size=None, pause=None, dry_run=False, now=None):
+    """
+    حذف الإشعارات المنتهية على دفعات صغيرة مرتبة حسب (created_at, id).
+
+    المفتاح الأساسي UUID عشوائي فلا يصلح للترتيب؛ كل دفعة تبدأ بعد آخر صف
+    في الدفعة السابقة (keyset) بدل المرور مجدداً على ما حُذف.
+
+    كل دفعة معاملة قصيرة مستقلة، مع توقف بين الدفعات حتى لا تُحجز الأقفال
+    طويلاً ولا يتضخم سجل WAL. يعيد عدد الصفوف المحذوفة لكل نوع وحالة.
+    """
+    batch_size = batch_size or getattr(settings, 'RETENTION_PURGE_BATCH_SIZE', 1000)
+    pause = getattr(settings, 'RETENTION_PURGE_PAUSE', 0.1) if pause is None else pause
+    now = now or timezone.now()
+    started = time.monotonic()
+
+    stats = {'removed': {}, 'total': 0, 'batches': 0}
+    for notification_type, _ in SystemNotification.NOTIFICATION_TYPES:
+        for state in ('read', 'unread'):
+            queryset = expired_notifications(notification_type, state, now=now)
+            if queryset is None:
+                continue
+            label = f'{notification_type}:{state}'
+
+            if dry_run:
+                stats['removed'][label] = queryset.count()
+                stats['total'] += stats['removed'][label]
+                continue
+
+            removed = 0
+            cursor = None
+            while True:
+                batch = queryset
+                if cursor is not None:
+                    created_at, last_id = cursor
+                    batch = batch.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=last_id))
+                rows = list(batch.order_by('created_at', 'id').values_list('created_at', 'id')[:batch_size])
+                if not rows:
+                    break
+                cursor = rows[-1]
+                ids = [pk for _, pk in rows]
+                deleted = SystemNotification.objects.filter(pk__in=ids).delete()[1]
+                removed += deleted.get(SystemNotification._meta.label, 0)
+                stats['batches'] += 1
+                if len(ids) < batch_size:
+                    break
+                if pause:
+                    time.sleep(pause)
+
+            if removed:
+                stats['removed'][label] = removed
+                stats['total'] += removed
+
+    stats['elapsed'] = round(time.monotonic() - started, 2)
+    logger.info(
+        f"Notification retention {'dry run' if dry_run else 'purge'}: "
+        f"{stats['total']} rows in {stats['batches']} batches ({stats['elapsed']}s) {stats['removed']}"
+    )
+    return stats
@@ -7,8 +7,10 @@ from django.contrib.auth.models import User
 from django.core.validators import MaxLengthValidator
 from .models import (
     UserProfile, Conversation, Message, MessageReport, 
-    MessageStatistics, SystemNotification
+    MessageStatistics, SystemNotification, NotificationBroadcast, ReportAggregate
 )
+from . import receipts as read_receipts
+from .archive import last_message as archived_last_message
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -31,7 +33,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'user_type', 'phone', 'avatar', 'full_name',
             'representative_id', 'district', 'governorate',
-            'email_notifications', 'sms_notifications',
+            'email_notifications', 'sms_notifications', 'notification_mode',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
@@ -46,7 +48,7 @@ class UserProfileCreateSerializer(serializers.ModelSerializer):
         fields = [
             'user_id', 'user_type', 'phone', 'avatar',
             'representative_id', 'district', 'governorate',
-            'email_notifications', 'sms_notifications'
+            'email_notifications', 'sms_notifications', 'notification_mode'
         ]
     
     def create(self, validated_data):
@@ -62,6 +64,9 @@ class MessageSerializer(serializers.ModelSerializer):
     sender_profile = serializers.SerializerMethodField()
     is_from_citizen = serializers.ReadOnlyField()
     is_from_representative = serializers.ReadOnlyField()
+    # مشتقة من علامة قراءة المستلم مع الإبقاء على أسماء الحقول السابقة
+    is_read = serializers.BooleanField(source='read_by_recipient', read_only=True)
+    read_at = serializers.DateTimeField(source='read_by_recipient_at', read_only=True)
     
     class Meta:
         model = Message
@@ -122,6 +127,27 @@ class MessageCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class BulkMessageCreateSerializer(serializers.Serializer):
+    """Serializer لإرسال نفس الرد إلى عدة محادثات"""
+    content = serializers.CharField(validators=[MaxLengthValidator(500)])
+    conversation_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=200,
+        help_text="معرفات المحادثات المراد الرد فيها"
+    )
+    
+    def validate_content(self, value):
+        """التحقق من محتوى الرسالة"""
+        if len(value.strip()) == 0:
+            raise serializers.ValidationError("محتوى الرسالة لا يمكن أن يكون فارغاً")
+        return value.strip()
+    
+    def validate_conversation_ids(self, value):
+        """إزالة المعرفات المكررة مع الحفاظ على الترتيب"""
+        return list(dict.fromkeys(value))
+
+
 class ConversationSerializer(serializers.ModelSerializer):
     """Serializer للمحادثات"""
     citizen = UserSerializer(read_only=True)
@@ -137,11 +163,11 @@ class ConversationSerializer(serializers.ModelSerializer):
             'id', 'citizen', 'representative', 'citizen_profile', 'representative_profile',
             'subject', 'total_messages', 'last_message_at', 'last_message',
             'is_closed', 'closed_at', 'citizen_rating', 'citizen_feedback',
-            'unread_count', 'created_at', 'updated_at'
+            'is_archived', 'unread_count', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'total_messages', 'last_message_at', 'is_closed', 
-            'closed_at', 'created_at', 'updated_at'
+            'closed_at', 'is_archived', 'created_at', 'updated_at'
         ]
     
     def get_citizen_profile(self, obj):
@@ -171,15 +197,12 @@ class ConversationSerializer(serializers.ModelSerializer):
     
     def get_last_message(self, obj):
         """الحصول على آخر رسالة"""
-        last_message = obj.messages.last()
+        last_message = obj.messages.visible().last()
         if last_message:
-            return {
-                'id': str(last_message.id),
-                'content': last_message.content[:100] + "..." if len(last_message.content) > 100 else last_message.content,
-                'sender': last_message.sender.get_full_name() or last_message.sender.username,
-                'created_at': last_message.created_at,
-                'is_read': last_message.is_read
-            }
+            return last_message.preview()
+        if obj.is_archived:
+            # الملخص محفوظ في صف الأرشيف، فلا يُفك ضغط الرسائل لكل محادثة
+            return archived_last_message(obj)
         return None
     
     def get_unread_count(self, obj):
@@ -188,12 +211,10 @@ class ConversationSerializer(serializers.ModelSerializer):
         if not request or not request.user:
             return 0
         
-        user = request.user
-        if user == obj.citizen:
-            return obj.unread_count_for_citizen
-        elif user == obj.representative:
-            return obj.unread_count_for_representative
-        return 0
+        # إيصالات القراءة المعلقة تُقرأ مرة واحدة لكل طلب وتُستثنى من العدد
+        if 'pending_receipts' not in self.context:
+            self.context['pending_receipts'] = read_receipts.pending_for_reader(request.user)
+        return obj.unread_count_for(request.user, self.context['pending_receipts'])
 
 
 class ConversationCreateSerializer(serializers.ModelSerializer):
@@ -291,6 +312,26 @@ class MessageReportSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class ReportAggregateSerializer(serializers.ModelSerializer):
+    """Serializer لعنصر في قائمة مراجعة الإبلاغات (رسالة واحدة مع ملخص إبلاغاتها)"""
+    message_content = serializers.CharField(source='message.content', read_only=True)
+    message_sender = UserSerializer(source='message.sender', read_only=True)
+    conversation = serializers.UUIDField(source='message.conversation_id', read_only=True)
+    conversation_subject = serializers.CharField(source='message.conversation.subject', read_only=True)
+    spam_cluster = serializers.UUIDField(source='message.spam_cluster_id', read_only=True)
+    is_hidden = serializers.BooleanField(source='message.is_hidden', read_only=True)
+    hidden_at = serializers.DateTimeField(source='message.hidden_at', read_only=True)
+    
+    class Meta:
+        model = ReportAggregate
+        fields = [
+            'message', 'message_content', 'message_sender', 'conversation', 'conversation_subject',
+            'spam_cluster', 'is_hidden', 'hidden_at', 'report_count', 'pending_count', 'reason_counts', 'severity',
+            'first_reported_at', 'last_reported_at', 'priority'
+        ]
+        read_only_fields = fields
+
+
 class MessageStatisticsSerializer(serializers.ModelSerializer):
     """Serializer لإحصائيات الرسائل"""
     user = UserSerializer(read_only=True)
@@ -305,21 +346,44 @@ class MessageStatisticsSerializer(serializers.ModelSerializer):
 
 
 class SystemNotificationSerializer(serializers.ModelSerializer):
-    """Serializer لإشعارات النظام"""
+    """Serializer لإشعارات النظام (الشخصية والجماعية المشتركة)"""
     user = UserSerializer(read_only=True)
+    is_broadcast = serializers.SerializerMethodField()
     
     class Meta:
         model = SystemNotification
         fields = [
             'id', 'user', 'notification_type', 'title', 'message', 'related_object_id',
-            'action_url', 'is_read', 'read_at', 'created_at'
+            'action_url', 'is_read', 'read_at', 'event_count', 'is_broadcast', 'created_at'
+        ]
+        read_only_fields = ['id', 'user', 'is_read', 'read_at', 'event_count', 'created_at']
+    
+    def get_is_broadcast(self, obj):
+        """هل الإشعار جماعي مشترك"""
+        return isinstance(obj, NotificationBroadcast)
+
+
+class NotificationBroadcastSerializer(serializers.ModelSerializer):
+    """Serializer للإشعارات الجماعية"""
+    progress = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = NotificationBroadcast
+        fields = [
+            'id', 'notification_type', 'title', 'message', 'action_url',
+            'target_user_type', 'target_governorate', 'delivery_mode',
+            'status', 'total_recipients', 'delivered_count', 'progress',
+            'started_at', 'completed_at', 'last_error', 'created_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'total_recipients', 'delivered_count',
+            'started_at', 'completed_at', 'last_error', 'created_at'
         ]
-        read_only_fields = ['id', 'user', 'is_read', 'read_at', 'created_at']
 
 
 class ConversationDetailSerializer(ConversationSerializer):
-    """Serializer تفصيلي للمحادثة مع الرسائل"""
-    messages = MessageSerializer(many=True, read_only=True)
+    """Serializer تفصيلي للمحادثة مع الرسائل (من الأرشيف إذا كانت مؤرشفة)"""
+    messages = MessageSerializer(source='message_history', many=True, read_only=True)
     
     class Meta(ConversationSerializer.Meta):
         fields = ConversationSerializer.Meta.fields + ['messages']
@@ -0,0 +1,124 @@
+"""
+SMS backends for naebak-messaging-service
+Mirrors django.core.mail: pick a backend with SMS_BACKEND and reuse one
+connection for a whole batch of messages
+"""
+
+import logging
+from typing import List
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Messages sent through LocMemBackend (used by the test suite)
+outbox: List['SMSMessage'] = []
+
+
+class SMSMessage:
+    """A single text message"""
+
+    def __init__(self, to: str, body: str):
+        self.to = to
+        self.body = body
+
+    def __repr__(self):
+        return f"SMSMessage(to={self.to!r})"
+
+
+class BaseSMSBackend:
+    """Common open/close/context-manager behaviour"""
+
+    def __init__(self, fail_silently: bool = False, **kwargs):
+        self.fail_silently = fail_silently
+
+    def open(self):
+        return False
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send_messages(self, messages: List[SMSMessage]) -> int:
+        raise NotImplementedError
+
+
+class ConsoleBackend(BaseSMSBackend):
+    """Log messages instead of sending them (development default)"""
+
+    def send_messages(self, messages):
+        for message in messages:
+            logger.info(f"SMS to {message.to}: {message.body}")
+        return len(messages)
+
+
+class LocMemBackend(BaseSMSBackend):
+    """Keep messages in messages.sms.outbox"""
+
+    def send_messages(self, messages):
+        outbox.extend(messages)
+        return len(messages)
+
+
+class TwilioBackend(BaseSMSBackend):
+    """Send through the Twilio REST API over one keep-alive HTTP session"""
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently)
+        self.account_sid = kwargs.get('account_sid', getattr(settings, 'TWILIO_ACCOUNT_SID', ''))
+        self.auth_token = kwargs.get('auth_token', getattr(settings, 'TWILIO_AUTH_TOKEN', ''))
+        self.from_number = kwargs.get('from_number', getattr(settings, 'TWILIO_PHONE_NUMBER', ''))
+        self.timeout = getattr(settings, 'SERVICE_TIMEOUT', 30)
+        self.session = None
+
+    @property
+    def url(self):
+        return f"https://api.twilio.com/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+
+    def open(self):
+        if self.session is not None:
+            return False
+        self.session = requests.Session()
+        self.session.auth = (self.account_sid, self.auth_token)
+        return True
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    def send_messages(self, messages):
+        new_session = self.open()
+        sent = 0
+        try:
+            for message in messages:
+                try:
+                    response = self.session.post(
+                        self.url,
+                        data={'From': self.from_number, 'To': message.to, 'Body': message.body},
+                        timeout=self.timeout,
+                    )
+                    response.raise_for_status()
+                    sent += 1
+                except requests.RequestException as e:
+                    if not self.fail_silently:
+                        raise
+                    logger.error(f"SMS to {message.to} failed: {e}")
+        finally:
+            if new_session:
+                self.close()
+        return sent
+
+
+def get_connection(backend: str = None, fail_silently: bool = False, **kwargs) -> BaseSMSBackend:
+    """Instantiate the configured SMS backend"""
+    backend_class = import_string(backend or getattr(settings, 'SMS_BACKEND', 'messages.sms.ConsoleBackend'))
+    return backend_class(fail_silently=fail_silently, **kwargs)
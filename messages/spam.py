@@ -0,0 +1,395 @@
+"""
+Near-duplicate spam detection for naebak-messaging-service
+
+A periodic worker walks new messages in creation order (a cursor kept in the
+cache), so nothing runs on the write path. Each run re-reads the last
+SPAM_SCAN_LOOKBACK seconds before the cursor, because a message whose
+transaction commits late can carry a created_at the cursor has already
+passed; messages the index already holds are skipped. A cache.add() lock
+keeps overlapping beat runs from scanning the same batch twice. Each message is normalised, cut
+into character shingles and reduced to a MinHash signature. Signatures are
+banded into a locality-sensitive hash index (Redis sorted sets, or an
+in-process index without Redis) that only keeps the last SPAM_INDEX_WINDOW
+seconds. Candidates sharing a band are verified by estimated Jaccard
+similarity; when the near-duplicates of a text come from SPAM_CLUSTER_MIN_SIZE
+distinct senders they are grouped in a SpamCluster with one UPDATE.
+
+Work per message is constant (fixed shingle/permutation/band counts, and at
+most SPAM_MAX_CANDIDATES of the most recent bucket members are verified), so
+a run is linear in the number of new messages even while a large campaign
+fills the buckets. Later copies only need to match a few recent members:
+those already belong to the campaign's cluster, which the copies then join.
+"""
+
+import hashlib
+import logging
+import random
+import re
+import struct
+import time
+import unicodedata
+from collections import deque, defaultdict
+from itertools import islice
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import redis_client
+from .models import Message, SpamCluster
+
+logger = logging.getLogger(__name__)
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 5
+
+CURSOR_KEY = 'spam:cursor'
+LOCK_KEY = 'spam:lock'
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_random = random.Random(20240601)
+PERMUTATIONS = [
+    (_random.randrange(1, _MERSENNE_PRIME), _random.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+Signature = Tuple[int, ...]
+
+# Arabic diacritics and tatweel, and letter variants commonly swapped to dodge filters
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_LETTER_VARIANTS = str.maketrans({
+    '\u0623': '\u0627', '\u0625': '\u0627', '\u0622': '\u0627', '\u0671': '\u0627',  # hamza/madda alef -> alef
+    '\u0649': '\u064a', '\u0626': '\u064a', '\u0629': '\u0647', '\u0624': '\u0648',  # ى ئ -> ي, ة -> ه, ؤ -> و
+})
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = _DIACRITICS.sub('', text).translate(_LETTER_VARIANTS)
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash(items: Iterable[str]) -> Signature:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'little')
+        for item in items
+    ]
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in PERMUTATIONS
+    )
+
+
+def signature_for(content: str) -> Optional[Signature]:
+    """MinHash of the normalised text, or None for texts too short to judge"""
+    text = normalize(content)
+    if len(text) < getattr(settings, 'SPAM_MIN_CONTENT_LENGTH', 20):
+        return None
+    return minhash(shingles(text))
+
+
+def similarity(first: Signature, second: Signature) -> float:
+    """Estimated Jaccard similarity of the two shingle sets"""
+    return sum(a == b for a, b in zip(first, second)) / NUM_PERMUTATIONS
+
+
+def band_keys(signature: Signature) -> List[str]:
+    keys = []
+    for band in range(BANDS):
+        rows = struct.pack(f'<{ROWS}I', *signature[band * ROWS:(band + 1) * ROWS])
+        keys.append(f'spam:lsh:{band}:{hashlib.blake2b(rows, digest_size=8).hexdigest()}')
+    return keys
+
+
+def _most_recent(scored: Dict[str, float], limit: int) -> List[str]:
+    """The `limit` members with the latest insertion scores, most recent first"""
+    return sorted(scored, key=scored.get, reverse=True)[:limit]
+
+
+def max_candidates() -> int:
+    return getattr(settings, 'SPAM_MAX_CANDIDATES', 50)
+
+
+def _pack(signature: Signature) -> bytes:
+    return struct.pack(f'<{NUM_PERMUTATIONS}I', *signature)
+
+
+def _unpack(value: bytes) -> Signature:
+    return struct.unpack(f'<{NUM_PERMUTATIONS}I', value)
+
+
+class RedisLSHIndex:
+    """
+    Band buckets as sorted sets scored by insertion time, plus one key per
+    signature. Lookups and inserts for a whole batch are single pipelines.
+    """
+
+    def __init__(self, client, window: int):
+        self.client = client
+        self.window = window
+
+    def candidates(self, signatures: Dict[str, Signature], limit: int) -> Dict[str, List[str]]:
+        cutoff = time.time() - self.window
+        ids = list(signatures)
+        pipe = self.client.pipeline(transaction=False)
+        for message_id in ids:
+            for key in band_keys(signatures[message_id]):
+                pipe.zrevrangebyscore(key, '+inf', cutoff, start=0, num=limit, withscores=True)
+        results = pipe.execute()
+
+        found = {}
+        for position, message_id in enumerate(ids):
+            scored = {}
+            for bucket in results[position * BANDS:(position + 1) * BANDS]:
+                for member, score in bucket:
+                    scored[member.decode() if isinstance(member, bytes) else member] = score
+            found[message_id] = _most_recent(scored, limit)
+        return found
+
+    def signatures(self, ids: Iterable[str]) -> Dict[str, Signature]:
+        ids = list(ids)
+        if not ids:
+            return {}
+        values = self.client.mget([f'spam:sig:{message_id}' for message_id in ids])
+        return {message_id: _unpack(value) for message_id, value in zip(ids, values) if value is not None}
+
+    def add(self, signatures: Dict[str, Signature]) -> None:
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for message_id, signature in signatures.items():
+            pipe.set(f'spam:sig:{message_id}', _pack(signature), ex=self.window)
+            for key in band_keys(signature):
+                pipe.zadd(key, {message_id: now})
+                pipe.zremrangebyscore(key, '-inf', now - self.window)
+                pipe.expire(key, self.window)
+        pipe.execute()
+
+
+class LocalLSHIndex:
+    """Same interface kept in process memory, for deployments without Redis"""
+
+    def __init__(self, window: int):
+        self.window = window
+        # bucket members in insertion order, mapped to their insertion time
+        self.buckets: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.entries: Dict[str, Signature] = {}
+        self.order: deque = deque()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.window
+        while self.order and self.order[0][0] < cutoff:
+            _, message_id = self.order.popleft()
+            signature = self.entries.pop(message_id, None)
+            if signature is None:
+                continue
+            for key in band_keys(signature):
+                self.buckets[key].pop(message_id, None)
+                if not self.buckets[key]:
+                    del self.buckets[key]
+
+    def candidates(self, signatures: Dict[str, Signature], limit: int) -> Dict[str, List[str]]:
+        self._expire()
+        found = {}
+        for message_id, signature in signatures.items():
+            scored = {}
+            for key in band_keys(signature):
+                scored.update(islice(reversed(self.buckets.get(key, {}).items()), limit))
+            found[message_id] = _most_recent(scored, limit)
+        return found
+
+    def signatures(self, ids: Iterable[str]) -> Dict[str, Signature]:
+        return {message_id: self.entries[message_id] for message_id in ids if message_id in self.entries}
+
+    def add(self, signatures: Dict[str, Signature]) -> None:
+        now = time.time()
+        for message_id, signature in signatures.items():
+            if message_id in self.entries:
+                continue
+            self.entries[message_id] = signature
+            self.order.append((now, message_id))
+            for key in band_keys(signature):
+                self.buckets[key][message_id] = now
+
+    def clear(self) -> None:
+        self.buckets.clear()
+        self.entries.clear()
+        self.order.clear()
+
+
+local_index = LocalLSHIndex(window=getattr(settings, 'SPAM_INDEX_WINDOW', 3 * 86400))
+
+
+def get_index():
+    client = redis_client()
+    if client is None:
+        return local_index
+    return RedisLSHIndex(client, getattr(settings, 'SPAM_INDEX_WINDOW', 3 * 86400))
+
+
+def _groups(edges: Iterable[Tuple[str, str]]) -> List[Set[str]]:
+    """Connected components of the near-duplicate graph (union-find)"""
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for first, second in edges:
+        parent[find(first)] = find(second)
+
+    components = defaultdict(set)
+    for node in list(parent):
+        components[find(node)].add(node)
+    return list(components.values())
+
+
+def _flag(message_ids: Set[str]) -> Optional[SpamCluster]:
+    """Attach a group of near-duplicates to a cluster, if it is big enough or already known"""
+    rows = list(
+        Message.objects.filter(pk__in=message_ids)
+        .values('pk', 'content', 'sender_id', 'spam_cluster_id')
+        .order_by('created_at')
+    )
+    cluster_ids = list(dict.fromkeys(row['spam_cluster_id'] for row in rows if row['spam_cluster_id']))
+    if not cluster_ids and len({row['sender_id'] for row in rows}) < getattr(
+        settings, 'SPAM_CLUSTER_MIN_SIZE', 5
+    ):
+        return None
+
+    with transaction.atomic():
+        if cluster_ids:
+            cluster = SpamCluster.objects.get(pk=cluster_ids[0])
+            # The new messages bridged two known clusters: keep the oldest
+            if cluster_ids[1:]:
+                Message.objects.filter(spam_cluster_id__in=cluster_ids[1:]).update(spam_cluster=cluster)
+                SpamCluster.objects.filter(pk__in=cluster_ids[1:]).delete()
+        else:
+            cluster = SpamCluster.objects.create(sample_content=rows[0]['content'])
+
+        Message.objects.filter(
+            pk__in=[row['pk'] for row in rows if row['spam_cluster_id'] != cluster.pk]
+        ).update(spam_cluster=cluster)
+        cluster.refresh_counts()
+    return cluster
+
+
+def _next_batch(cursor, batch_size: int) -> List[dict]:
+    created_at, last_id = cursor
+    queryset = Message.objects.filter(is_system_message=False).exclude(
+        sender__userprofile__user_type='representative'
+    )
+    if last_id is None:
+        queryset = queryset.filter(created_at__gt=created_at)
+    else:
+        queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=last_id))
+    return list(queryset.order_by('created_at', 'id').values('id', 'content', 'created_at')[:batch_size])
+
+
+def scan_new_messages(batch_size: int = None) -> Dict[str, int]:
+    """
+    Fingerprint messages created since the last run and flag near-duplicate
+    clusters. Representatives' messages (bulk replies) and system messages
+    are not scanned.
+    """
+    stats = {'scanned': 0, 'flagged': 0, 'clusters': 0}
+    if not cache.add(LOCK_KEY, 1, timeout=getattr(settings, 'SPAM_SCAN_LOCK_TIMEOUT', 600)):
+        logger.info("Spam scan skipped: another run is in progress")
+        return stats
+    try:
+        return _scan(stats, batch_size or getattr(settings, 'SPAM_DETECTION_BATCH_SIZE', 500))
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def _scan(stats: Dict[str, int], batch_size: int) -> Dict[str, int]:
+    threshold = getattr(settings, 'SPAM_SIMILARITY_THRESHOLD', 0.8)
+    limit = max_candidates()
+    window = getattr(settings, 'SPAM_INDEX_WINDOW', 3 * 86400)
+    lookback = getattr(settings, 'SPAM_SCAN_LOOKBACK', 120)
+    index = get_index()
+
+    resume_from = cache.get(CURSOR_KEY)
+    if resume_from is None:
+        cursor = (timezone.now() - timedelta(seconds=window), None)
+    else:
+        cursor = (resume_from[0] - timedelta(seconds=lookback), None)
+    clusters = set()
+
+    while True:
+        rows = _next_batch(cursor, batch_size)
+        if not rows:
+            break
+
+        signatures = {}
+        unsigned = 0
+        for row in rows:
+            signature = signature_for(row['content'])
+            if signature is not None:
+                signatures[str(row['id'])] = signature
+            elif resume_from is None or (row['created_at'], row['id']) > resume_from:
+                unsigned += 1
+        # The lookback re-reads messages an earlier run already fingerprinted
+        for message_id in index.signatures(signatures):
+            del signatures[message_id]
+        stats['scanned'] += len(signatures) + unsigned
+
+        # Candidates from earlier in this batch first (the most recent), then
+        # from earlier batches (the index), capped at `limit` per message
+        from_index = index.candidates(signatures, limit)
+        in_batch = defaultdict(dict)
+        candidates = {}
+        for position, (message_id, signature) in enumerate(signatures.items()):
+            scored = {}
+            for key in band_keys(signature):
+                scored.update(islice(reversed(in_batch[key].items()), limit))
+                in_batch[key][message_id] = position
+            found = _most_recent(scored, limit)
+            seen = set(found)
+            found += [c for c in from_index[message_id] if c not in seen][:limit - len(found)]
+            candidates[message_id] = found
+
+        known = dict(signatures)
+        known.update(index.signatures(
+            {c for found in candidates.values() for c in found if c not in signatures}
+        ))
+        edges = [
+            (message_id, candidate)
+            for message_id, found in candidates.items()
+            for candidate in found
+            if candidate in known and similarity(signatures[message_id], known[candidate]) >= threshold
+        ]
+        index.add(signatures)
+
+        for group in _groups(edges):
+            cluster = _flag(group)
+            if cluster is not None:
+                clusters.add(cluster.pk)
+
+        cursor = (rows[-1]['created_at'], rows[-1]['id'])
+        if resume_from is None or cursor > resume_from:
+            cache.set(CURSOR_KEY, cursor, timeout=None)
+        if len(rows) < batch_size:
+            break
+
+    if clusters:
+        stats['clusters'] = len(clusters)
+        stats['flagged'] = Message.objects.filter(spam_cluster_id__in=clusters).count()
+        logger.warning(f"Spam detection flagged {stats['flagged']} messages in {stats['clusters']} clusters")
+    return stats
@@ -0,0 +1,79 @@
+"""
+المهام غير المتزامنة لخدمة الرسائل - منصة نائبك.كوم
+"""
+
+from celery import shared_task
+
+from . import (
+    archive, broadcasts, bulk_actions, digests, dispatch, notifications, outbox, partitioning, receipts, retention, spam
+)
+
+
+@shared_task(ignore_result=True)
+def drain_outbox():
+    """تسليم أحداث صندوق الصادر إلى الخدمات الأخرى"""
+    return outbox.drain_outbox()
+
+
+@shared_task(ignore_result=True)
+def flush_read_receipts():
+    """كتابة إيصالات القراءة المجمعة في قاعدة البيانات"""
+    return receipts.flush()
+
+
+@shared_task(ignore_result=True)
+def fan_out_broadcast(broadcast_id):
+    """إرسال إشعار جماعي على دفعات"""
+    broadcasts.fan_out(broadcast_id)
+
+
+@shared_task(ignore_result=True)
+def run_admin_bulk_job(job_id):
+    """تنفيذ جزء من إجراء إداري جماعي ثم جدولة الجزء التالي"""
+    if bulk_actions.run(job_id):
+        run_admin_bulk_job.delay(job_id)
+
+
+@shared_task(ignore_result=True)
+def notify_new_messages(conversation_id, recipient_id):
+    """تحديث إشعار الرسائل الجديدة للمستلم"""
+    notifications.notify_new_messages(conversation_id, recipient_id)
+
+
+@shared_task(ignore_result=True)
+def dispatch_notifications():
+    """إرسال إشعارات البريد الإلكتروني والرسائل النصية المجمعة"""
+    return dispatch.dispatch_pending()
+
+
+@shared_task(ignore_result=True)
+def build_daily_digests():
+    """إنشاء الملخص اليومي للمستخدمين في وضع الملخص"""
+    return digests.build_daily_digests()
+
+
+@shared_task(ignore_result=True)
+def purge_expired_notifications():
+    """حذف الإشعارات المنتهية حسب سياسة الاحتفاظ"""
+    return retention.purge_notifications()
+
+
+@shared_task(ignore_result=True)
+def archive_closed_conversations():
+    """أرشفة المحادثات المغلقة القديمة"""
+    return archive.archive_closed_conversations()
+
+
+@shared_task(ignore_result=True)
+def maintain_message_partitions():
+    """إنشاء أقسام الأشهر القادمة لجدول الرسائل وفصل المنتهية"""
+    return {
+        'created': partitioning.ensure_partitions(),
+        'detached': partitioning.detach_expired(),
+    }
+
+
+@shared_task(ignore_result=True)
+def scan_spam():
+    """فحص الرسائل الجديدة بحثاً عن حملات رسائل مزعجة متكررة"""
+    return spam.scan_new_messages()
@@ -0,0 +1,158 @@
+"""
+Token-bucket throttling and the open-conversation quota for naebak-messaging-service
+
+Each (action, user) pair has a bucket in Redis holding its remaining tokens
+and the time it was last refilled. A Lua script refills, checks and takes a
+token atomically, so a request costs a single round trip no matter how many
+workers share the bucket.
+"""
+
+import logging
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+from .cache import redis_client
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+    allowed = 1
+else
+    wait = (requested - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: Optional[str]) -> Optional[Tuple[int, float]]:
+    """'<requests>/<period>' -> (bucket capacity, tokens refilled per second)"""
+    if not rate:
+        return None
+    requests, period = rate.split('/')
+    requests = int(requests)
+    return requests, requests / PERIODS[period[0]]
+
+
+def take_token(key: str, capacity: int, refill_rate: float, requested: int = 1) -> Tuple[bool, float]:
+    """
+    Take `requested` tokens from the bucket at `key`.
+
+    Returns (allowed, seconds until enough tokens are available). Without
+    Redis, or if Redis fails, requests are allowed rather than rejected.
+    """
+    client = redis_client()
+    if client is None:
+        return True, 0.0
+    try:
+        allowed, wait = client.register_script(TOKEN_BUCKET_SCRIPT)(
+            keys=[f'throttle:{key}'], args=[capacity, refill_rate, time.time(), requested]
+        )
+    except Exception as e:
+        logger.error(f"Token bucket check failed for {key}: {e}")
+        return True, 0.0
+    return bool(int(allowed)), float(wait)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle backed by take_token(), one bucket per user and scope.
+
+    Rates come from settings.MESSAGING_THROTTLE_RATES[scope][user_type];
+    a missing or None rate disables the limit. Staff are not throttled.
+    """
+
+    scope = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_rate(self, user) -> Optional[Tuple[int, float]]:
+        rates = getattr(settings, 'MESSAGING_THROTTLE_RATES', {}).get(self.scope, {})
+        user_type = getattr(getattr(user, 'userprofile', None), 'user_type', None)
+        return parse_rate(rates.get(user_type, rates.get('default')))
+
+    def allow_request(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated or user.is_staff:
+            return True
+        rate = self.get_rate(user)
+        if rate is None:
+            return True
+
+        allowed, wait = take_token(f'{self.scope}:{user.pk}', *rate)
+        self.retry_after = wait
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class MessageSendThrottle(TokenBucketThrottle):
+    scope = 'message_send'
+
+
+class ConversationCreateThrottle(TokenBucketThrottle):
+    scope = 'conversation_create'
+
+
+class ReportCreateThrottle(TokenBucketThrottle):
+    scope = 'report_create'
+
+
+# Open-conversation quota (settings.MAX_CONVERSATIONS_PER_USER)
+
+def _quota_key(user_id) -> str:
+    return f'open_conversations:{user_id}'
+
+
+def open_conversation_count(user) -> int:
+    """Open conversations started by the citizen, from the cached counter when present"""
+    from .models import Conversation
+
+    key = _quota_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Conversation.objects.filter(citizen=user, is_closed=False).count()
+        cache.add(key, count, timeout=getattr(settings, 'CONVERSATION_QUOTA_CACHE_TIMEOUT', 3600))
+    return count
+
+
+def conversation_quota_exceeded(user) -> bool:
+    limit = getattr(settings, 'MAX_CONVERSATIONS_PER_USER', None)
+    return bool(limit) and open_conversation_count(user) >= limit
+
+
+def conversation_opened(user_id) -> None:
+    try:
+        cache.incr(_quota_key(user_id))
+    except ValueError:
+        # Not cached: the next read counts from the database
+        pass
+
+
+def forget_open_conversations(*user_ids) -> None:
+    """Drop the cached counters after conversations were closed or reopened"""
+    cache.delete_many([_quota_key(user_id) for user_id in user_ids])
@@ -6,7 +6,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     UserProfileViewSet, ConversationViewSet, MessageViewSet,
-    MessageReportViewSet, SystemNotificationViewSet, UserStatsViewSet
+    MessageReportViewSet, ModerationQueueViewSet, SystemNotificationViewSet, NotificationBroadcastViewSet,
+    UserStatsViewSet
 )
 
 # إنشاء router للـ ViewSets
@@ -15,7 +16,9 @@ router.register(r'profiles', UserProfileViewSet, basename='userprofile')
 router.register(r'conversations', ConversationViewSet, basename='conversation')
 router.register(r'messages', MessageViewSet, basename='message')
 router.register(r'reports', MessageReportViewSet, basename='messagereport')
+router.register(r'moderation-queue', ModerationQueueViewSet, basename='moderation-queue')
 router.register(r'notifications', SystemNotificationViewSet, basename='systemnotification')
+router.register(r'broadcasts', NotificationBroadcastViewSet, basename='notificationbroadcast')
 router.register(r'stats', UserStatsViewSet, basename='userstats')
 
 urlpatterns = [
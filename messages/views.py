@@ -3,28 +3,38 @@ Views لخدمة الرسائل - منصة نائبك.كوم
 """
 
 from datetime import datetime, timedelta
-from django.db.models import Q, Count, Avg, F
+from django.db.models import Count, Avg, F, Value
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from rest_framework import viewsets, status, permissions, serializers
+from rest_framework import viewsets, mixins, status, permissions, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
 from .models import (
-    UserProfile, Conversation, Message, MessageReport, 
-    MessageStatistics, SystemNotification
+    UserProfile, Conversation, ConversationParticipant, Message, MessageReport, 
+    MessageStatistics, SystemNotification, NotificationBroadcast
 )
 from .serializers import (
     UserProfileSerializer, UserProfileCreateSerializer,
     ConversationSerializer, ConversationCreateSerializer, ConversationDetailSerializer,
-    MessageSerializer, MessageCreateSerializer,
-    MessageReportSerializer, MessageStatisticsSerializer,
-    SystemNotificationSerializer, UserStatsSerializer, ConversationStatsSerializer
+    MessageSerializer, MessageCreateSerializer, BulkMessageCreateSerializer,
+    MessageReportSerializer, ReportAggregateSerializer, MessageStatisticsSerializer,
+    SystemNotificationSerializer, NotificationBroadcastSerializer, UserStatsSerializer, ConversationStatsSerializer
 )
+from . import broadcasts, moderation
+from .idempotency import IdempotentCreateMixin
+from .notifications import schedule_new_message
+from .throttling import (
+    ConversationCreateThrottle, MessageSendThrottle, ReportCreateThrottle,
+    conversation_quota_exceeded
+)
+from . import receipts as read_receipts
 from .filters import ConversationFilter, MessageFilter, MessageReportFilter, SystemNotificationFilter
 
 
@@ -90,7 +100,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
             )
 
 
-class ConversationViewSet(viewsets.ModelViewSet):
+class ConversationViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     """ViewSet لإدارة المحادثات"""
     
     permission_classes = [IsAuthenticated]
@@ -108,16 +118,19 @@ class ConversationViewSet(viewsets.ModelViewSet):
             return ConversationDetailSerializer
         return ConversationSerializer
     
+    def get_throttles(self):
+        if self.action == 'create':
+            return [ConversationCreateThrottle()]
+        return super().get_throttles()
+    
     def get_queryset(self):
         """فلترة المحادثات حسب المستخدم"""
         user = self.request.user
         if user.is_staff:
             return Conversation.objects.all()
         
-        # المستخدم يرى المحادثات التي يشارك فيها فقط
-        return Conversation.objects.filter(
-            Q(citizen=user) | Q(representative=user)
-        ).distinct()
+        # المستخدم يرى المحادثات التي يشارك فيها فقط (صف مشاركة واحد لكل محادثة، فلا حاجة لـ distinct)
+        return Conversation.objects.filter(participants__user=user)
     
     def perform_create(self, serializer):
         """إنشاء محادثة جديدة"""
@@ -126,6 +139,11 @@ class ConversationViewSet(viewsets.ModelViewSet):
            self.request.user.userprofile.user_type != 'citizen':
             raise serializers.ValidationError("فقط المواطنون يمكنهم بدء محادثات جديدة")
         
+        if conversation_quota_exceeded(self.request.user):
+            raise serializers.ValidationError(
+                f"لا يمكن أن يكون لديك أكثر من {settings.MAX_CONVERSATIONS_PER_USER} محادثات مفتوحة"
+            )
+        
         serializer.save()
     
     @action(detail=True, methods=['post'])
@@ -146,18 +164,8 @@ class ConversationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        conversation.is_closed = True
-        conversation.closed_at = timezone.now()
-        conversation.closed_by = request.user
-        conversation.save()
-        
-        # إنشاء رسالة نظام
-        Message.objects.create(
-            conversation=conversation,
-            sender=request.user,
-            content=f"تم إغلاق المحادثة بواسطة {request.user.get_full_name() or request.user.username}",
-            is_system_message=True
-        )
+        # الإغلاق مع رسالة نظام
+        conversation.close(request.user, announce=True)
         
         serializer = self.get_serializer(conversation)
         return Response(serializer.data)
@@ -201,8 +209,9 @@ class ConversationViewSet(viewsets.ModelViewSet):
     def my_conversations(self, request):
         """الحصول على محادثات المستخدم الحالي"""
         user = request.user
-        conversations = self.get_queryset().filter(
-            Q(citizen=user) | Q(representative=user)
+        # الترتيب من نسخة آخر رسالة في جدول المشاركين (فهرس المستخدم مباشرة)
+        conversations = Conversation.objects.filter(participants__user=user).order_by(
+            '-participants__last_message_at', '-created_at'
         )
         
         # فلترة حسب النوع إذا تم تحديده
@@ -268,7 +277,7 @@ class ConversationViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class MessageViewSet(viewsets.ModelViewSet):
+class MessageViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     """ViewSet لإدارة الرسائل"""
     
     permission_classes = [IsAuthenticated]
@@ -283,16 +292,27 @@ class MessageViewSet(viewsets.ModelViewSet):
             return MessageCreateSerializer
         return MessageSerializer
     
+    def get_throttles(self):
+        if self.action in ('create', 'bulk_send'):
+            return [MessageSendThrottle()]
+        return super().get_throttles()
+    
+    def get_serializer(self, *args, **kwargs):
+        # عرض إيصالات القراءة المعلقة التي لم تُكتب بعد
+        if args and args[0] is not None:
+            read_receipts.overlay(args[0])
+        return super().get_serializer(*args, **kwargs)
+    
     def get_queryset(self):
         """فلترة الرسائل حسب المستخدم"""
         user = self.request.user
         if user.is_staff:
             return Message.objects.all()
         
-        # المستخدم يرى الرسائل في المحادثات التي يشارك فيها فقط
-        return Message.objects.filter(
-            Q(conversation__citizen=user) | Q(conversation__representative=user)
-        ).distinct()
+        # المستخدم يرى الرسائل الظاهرة في المحادثات التي يشارك فيها فقط
+        return Message.objects.visible().filter(
+            conversation__participants__user=user
+        ).select_related('conversation')
     
     def perform_create(self, serializer):
         """إنشاء رسالة جديدة"""
@@ -308,6 +328,63 @@ class MessageViewSet(viewsets.ModelViewSet):
         
         serializer.save()
     
+    @action(detail=False, methods=['post'])
+    def bulk_send(self, request):
+        """إرسال نفس الرد إلى عدة محادثات دفعة واحدة (للنواب)"""
+        serializer = BulkMessageCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        content = serializer.validated_data['content']
+        requested_ids = serializer.validated_data['conversation_ids']
+        
+        # التحقق من المشاركة وحالة المحادثة باستعلام واحد
+        citizen_ids = dict(Conversation.objects.filter(
+            id__in=requested_ids,
+            representative=request.user,
+            is_closed=False
+        ).values_list('id', 'citizen_id'))
+        allowed_ids = set(citizen_ids)
+        conversation_ids = [pk for pk in requested_ids if pk in allowed_ids]
+        
+        if not conversation_ids:
+            return Response(
+                {'error': 'لا توجد محادثات مفتوحة يمكنك الرد فيها'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        batch_size = getattr(settings, 'BULK_MESSAGE_BATCH_SIZE', 100)
+        created = []
+        with transaction.atomic():
+            for start in range(0, len(conversation_ids), batch_size):
+                batch = conversation_ids[start:start + batch_size]
+                messages = Message.objects.bulk_create([
+                    Message(conversation_id=conversation_id, sender=request.user, content=content)
+                    for conversation_id in batch
+                ])
+                # تحديث إحصائيات جميع محادثات الدفعة بجملة واحدة
+                last_message_at = max(message.created_at for message in messages)
+                Conversation.objects.filter(id__in=batch).update(
+                    total_messages=F('total_messages') + 1,
+                    last_message_at=last_message_at,
+                    last_message_by=request.user,
+                    updated_at=timezone.now()
+                )
+                ConversationParticipant.objects.filter(conversation_id__in=batch).update(
+                    last_message_at=last_message_at
+                )
+                created.extend(messages)
+            
+            # bulk_create لا يستدعي save، لذلك تُجدول الإشعارات هنا
+            for conversation_id in conversation_ids:
+                schedule_new_message(conversation_id, citizen_ids[conversation_id])
+        
+        return Response({
+            'messages_created': len(created),
+            'message_ids': [str(message.id) for message in created],
+            'skipped_conversation_ids': [
+                str(pk) for pk in requested_ids if pk not in allowed_ids
+            ],
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """تحديد الرسالة كمقروءة"""
@@ -320,6 +397,15 @@ class MessageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # قبول الإيصال في مخزن Redis والرد فوراً؛ الكتابة في قاعدة البيانات تتم على دفعات
+        if not message.is_read:
+            read_at = read_receipts.record(message, request.user)
+            if read_at is not None:
+                return Response(
+                    {'id': str(message.id), 'is_read': True, 'read_at': read_at},
+                    status=status.HTTP_202_ACCEPTED
+                )
+        
         message.mark_as_read()
         serializer = self.get_serializer(message)
         return Response(serializer.data)
@@ -344,15 +430,14 @@ class MessageViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            # تحديد الرسائل غير المقروءة كمقروءة
-            unread_messages = conversation.messages.filter(
-                is_read=False
-            ).exclude(sender=request.user)
+            # تقديم علامة القراءة بتحديث صف واحد بدلاً من تحديث كل رسالة
+            read_at = timezone.now()
+            updated_count = Message.objects.filter(
+                conversation=conversation,
+                created_at__lte=read_at
+            ).unread_for(request.user).count()
             
-            updated_count = unread_messages.update(
-                is_read=True,
-                read_at=timezone.now()
-            )
+            conversation.mark_read_by(request.user, read_at)
             
             return Response({'messages_marked_read': updated_count})
             
@@ -365,11 +450,9 @@ class MessageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """عدد الرسائل غير المقروءة للمستخدم"""
-        user = request.user
-        unread_count = Message.objects.filter(
-            Q(conversation__citizen=user) | Q(conversation__representative=user),
-            is_read=False
-        ).exclude(sender=user).count()
+        unread_count = Message.objects.unread_for(request.user).exclude(
+            pk__in=read_receipts.pending_for_reader(request.user)
+        ).count()
         
         return Response({'unread_count': unread_count})
 
@@ -386,12 +469,18 @@ class MessageReportViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'reviewed_at']
     ordering = ['-created_at']
     
+    def get_throttles(self):
+        if self.action == 'create':
+            return [ReportCreateThrottle()]
+        return super().get_throttles()
+    
     def get_queryset(self):
         """فلترة الإبلاغات حسب المستخدم"""
         user = self.request.user
+        queryset = MessageReport.objects.select_related('message', 'reporter')
         if user.is_staff:
-            return MessageReport.objects.all()
-        return MessageReport.objects.filter(reporter=user)
+            return queryset
+        return queryset.filter(reporter=user)
     
     def perform_create(self, serializer):
         """إنشاء إبلاغ جديد"""
@@ -408,8 +497,39 @@ class MessageReportViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
+class ModerationQueueViewSet(viewsets.ReadOnlyModelViewSet):
+    """قائمة مراجعة الإبلاغات: رسالة واحدة لكل عنصر مرتبة بالأولوية (للإدارة فقط)"""
+    
+    serializer_class = ReportAggregateSerializer
+    permission_classes = [IsAdminUser]
+    filter_backends = []
+    lookup_field = 'message_id'
+    
+    def get_queryset(self):
+        # ?hidden=true للرسائل التي أخفاها تجاوز حد الإبلاغات
+        hidden = self.request.query_params.get('hidden')
+        if hidden is not None:
+            hidden = hidden.lower() in ('1', 'true')
+        return moderation.queue(hidden=hidden)
+    
+    @action(detail=True, methods=['post'])
+    def resolve(self, request, message_id=None):
+        """مراجعة جميع الإبلاغات المعلقة عن الرسالة (restore لإعادة إظهار رسالة مخفية)"""
+        aggregate = self.get_object()
+        reviewed = moderation.resolve(
+            aggregate.message_id, request.user, request.data.get('action_taken', ''),
+            restore=str(request.data.get('restore', '')).lower() in ('1', 'true'),
+        )
+        return Response({'reviewed_reports': reviewed})
+
+
 class SystemNotificationViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet لإشعارات النظام"""
+    """
+    ViewSet لإشعارات النظام.
+    
+    تدمج القائمة الإشعارات الشخصية مع الإشعارات الجماعية المشتركة؛ الأخيرة
+    مخزنة مرة واحدة وحالة قراءتها من جدول BroadcastReceipt.
+    """
     
     serializer_class = SystemNotificationSerializer
     permission_classes = [IsAuthenticated]
@@ -423,11 +543,81 @@ class SystemNotificationViewSet(viewsets.ReadOnlyModelViewSet):
         """فلترة الإشعارات حسب المستخدم"""
         return SystemNotification.objects.filter(user=self.request.user)
     
+    def get_broadcast_queryset(self):
+        """الإشعارات الجماعية المشتركة الظاهرة للمستخدم مع حالة قراءته"""
+        return NotificationBroadcast.objects.visible_to(self.request.user).with_read_state(self.request.user)
+    
+    def _filter_broadcasts(self, queryset):
+        """تطبيق نفس فلاتر وبحث الإشعارات الشخصية على الإشعارات المشتركة"""
+        queryset = self.filterset_class(
+            self.request.query_params, queryset=queryset, request=self.request
+        ).qs
+        return SearchFilter().filter_queryset(self.request, queryset, self)
+    
+    def _as_notification(self, broadcast):
+        """تجهيز الإشعار المشترك ليُعرض بنفس شكل الإشعار الشخصي"""
+        broadcast.user = self.request.user
+        broadcast.related_object_id = None
+        return broadcast
+    
+    def list(self, request, *args, **kwargs):
+        """
+        قائمة مدمجة: تُرقّم المفاتيح فقط عبر UNION ثم تُجلب كائنات الصفحة
+        """
+        personal = self.filter_queryset(self.get_queryset())
+        shared = self._filter_broadcasts(self.get_broadcast_queryset())
+        ordering = OrderingFilter().get_ordering(request, personal, self) or self.ordering
+        
+        # نفس ترتيب الأعمدة في طرفي UNION
+        columns = {'key': F('pk'), 'sort_created': F('created_at'), 'sort_read': F('read_at')}
+        keys = personal.order_by().annotate(shared=Value(False), **columns).values(
+            'key', 'shared', 'sort_created', 'sort_read'
+        ).union(
+            shared.order_by().annotate(shared=Value(True), **columns).values(
+                'key', 'shared', 'sort_created', 'sort_read'
+            ),
+            all=True
+        ).order_by(*[
+            field.replace('created_at', 'sort_created').replace('read_at', 'sort_read')
+            for field in ordering
+        ])
+        
+        page = self.paginate_queryset(keys)
+        rows = page if page is not None else list(keys)
+        
+        personal_by_pk = SystemNotification.objects.in_bulk(
+            [row['key'] for row in rows if not row['shared']]
+        )
+        shared_by_pk = self.get_broadcast_queryset().in_bulk(
+            [row['key'] for row in rows if row['shared']]
+        )
+        notifications = [
+            self._as_notification(shared_by_pk[row['key']]) if row['shared'] else personal_by_pk[row['key']]
+            for row in rows
+        ]
+        
+        serializer = self.get_serializer(notifications, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+    
+    def get_object(self):
+        """البحث في الإشعارات الشخصية ثم المشتركة"""
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        notification = self.get_queryset().filter(pk=lookup).first()
+        if notification is None:
+            notification = self._as_notification(get_object_or_404(self.get_broadcast_queryset(), pk=lookup))
+        self.check_object_permissions(self.request, notification)
+        return notification
+    
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """تحديد الإشعار كمقروء"""
         notification = self.get_object()
-        notification.mark_as_read()
+        if isinstance(notification, NotificationBroadcast):
+            broadcasts.mark_read(notification, request.user)
+        else:
+            notification.mark_as_read()
         serializer = self.get_serializer(notification)
         return Response(serializer.data)
     
@@ -438,15 +628,60 @@ class SystemNotificationViewSet(viewsets.ReadOnlyModelViewSet):
             is_read=True,
             read_at=timezone.now()
         )
+        updated_count += broadcasts.mark_all_read(request.user)
         return Response({'notifications_marked_read': updated_count})
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """عدد الإشعارات غير المقروءة"""
-        unread_count = self.get_queryset().filter(is_read=False).count()
+        unread_count = (
+            self.get_queryset().filter(is_read=False).count() +
+            self.get_broadcast_queryset().filter(is_read=False).count()
+        )
         return Response({'unread_count': unread_count})
 
 
+class NotificationBroadcastViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """ViewSet للإشعارات الجماعية (للإدارة فقط)"""
+    
+    queryset = NotificationBroadcast.objects.all()
+    serializer_class = NotificationBroadcastSerializer
+    permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ['status', 'delivery_mode', 'notification_type', 'target_user_type']
+    ordering_fields = ['created_at', 'completed_at']
+    ordering = ['-created_at']
+    
+    def perform_create(self, serializer):
+        """إنشاء الإشعار الجماعي وجدولة إرساله في الخلفية"""
+        broadcast = serializer.save(created_by=self.request.user)
+        broadcast.total_recipients = broadcast.recipients().count()
+        broadcast.save(update_fields=['total_recipients'])
+        broadcasts.start(broadcast)
+    
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """استئناف إرسال متوقف من آخر مستخدم تم الإرسال إليه"""
+        broadcast = self.get_object()
+        
+        if broadcast.status == 'completed':
+            return Response(
+                {'error': 'تم إرسال هذا الإشعار بالكامل'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # الإرسال الجاري أو المجدول له عامل بالفعل؛ عامل ثانٍ من نفس المؤشر يكرر الإشعارات
+        if not broadcasts.can_resume(broadcast):
+            return Response(
+                {'error': 'الإرسال جارٍ بالفعل'}, 
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        broadcasts.start(broadcast)
+        serializer = self.get_serializer(broadcast)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
 class UserStatsViewSet(viewsets.ViewSet):
     """ViewSet لإحصائيات المستخدم"""
     
@@ -458,22 +693,17 @@ class UserStatsViewSet(viewsets.ViewSet):
         user = request.user
         
         # إحصائيات المحادثات
-        conversations = Conversation.objects.filter(
-            Q(citizen=user) | Q(representative=user)
-        )
+        conversations = Conversation.objects.filter(participants__user=user)
         total_conversations = conversations.count()
         active_conversations = conversations.filter(is_closed=False).count()
         
         # إحصائيات الرسائل
         messages_sent = Message.objects.filter(sender=user).count()
         messages_received = Message.objects.filter(
-            Q(conversation__citizen=user) | Q(conversation__representative=user)
+            conversation__participants__user=user
         ).exclude(sender=user).count()
         
-        unread_messages = Message.objects.filter(
-            Q(conversation__citizen=user) | Q(conversation__representative=user),
-            is_read=False
-        ).exclude(sender=user).count()
+        unread_messages = Message.objects.unread_for(user).count()
         
         # إحصائيات شهرية
         month_ago = timezone.now() - timedelta(days=30)
@@ -506,7 +736,9 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
+from django.db import transaction
 from .integrations import integration_manager
+from .outbox import enqueue_message_count_increment
 
 
 @login_required
@@ -677,6 +909,11 @@ def start_conversation_with_representative(request):
                 'error': 'جميع الحقول مطلوبة'
             }, status=400)
         
+        if conversation_quota_exceeded(request.user):
+            return JsonResponse({
+                'error': f'لا يمكن أن يكون لديك أكثر من {settings.MAX_CONVERSATIONS_PER_USER} محادثات مفتوحة'
+            }, status=400)
+        
         # Validate representative exists
         if not integration_manager.content_service.validate_representative_exists(representative_id):
             return JsonResponse({
@@ -696,23 +933,24 @@ def start_conversation_with_representative(request):
                 'conversation_id': existing_conversation.id
             }, status=400)
         
-        # Create new conversation
-        conversation = Conversation.objects.create(
-            citizen=request.user,
-            representative_id=representative_id,
-            subject=subject,
-            status='pending'
-        )
-        
-        # Create initial message
-        Message.objects.create(
-            conversation=conversation,
-            sender=request.user,
-            content=initial_message
-        )
-        
-        # Increment message count in content service
-        integration_manager.content_service.increment_message_count(representative_id)
+        with transaction.atomic():
+            # Create new conversation
+            conversation = Conversation.objects.create(
+                citizen=request.user,
+                representative_id=representative_id,
+                subject=subject,
+                status='pending'
+            )
+            
+            # Create initial message
+            Message.objects.create(
+                conversation=conversation,
+                sender=request.user,
+                content=initial_message
+            )
+            
+            # Increment message count in content service (delivered by the outbox worker)
+            enqueue_message_count_increment(representative_id)
         
         return JsonResponse({
             'success': True,
@@ -0,0 +1,13 @@
+"""
+إعداد Celery لخدمة الرسائل - منصة نائبك.كوم
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'messaging_service.settings')
+
+app = Celery('messaging_service')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -5,6 +5,8 @@
 import os
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
+from corsheaders.defaults import default_headers
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -158,6 +160,7 @@ CORS_ALLOWED_ORIGINS = config(
 )
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Cache Configuration (Redis)
 CACHES = {
@@ -248,4 +251,142 @@ CACHE_TIMEOUT = int(os.getenv('CACHE_TIMEOUT', '300'))
 # Message Settings (from prompt requirements)
 MAX_MESSAGE_LENGTH = 500  # As specified in prompt
 ALLOW_ATTACHMENTS = False  # Explicitly disabled in prompt
-MAX_CONVERSATIONS_PER_USER = 10
+MAX_CONVERSATIONS_PER_USER = 10  # open conversations a citizen may have at once
+CONVERSATION_QUOTA_CACHE_TIMEOUT = 3600  # seconds the cached open-conversation counter is trusted
+IDEMPOTENCY_KEY_TTL = 86400  # seconds a create response is replayed for retries with the same Idempotency-Key
+IDEMPOTENCY_LOCK_TIMEOUT = 30  # seconds a concurrent duplicate is turned away while the first runs
+
+# Token-bucket throttles per action and user type. "<n>/<period>" allows bursts of n
+# requests and refills n tokens per period; None (or no entry) disables the limit.
+MESSAGING_THROTTLE_RATES = {
+    'message_send': {'citizen': '20/min', 'representative': '120/min', 'default': '20/min'},
+    'conversation_create': {'citizen': '5/hour', 'default': '5/hour'},
+    'report_create': {'citizen': '10/hour', 'representative': '30/hour', 'default': '10/hour'},
+}
+BULK_MESSAGE_BATCH_SIZE = 100  # conversations per INSERT/UPDATE in bulk replies
+BROADCAST_CHUNK_SIZE = 1000  # notifications per INSERT when fanning out a broadcast
+BROADCAST_CHUNK_PAUSE = 0.05  # seconds between chunks, to leave room for other writers
+BROADCAST_STALE_AFTER = 600  # seconds without progress before a running broadcast can be resumed
+NEW_MESSAGE_NOTIFICATION_DELAY = 10  # seconds; messages in this window share one notification update
+
+# In-process cache tier in front of Redis for hot integration data
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', '1024'))
+LOCAL_CACHE_TIMEOUT = int(os.getenv('LOCAL_CACHE_TIMEOUT', '60'))
+CACHE_INVALIDATION_CHANNEL = 'naebak:messaging:cache-invalidation'
+
+# Local verification of tokens issued by the auth service (leave the key empty to always validate remotely)
+AUTH_JWT_VERIFYING_KEY = os.getenv('AUTH_JWT_VERIFYING_KEY', '')
+AUTH_JWT_ALGORITHM = os.getenv('AUTH_JWT_ALGORITHM', 'HS256')
+TOKEN_VALIDATION_CACHE_TIMEOUT = int(os.getenv('TOKEN_VALIDATION_CACHE_TIMEOUT', '300'))
+TOKEN_REVOCATION_LOCAL_TIMEOUT = 5  # seconds a worker trusts its local "not revoked" answer without an invalidation
+
+# Transactional outbox for side effects on other services
+OUTBOX_FLUSH_INTERVAL = int(os.getenv('OUTBOX_FLUSH_INTERVAL', '5'))  # seconds
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_CLAIM_TIMEOUT = 60
+OUTBOX_RETRY_BASE_DELAY = 10
+OUTBOX_RETRY_MAX_DELAY = 3600
+OUTBOX_MAX_ATTEMPTS = 10  # failed deliveries before an event is dead-lettered
+
+# Read receipts are buffered in Redis and flushed in batches
+READ_RECEIPT_FLUSH_INTERVAL = float(os.getenv('READ_RECEIPT_FLUSH_INTERVAL', '0.5'))  # seconds
+READ_RECEIPT_BUFFER_TTL = 3600
+
+# Outbound email/SMS notifications, batched per user per dispatch window
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@naebak.com')
+SMS_BACKEND = config('SMS_BACKEND', default='messages.sms.ConsoleBackend')
+TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
+TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
+TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='')
+NOTIFICATION_DISPATCH_INTERVAL = int(os.getenv('NOTIFICATION_DISPATCH_INTERVAL', '60'))  # seconds
+NOTIFICATION_DISPATCH_BATCH_SIZE = 500
+NOTIFICATION_DISPATCH_CLAIM_TIMEOUT = 120
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RATE_LIMITS = {'email': 600, 'sms': 60}  # messages per minute across all workers
+DIGEST_NOTIFICATION_TYPES = ['new_message', 'conversation_closed']  # held back for users in digest mode
+DIGEST_SEND_HOUR = int(os.getenv('DIGEST_SEND_HOUR', '8'))  # local time; covers the previous day
+
+# Notification retention in days per type, for read (from read_at) and unread (from created_at)
+NOTIFICATION_RETENTION = {
+    'default': {'read': 90, 'unread': 365},
+    'new_message': {'read': 30, 'unread': 180},
+    'maintenance': {'read': 14, 'unread': 60},
+}
+RETENTION_PURGE_BATCH_SIZE = 1000
+RETENTION_PURGE_PAUSE = 0.1  # seconds between delete batches
+
+# Messages of conversations closed this long ago move to ConversationArchive
+ARCHIVE_CLOSED_AFTER_MONTHS = int(os.getenv('ARCHIVE_CLOSED_AFTER_MONTHS', '24'))
+ARCHIVE_BATCH_SIZE = 100  # conversations per run
+ARCHIVE_MAX_MESSAGES = 10000  # larger conversations stay in the live table (a segment is built in memory)
+
+# Monthly partitions of the message table (PostgreSQL only, see messages/partitioning.py)
+MESSAGE_PARTITIONS_AHEAD = 3  # months created in advance
+MESSAGE_PARTITION_RETENTION_MONTHS = None  # detach older months; None keeps everything
+
+# Moderation queue priority (messages/moderation.py)
+REPORT_REASON_WEIGHTS = {'harassment': 5, 'inappropriate': 3, 'fake': 3, 'spam': 2, 'other': 1}
+REPORT_PRIORITY_DECAY = 45000  # seconds of recency worth 10x the weighted pending reports
+REPORT_AUTO_HIDE_THRESHOLD = 3  # reports that hide a message until reviewed (None disables)
+
+# Near-duplicate spam detection (messages/spam.py)
+SPAM_DETECTION_INTERVAL = 60  # seconds between scans of new messages
+SPAM_DETECTION_BATCH_SIZE = 500  # messages fingerprinted per batch
+SPAM_SIMILARITY_THRESHOLD = 0.8  # estimated Jaccard similarity for near-duplicates
+SPAM_CLUSTER_MIN_SIZE = 5  # distinct senders before near-duplicates are flagged
+SPAM_MIN_CONTENT_LENGTH = 20  # shorter (normalised) texts are not fingerprinted
+SPAM_INDEX_WINDOW = 3 * 86400  # seconds a fingerprint stays in the LSH index
+SPAM_MAX_CANDIDATES = 50  # most recent LSH matches verified per message
+SPAM_SCAN_LOOKBACK = 120  # seconds before the cursor re-read each run, for late-committing messages
+SPAM_SCAN_LOCK_TIMEOUT = 600  # seconds before a crashed scan's lock expires
+
+# Admin bulk actions (messages/bulk_actions.py)
+ADMIN_BULK_ACTION_THRESHOLD = 1000  # selections larger than this run as background jobs
+ADMIN_BULK_JOB_CHUNK_SIZE = 5000  # rows per task before the job re-enqueues itself
+ADMIN_BULK_JOB_BATCH_SIZE = 500  # rows per transaction
+ADMIN_BULK_JOB_PAUSE = 0  # seconds between batches
+ADMIN_BULK_JOB_STALE_AFTER = 600  # seconds without progress before a running job can be resumed
+
+# Admin changelists on the large tables (messages/pagination.py)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000  # planner estimates replace COUNT(*) above this many rows
+
+CELERY_BEAT_SCHEDULE = {
+    'drain-outbox': {
+        'task': 'messages.tasks.drain_outbox',
+        'schedule': OUTBOX_FLUSH_INTERVAL,
+    },
+    'flush-read-receipts': {
+        'task': 'messages.tasks.flush_read_receipts',
+        'schedule': READ_RECEIPT_FLUSH_INTERVAL,
+    },
+    'dispatch-notifications': {
+        'task': 'messages.tasks.dispatch_notifications',
+        'schedule': NOTIFICATION_DISPATCH_INTERVAL,
+    },
+    'build-daily-digests': {
+        'task': 'messages.tasks.build_daily_digests',
+        'schedule': crontab(hour=DIGEST_SEND_HOUR, minute=0),
+    },
+    'purge-expired-notifications': {
+        'task': 'messages.tasks.purge_expired_notifications',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'archive-closed-conversations': {
+        'task': 'messages.tasks.archive_closed_conversations',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'maintain-message-partitions': {
+        'task': 'messages.tasks.maintain_message_partitions',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'scan-spam': {
+        'task': 'messages.tasks.scan_spam',
+        'schedule': SPAM_DETECTION_INTERVAL,
+    },
+}
@@ -44,6 +44,7 @@ LOGGING = {
 
 # إعدادات البريد الإلكتروني للاختبارات
 EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+SMS_BACKEND = 'messages.sms.LocMemBackend'
 
 # تعطيل الوسائط للاختبارات
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.InMemoryStorage'
@@ -0,0 +1,206 @@
+"""
+بديل محلي لخدمة المحتوى (naebak-content-service) للاختبار وقياس الأداء - منصة نائبك.كوم
+
+A loopback HTTP server implementing the endpoints used by
+messages/integrations.py, with configurable latency, errors and timeouts.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+GOVERNORATES = [
+    {'id': 1, 'name': 'القاهرة'},
+    {'id': 2, 'name': 'الجيزة'},
+    {'id': 3, 'name': 'الإسكندرية'},
+]
+
+PARTIES = [
+    {'id': 1, 'name': 'حزب أ'},
+    {'id': 2, 'name': 'حزب ب'},
+]
+
+
+def build_representatives(count=50):
+    """بيانات نواب تجريبية"""
+    return [
+        {
+            'id': i,
+            'name': f'النائب {i}',
+            'slug': f'representative-{i}',
+            'governorate': GOVERNORATES[i % len(GOVERNORATES)]['id'],
+            'governorate_name': GOVERNORATES[i % len(GOVERNORATES)]['name'],
+            'district_name': f'دائرة {i % 7}',
+            'party_name': PARTIES[i % len(PARTIES)]['name'],
+            'avatar': None,
+            'is_featured': i % 5 == 0,
+            'average_rating': 4,
+            'complaints_resolved': 0,
+            'complaints_received': 0,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+class ContentServiceStub:
+    """
+    خادم HTTP محلي يحاكي خدمة المحتوى.
+
+    latency: delay added to every response, in seconds
+    error_rate: fraction of requests answered with HTTP 500
+    timeout_rate: fraction of requests that stall for `stall_for` seconds
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, timeout_rate=0.0, stall_for=5.0,
+                 representatives=None, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.stall_for = stall_for
+        self.representatives = representatives or build_representatives()
+        self.random = random.Random(seed)
+        self.requests_served = 0
+        self.message_counts = {}
+        self.seen_idempotency_keys = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        stub = self
+
+        class Handler(StubRequestHandler):
+            pass
+        Handler.stub = stub
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def configure(self, **options):
+        """تغيير سلوك الخادم أثناء التشغيل"""
+        for name, value in options.items():
+            setattr(self, name, value)
+
+    def _roll(self):
+        with self._lock:
+            self.requests_served += 1
+            return self.random.random()
+
+    # Endpoint implementations
+
+    def list_representatives(self, query):
+        results = self.representatives
+        if 'governorate' in query:
+            results = [r for r in results if str(r['governorate']) == query['governorate'][0]]
+        if query.get('is_featured', [''])[0] == 'True':
+            results = [r for r in results if r['is_featured']]
+        if 'search' in query:
+            results = [r for r in results if query['search'][0] in r['name']]
+        return 200, {'count': len(results), 'results': results}
+
+    def get_representative(self, key):
+        for representative in self.representatives:
+            if key in (str(representative['id']), representative['slug']):
+                return 200, representative
+        return 404, {'detail': 'Not found.'}
+
+    def increment_messages(self, key, body, headers):
+        idempotency_key = headers.get('Idempotency-Key')
+        with self._lock:
+            if idempotency_key and idempotency_key in self.seen_idempotency_keys:
+                return 200, {'duplicate': True, 'count': self.message_counts.get(key, 0)}
+            if idempotency_key:
+                self.seen_idempotency_keys.add(idempotency_key)
+            self.message_counts[key] = self.message_counts.get(key, 0) + body.get('count', 1)
+            return 200, {'duplicate': False, 'count': self.message_counts[key]}
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    stub = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _degrade(self):
+        """تطبيق التأخير والأخطاء والمهلات المحددة؛ يعيد True إذا تم الرد بالفعل"""
+        roll = self.stub._roll()
+        if self.stub.latency:
+            time.sleep(self.stub.latency)
+        if roll < self.stub.timeout_rate:
+            time.sleep(self.stub.stall_for)
+            return True
+        if roll < self.stub.timeout_rate + self.stub.error_rate:
+            self._respond(500, {'detail': 'Injected failure'})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._degrade():
+            return
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split('/') if part]
+        query = parse_qs(parsed.query)
+
+        if parts[:1] != ['api']:
+            return self._respond(404, {'detail': 'Not found.'})
+        parts = parts[1:]
+
+        if parts == ['representatives']:
+            return self._respond(*self.stub.list_representatives(query))
+        if len(parts) == 2 and parts[0] == 'representatives':
+            return self._respond(*self.stub.get_representative(parts[1]))
+        if parts == ['governorates']:
+            return self._respond(200, {'count': len(GOVERNORATES), 'results': GOVERNORATES})
+        if parts == ['districts']:
+            governorate = query.get('governorate', [''])[0]
+            districts = [
+                {'id': i, 'name': f'دائرة {i}', 'governorate': governorate}
+                for i in range(1, 8)
+            ]
+            return self._respond(200, {'count': len(districts), 'results': districts})
+        if parts == ['parties']:
+            return self._respond(200, {'count': len(PARTIES), 'results': PARTIES})
+        return self._respond(404, {'detail': 'Not found.'})
+
+    def do_POST(self):
+        if self._degrade():
+            return
+        parts = [part for part in urlparse(self.path).path.split('/') if part]
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+        if len(parts) == 4 and parts[:2] == ['api', 'representatives'] and parts[3] == 'increment_messages':
+            return self._respond(*self.stub.increment_messages(parts[2], body, self.headers))
+        return self._respond(404, {'detail': 'Not found.'})
@@ -0,0 +1,96 @@
+"""
+اختبارات عرض رسائل المحادثة على صفحات في لوحة الإدارة - منصة نائبك.كوم
+"""
+
+import pytest
+from django.urls import reverse
+
+from messages.admin import MessageInline
+from messages.models import Message
+
+
+@pytest.fixture
+def long_conversation(conversation):
+    """محادثة بخمس عشرة رسالة متتالية"""
+    for i in range(15):
+        Message.objects.create(conversation=conversation, sender=conversation.citizen, content=f'رسالة {i}')
+    return conversation
+
+
+def inline_messages(response):
+    formset = next(
+        inline.formset for inline in response.context['inline_admin_formsets']
+        if inline.formset.model is Message
+    )
+    return formset, [message.content for message in formset.get_queryset()]
+
+
+@pytest.mark.django_db
+class TestMessageInline:
+    """اختبارات صفحات رسائل المحادثة"""
+
+    @pytest.fixture(autouse=True)
+    def small_pages(self, monkeypatch):
+        monkeypatch.setattr(MessageInline, 'per_page', 10)
+
+    def url(self, conversation):
+        return reverse('admin:naebak_messages_conversation_change', args=[conversation.pk])
+
+    def test_shows_most_recent_page(self, admin_client, long_conversation):
+        """اختبار عرض أحدث الرسائل فقط مع رابط للأقدم"""
+        response = admin_client.get(self.url(long_conversation))
+
+        formset, contents = inline_messages(response)
+        assert contents == [f'رسالة {i}' for i in range(14, 4, -1)]
+        assert formset.has_older
+        assert 'messages_page=2' in response.content.decode()
+
+    def test_load_older(self, admin_client, long_conversation):
+        """اختبار الانتقال إلى الرسائل الأقدم"""
+        response = admin_client.get(self.url(long_conversation), {'messages_page': 2})
+
+        formset, contents = inline_messages(response)
+        assert contents == [f'رسالة {i}' for i in range(4, -1, -1)]
+        assert not formset.has_older
+
+    def test_queries_independent_of_length(self, admin_client, long_conversation, django_assert_max_num_queries):
+        """اختبار أن عدد الاستعلامات لا يزيد مع طول المحادثة"""
+        url = self.url(long_conversation)
+        admin_client.get(url)
+
+        for i in range(30):
+            Message.objects.create(
+                conversation=long_conversation, sender=long_conversation.representative, content=f'رد {i}'
+            )
+        with django_assert_max_num_queries(15):
+            admin_client.get(url)
+
+    def test_save_with_page(self, admin_client, long_conversation):
+        """اختبار حفظ المحادثة من صفحة رسائل أقدم"""
+        response = admin_client.get(self.url(long_conversation), {'messages_page': 2})
+        formset, _ = inline_messages(response)
+        data = {
+            'citizen': long_conversation.citizen_id,
+            'representative': long_conversation.representative_id,
+            'subject': 'موضوع جديد',
+            'closed_by': '',
+            'citizen_feedback': '',
+        }
+        data.update({
+            f'{formset.prefix}-TOTAL_FORMS': 5,
+            f'{formset.prefix}-INITIAL_FORMS': 5,
+            f'{formset.prefix}-MIN_NUM_FORMS': 0,
+            f'{formset.prefix}-MAX_NUM_FORMS': 1000,
+        })
+        for index, message in enumerate(formset.get_queryset()):
+            data.update({
+                f'{formset.prefix}-{index}-id': message.pk,
+                f'{formset.prefix}-{index}-conversation': long_conversation.pk,
+                f'{formset.prefix}-{index}-content': message.content,
+            })
+
+        response = admin_client.post(f'{self.url(long_conversation)}?messages_page=2', data)
+
+        assert response.status_code == 302
+        long_conversation.refresh_from_db()
+        assert long_conversation.subject == 'موضوع جديد'
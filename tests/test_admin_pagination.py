@@ -0,0 +1,79 @@
+"""
+اختبارات العد التقديري وتصفية قوائم لوحة الإدارة - منصة نائبك.كوم
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from messages import pagination
+from messages.models import Message, SystemNotification
+from messages.pagination import EstimatedCountPaginator
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    """اختبارات اختيار العد التقديري أو الدقيق"""
+
+    def test_exact_count_without_estimates(self, message):
+        """اختبار العد الدقيق على قواعد البيانات التي لا تدعم التقدير"""
+        assert pagination.estimated_count(Message.objects.all()) is None
+        assert EstimatedCountPaginator(Message.objects.all(), 100).count == 1
+
+    def test_estimate_used_above_threshold(self, message, mocker, settings):
+        """اختبار استخدام التقدير للنتائج الكبيرة دون COUNT"""
+        settings.ADMIN_ESTIMATED_COUNT_THRESHOLD = 1000
+        mocker.patch.object(pagination, 'estimated_count', return_value=5000000)
+
+        with CaptureQueriesContext(connection) as queries:
+            paginator = EstimatedCountPaginator(Message.objects.all(), 100)
+            assert (paginator.count, paginator.num_pages) == (5000000, 50000)
+        assert not queries.captured_queries
+
+    def test_exact_count_below_threshold(self, message, mocker, settings):
+        """اختبار العد الدقيق عندما يكون التقدير صغيراً"""
+        settings.ADMIN_ESTIMATED_COUNT_THRESHOLD = 1000
+        mocker.patch.object(pagination, 'estimated_count', return_value=40)
+
+        assert EstimatedCountPaginator(Message.objects.all(), 100).count == 1
+
+
+@pytest.mark.django_db
+class TestChangelists:
+    """اختبارات قوائم الرسائل والإشعارات في لوحة الإدارة"""
+
+    def changelist(self, admin_client, model, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.get(reverse(f'admin:naebak_messages_{model}_changelist'), params)
+        assert response.status_code == 200
+        return response, [query['sql'] for query in queries.captured_queries]
+
+    def test_sender_type_filter_without_profile_join(self, admin_client, conversation, message):
+        """اختبار تصفية نوع المرسل باستعلام فرعي وخيارات ثابتة"""
+        Message.objects.create(conversation=conversation, sender=conversation.representative, content='رد')
+
+        response, queries = self.changelist(admin_client, 'message', sender_type='representative')
+
+        assert [obj.sender for obj in response.context['cl'].result_list] == [conversation.representative]
+        message_queries = [sql for sql in queries if 'FROM "naebak_messages_message"' in sql]
+        assert not any('JOIN "naebak_messages_userprofile"' in sql for sql in message_queries)
+        assert 'نائب' in response.content.decode()
+
+    def test_no_full_result_count(self, admin_client, message):
+        """اختبار عدم عدّ الجدول كاملاً عند التصفية"""
+        response, queries = self.changelist(admin_client, 'message', is_read__exact='0')
+
+        assert response.context['cl'].full_result_count is None
+        assert sum('COUNT(*)' in sql and 'naebak_messages_message' in sql for sql in queries) == 1
+
+    def test_notification_user_type_filter(self, admin_client, user, representative_user):
+        """اختبار تصفية الإشعارات حسب نوع المستخدم"""
+        SystemNotification.objects.create(user=user, notification_type='system', title='للمواطن', message='.')
+        SystemNotification.objects.create(
+            user=representative_user, notification_type='system', title='للنائب', message='.'
+        )
+
+        response, _ = self.changelist(admin_client, 'systemnotification', user_type='representative')
+
+        assert [obj.title for obj in response.context['cl'].result_list] == ['للنائب']
@@ -0,0 +1,189 @@
+"""
+اختبارات أرشفة المحادثات المغلقة - منصة نائبك.كوم
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from messages import archive
+from messages.archive import archive_closed_conversations, archived_messages, restore_conversation
+from messages.models import Conversation, ConversationArchive, Message, MessageReport, SpamCluster
+
+
+@pytest.fixture
+def old_conversation(conversation, citizen_user, representative_user):
+    """محادثة مغلقة منذ ثلاث سنوات فيها عدة رسائل"""
+    for i in range(3):
+        sender = citizen_user if i % 2 == 0 else representative_user
+        Message.objects.create(conversation=conversation, sender=sender, content=f'رسالة {i}')
+    Conversation.objects.filter(pk=conversation.pk).update(
+        is_closed=True, closed_at=timezone.now() - timedelta(days=3 * 365)
+    )
+    conversation.refresh_from_db()
+    return conversation
+
+
+@pytest.mark.django_db
+class TestConversationArchive:
+    """اختبارات نقل الرسائل إلى الأرشيف"""
+
+    def test_moves_messages_out_of_live_table(self, old_conversation, representative_user, citizen_user):
+        """اختبار نقل رسائل المحادثات القديمة فقط"""
+        recent = Conversation.objects.create(
+            citizen=citizen_user, representative=representative_user, subject='حديثة',
+            is_closed=True, closed_at=timezone.now() - timedelta(days=10)
+        )
+        Message.objects.create(conversation=recent, sender=citizen_user, content='حديثة')
+
+        stats = archive_closed_conversations(months=12)
+
+        assert stats['conversations'] == 1
+        assert stats['messages'] == 3
+        assert not Message.objects.filter(conversation=old_conversation).exists()
+        assert Message.objects.filter(conversation=recent).count() == 1
+        old_conversation.refresh_from_db()
+        assert old_conversation.is_archived is True
+        assert ConversationArchive.objects.get(conversation=old_conversation).message_count == 3
+
+    def test_oversized_conversation_left_live(self, old_conversation, settings):
+        """اختبار ترك المحادثة التي تتجاوز الحد الأقصى للرسائل في الجدول الحي"""
+        settings.ARCHIVE_MAX_MESSAGES = 2
+        # العداد المخزن أقل من الفعلي: الحد يُطبق على العدد الحي
+        Conversation.objects.filter(pk=old_conversation.pk).update(total_messages=1)
+
+        stats = archive_closed_conversations(months=12)
+
+        assert stats['conversations'] == 0
+        assert old_conversation.messages.count() == 3
+        assert not ConversationArchive.objects.exists()
+
+    def test_sender_read_with_messages(self, old_conversation, citizen_user, mocker):
+        """اختبار أن ملخص آخر رسالة لا يحتاج استعلاماً مستقلاً عن المرسل"""
+        user_get = mocker.spy(User.objects, 'get')
+
+        archive_closed_conversations(months=12)
+
+        assert user_get.call_count == 0
+        last_message = ConversationArchive.objects.get().last_message
+        assert last_message['sender'] == (citizen_user.get_full_name() or citizen_user.username)
+
+    def test_archived_messages_round_trip(self, old_conversation):
+        """اختبار قراءة الرسائل المؤرشفة بنفس الحقول والترتيب"""
+        original = list(old_conversation.messages.values_list('id', 'content', 'created_at', 'sender_id'))
+
+        archive_closed_conversations(months=12)
+        old_conversation.refresh_from_db()
+
+        messages = archived_messages(old_conversation)
+        assert [(m.id, m.content, m.created_at, m.sender.pk) for m in messages] == original
+
+    def test_skips_conversations_with_reports(self, old_conversation, representative_user):
+        """اختبار إبقاء المحادثات التي فيها بلاغات في الجدول الحي"""
+        MessageReport.objects.create(
+            message=old_conversation.messages.first(), reporter=representative_user, reason='spam'
+        )
+
+        assert archive_closed_conversations(months=12)['conversations'] == 0
+
+    def test_retrieve_falls_back_to_archive(self, authenticated_client, old_conversation):
+        """اختبار عرض المحادثة المؤرشفة عبر نفس نقطة الاسترجاع"""
+        archive_closed_conversations(months=12)
+
+        url = reverse('conversation-detail', kwargs={'pk': old_conversation.pk})
+        response = authenticated_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['is_archived'] is True
+        assert [m['content'] for m in response.data['messages']] == ['رسالة 0', 'رسالة 1', 'رسالة 2']
+        assert response.data['last_message']['content'] == 'رسالة 2'
+
+    def test_restore(self, old_conversation):
+        """اختبار إعادة الرسائل إلى الجدول الحي بتواريخها الأصلية"""
+        original = list(old_conversation.messages.values_list('id', 'created_at'))
+        archive_closed_conversations(months=12)
+
+        restore_conversation(old_conversation)
+
+        assert list(old_conversation.messages.values_list('id', 'created_at')) == original
+        assert not ConversationArchive.objects.exists()
+
+    def test_reopen_restores_before_new_messages(self, authenticated_client, old_conversation, admin_user):
+        """اختبار أن إعادة فتح محادثة مؤرشفة ثم الإرسال يعرض جميع الرسائل"""
+        from messages import bulk_actions
+        archive_closed_conversations(months=12)
+
+        bulk_actions.apply('open_conversations', [old_conversation.pk], admin_user)
+        response = authenticated_client.post(
+            reverse('message-list'), {'conversation': old_conversation.pk, 'content': 'رسالة جديدة'}
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+        old_conversation.refresh_from_db()
+        assert old_conversation.is_archived is False
+        detail = authenticated_client.get(reverse('conversation-detail', kwargs={'pk': old_conversation.pk}))
+        contents = [m['content'] for m in detail.data['messages']]
+        assert contents == ['رسالة 0', 'رسالة 1', 'رسالة 2', 'رسالة جديدة']
+        assert detail.data['last_message']['content'] == 'رسالة جديدة'
+
+    def test_reopened_without_restore_is_restored_on_send(self, authenticated_client, old_conversation):
+        """اختبار استعادة الأرشيف عند الإرسال في محادثة فُتحت من مسار آخر"""
+        archive_closed_conversations(months=12)
+        Conversation.objects.filter(pk=old_conversation.pk).update(is_closed=False, closed_at=None)
+
+        authenticated_client.post(
+            reverse('message-list'), {'conversation': old_conversation.pk, 'content': 'رسالة جديدة'}
+        )
+
+        old_conversation.refresh_from_db()
+        assert old_conversation.is_archived is False
+        assert old_conversation.total_messages == 4
+        assert not ConversationArchive.objects.exists()
+        assert old_conversation.messages.count() == 4
+
+    def test_list_reads_last_message_without_decompressing(self, authenticated_client, old_conversation, mocker):
+        """اختبار عرض آخر رسالة في القائمة من صف الأرشيف دون فك ضغط الرسائل"""
+        archive_closed_conversations(months=12)
+        decode = mocker.spy(archive, '_decode')
+
+        response = authenticated_client.get(reverse('conversation-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        last_message = response.data['results'][0]['last_message']
+        assert last_message['content'] == 'رسالة 2'
+        assert last_message['created_at'] is not None
+        assert decode.call_count == 0
+
+    def test_last_message_computed_once_for_older_archives(self, old_conversation, mocker):
+        """اختبار حساب ملخص آخر رسالة مرة واحدة للأرشيف المنشأ قبل حفظه"""
+        archive_closed_conversations(months=12)
+        ConversationArchive.objects.update(last_message=None)
+        decode = mocker.spy(archive, '_decode')
+
+        first = archive.last_message(old_conversation)
+        second = archive.last_message(old_conversation)
+
+        assert first == second
+        assert first['content'] == 'رسالة 2'
+        assert decode.call_count == 1
+
+    def test_spam_cluster_survives_archive(self, old_conversation):
+        """اختبار الاحتفاظ بمجموعة الرسائل المزعجة عبر الأرشفة والاستعادة"""
+        cluster = SpamCluster.objects.create(sample_content='رسالة')
+        kept, dropped = old_conversation.messages.order_by('created_at')[:2]
+        gone = SpamCluster.objects.create(sample_content='رسالة')
+        Message.objects.filter(pk=kept.pk).update(spam_cluster=cluster)
+        Message.objects.filter(pk=dropped.pk).update(spam_cluster=gone)
+        archive_closed_conversations(months=12)
+        gone.delete()
+
+        restore_conversation(old_conversation)
+
+        kept.refresh_from_db()
+        dropped.refresh_from_db()
+        assert kept.spam_cluster == cluster
+        assert dropped.spam_cluster is None
@@ -0,0 +1,129 @@
+"""
+اختبارات الإخفاء التلقائي للرسائل كثيرة الإبلاغات - منصة نائبك.كوم
+"""
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from conftest import UserFactory
+from messages import moderation
+from messages.models import Message, MessageReport
+
+
+def report(message, times=1):
+    for _ in range(times):
+        MessageReport.objects.create(message=message, reporter=UserFactory(), reason='harassment')
+    message.refresh_from_db()
+    return message
+
+
+@pytest.fixture
+def reported(conversation):
+    """رسالة من النائب في محادثة المستخدم"""
+    return Message.objects.create(
+        conversation=conversation, sender=conversation.representative, content='رسالة مسيئة'
+    )
+
+
+@pytest.mark.django_db
+class TestReportCounter:
+    """اختبارات عداد الإبلاغات وحد الإخفاء"""
+
+    def test_hidden_when_threshold_reached(self, reported, settings):
+        """اختبار إخفاء الرسالة عند بلوغ الحد فقط"""
+        settings.REPORT_AUTO_HIDE_THRESHOLD = 3
+
+        report(reported, 2)
+        assert (reported.report_count, reported.is_hidden) == (2, False)
+
+        report(reported)
+        assert (reported.report_count, reported.is_hidden) == (3, True)
+        assert reported.hidden_at is not None
+
+    def test_constant_queries_per_report(self, reported, settings, django_assert_num_queries):
+        """اختبار أن فحص الحد لا يعد الإبلاغات"""
+        settings.REPORT_AUTO_HIDE_THRESHOLD = 50
+        report(reported, 20)
+
+        # العداد بتحديث صف واحد، ثم الإخفاء المشروط، دون COUNT على الإبلاغات
+        with django_assert_num_queries(2):
+            assert moderation.count_report(reported.id) is False
+
+    def test_hide_reported_once(self, reported, settings):
+        """اختبار أن إبلاغاً واحداً فقط يخفي الرسالة"""
+        settings.REPORT_AUTO_HIDE_THRESHOLD = 2
+        report(reported)
+
+        assert moderation.count_report(reported.id) is True
+        assert moderation.count_report(reported.id) is False
+
+    def test_disabled_without_threshold(self, reported, settings):
+        """اختبار تعطيل الإخفاء عند عدم ضبط الحد"""
+        settings.REPORT_AUTO_HIDE_THRESHOLD = None
+
+        report(reported, 5)
+
+        assert (reported.report_count, reported.is_hidden) == (5, False)
+
+    def test_deleted_report_decrements(self, reported):
+        """اختبار إنقاص العداد عند حذف إبلاغ"""
+        report(reported, 2)
+        reported.reports.first().delete()
+
+        reported.refresh_from_db()
+        assert reported.report_count == 1
+
+
+@pytest.mark.django_db
+class TestHiddenForParticipants:
+    """اختبارات حجب الرسائل المخفية عن المشاركين"""
+
+    @pytest.fixture(autouse=True)
+    def hidden(self, reported, settings):
+        settings.REPORT_AUTO_HIDE_THRESHOLD = 2
+        return report(reported, 2)
+
+    def test_excluded_from_message_list(self, authenticated_client, hidden):
+        """اختبار استبعاد الرسالة المخفية من قائمة الرسائل"""
+        response = authenticated_client.get(reverse('message-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert str(hidden.id) not in [item['id'] for item in response.data['results']]
+        detail = authenticated_client.get(reverse('message-detail', args=[hidden.id]))
+        assert detail.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_excluded_from_conversation_and_unread(self, hidden):
+        """اختبار استبعادها من سجل المحادثة وعدادات غير المقروء"""
+        conversation = hidden.conversation
+
+        assert hidden not in conversation.message_history()
+        assert conversation.unread_count_for_citizen == 0
+        assert not Message.objects.unread_for(conversation.citizen).exists()
+
+    def test_visible_to_staff(self, hidden):
+        """اختبار أن الإدارة ما زالت ترى الرسالة"""
+        client = APIClient()
+        client.force_authenticate(user=UserFactory(is_staff=True))
+
+        response = client.get(reverse('message-detail', args=[hidden.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_review_queue_and_restore(self, hidden):
+        """اختبار ظهورها في قائمة المراجعة وإعادة إظهارها بقرار المشرف"""
+        client = APIClient()
+        client.force_authenticate(user=UserFactory(is_staff=True))
+
+        queue = client.get(reverse('moderation-queue-list'), {'hidden': 'true'})
+        assert [item['message'] for item in queue.data['results']] == [hidden.id]
+        assert queue.data['results'][0]['is_hidden'] is True
+
+        client.post(reverse('moderation-queue-resolve', args=[hidden.id]), {'restore': True})
+
+        hidden.refresh_from_db()
+        assert hidden.is_hidden is False
+        # لا تُخفى مرة أخرى تلقائياً بعد قرار المشرف
+        report(hidden)
+        assert hidden.is_hidden is False
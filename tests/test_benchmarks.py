@@ -0,0 +1,320 @@
+"""
+قياس زمن الاستجابة للتكامل مع خدمة المحتوى - منصة نائبك.كوم
+
+Runs against the local content-service stand-in. Timings are printed
+(use `pytest -s -m slow` to see them); assertions only check relative ordering
+so the suite stays stable on slow machines.
+"""
+
+import json
+import statistics
+import time
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+
+from conftest import UserFactory, UserProfileFactory
+from messages.dispatch import dispatch_pending, enqueue_for_notifications
+from messages.integrations import ContentServiceIntegration, integration_manager
+from messages.models import Conversation, Message, MessageReport, SystemNotification
+from messages.outbox import drain_outbox, enqueue_message_count_increment
+from messages.views import get_representatives_list
+from tests.content_service_stub import ContentServiceStub
+
+
+ITERATIONS = 20
+
+
+def measure(fn, iterations=ITERATIONS, before_each=None):
+    """تشغيل الدالة عدة مرات وإرجاع إحصائيات الزمن بالمللي ثانية"""
+    samples = []
+    for _ in range(iterations):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'mean': statistics.mean(samples),
+        'p50': samples[len(samples) // 2],
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'max': samples[-1],
+    }
+
+
+def report(title, results):
+    print(f"\n{title}")
+    for scenario, timings in results.items():
+        print(
+            f"  {scenario:<10} mean={timings['mean']:8.2f}ms p50={timings['p50']:8.2f}ms "
+            f"p95={timings['p95']:8.2f}ms max={timings['max']:8.2f}ms"
+        )
+
+
+@pytest.fixture
+def content_stub():
+    with ContentServiceStub(latency=0.005) as stub:
+        yield stub
+
+
+@pytest.fixture
+def content_service(settings, locmem_cache, content_stub, monkeypatch):
+    """خدمة المحتوى موجهة إلى البديل المحلي"""
+    settings.CONTENT_SERVICE_URL = content_stub.url
+    settings.SERVICE_TIMEOUT = 0.2
+    service = ContentServiceIntegration()
+    monkeypatch.setattr(integration_manager, 'content_service', service)
+    return service
+
+
+def clear_caches(service, cache):
+    def clear():
+        cache.clear()
+        service.cache.local.clear()
+    return clear
+
+
+@pytest.mark.slow
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestIntegrationLatency:
+    """قياس زمن الاستجابة في حالات الذاكرة الباردة والدافئة والخدمة المتدهورة"""
+
+    def test_representatives_list_latency(self, content_service, content_stub, locmem_cache, user):
+        """زمن استجابة get_representatives_list"""
+        factory = RequestFactory()
+
+        def call_view():
+            request = factory.get('/representatives/', {'governorate': '1'})
+            request.user = user
+            response = get_representatives_list(request)
+            assert response.status_code == 200
+            return json.loads(response.content)
+
+        clear = clear_caches(content_service, locmem_cache)
+        results = {'cold': measure(call_view, before_each=clear)}
+
+        clear()
+        call_view()
+        results['warm'] = measure(call_view)
+
+        content_stub.configure(latency=0.02, error_rate=0.3, timeout_rate=0.1, stall_for=0.5)
+        results['degraded'] = measure(call_view, before_each=clear)
+
+        report('get_representatives_list', results)
+        assert results['warm']['p50'] < results['cold']['p50']
+        assert results['degraded']['p50'] >= results['cold']['p50']
+
+    def test_dashboard_context_latency(self, content_service, content_stub, locmem_cache):
+        """زمن تجهيز بيانات لوحة المواطن من خدمة المحتوى"""
+        clear = clear_caches(content_service, locmem_cache)
+
+        def build_context():
+            return integration_manager.get_messaging_context(user_id=1, representative_id=5)
+
+        results = {'cold': measure(build_context, before_each=clear)}
+
+        clear()
+        requests_before = content_stub.requests_served
+        build_context()
+        results['warm'] = measure(build_context)
+        # الطلبات الوحيدة هي التي سخّنت الذاكرة
+        assert content_stub.requests_served - requests_before == 4
+
+        content_stub.configure(latency=0.02, error_rate=0.3, timeout_rate=0.1, stall_for=0.5)
+        results['degraded'] = measure(build_context, before_each=clear)
+
+        report('get_messaging_context (dashboard)', results)
+        assert results['warm']['p95'] < results['cold']['p50']
+
+    def test_outbox_delivery_is_deduplicated(self, content_service, content_stub):
+        """تسليم صندوق الصادر إلى البديل المحلي مع تجاهل التكرار"""
+        for _ in range(5):
+            enqueue_message_count_increment(9)
+
+        start = time.perf_counter()
+        stats = drain_outbox()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\ndrain_outbox: {stats} in {elapsed:.2f}ms")
+
+        assert stats['calls'] == 1
+        assert content_stub.message_counts == {'9': 5}
+
+        # إعادة إرسال نفس الدفعة لا تغير العداد
+        content_service.increment_message_count(
+            9, count=5, idempotency_key=next(iter(content_stub.seen_idempotency_keys))
+        )
+        assert content_stub.message_counts == {'9': 5}
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+class TestNotificationDispatchThroughput:
+    """قياس معدل إرسال الإشعارات لكل عامل"""
+
+    def test_dispatch_throughput(self):
+        """عدد الرسائل في الثانية عبر اتصال واحد لكل قناة"""
+        users = [UserProfileFactory(sms_notifications=False).user for _ in range(200)]
+        enqueue_for_notifications(
+            SystemNotification.objects.create(
+                user=user, notification_type='system_update', title='إشعار', message='محتوى'
+            )
+            for user in users
+            for _ in range(3)
+        )
+
+        stats = dispatch_pending(batch_size=1000)
+        print(f"\ndispatch_pending: {stats['messages']} messages, {stats['per_second']}/s per worker")
+
+        assert stats['deliveries'] == 600
+        assert stats['messages'] == 200
+
+
+def index_size(name):
+    """حجم الفهرس بالبايت (جدول dbstat في SQLite)"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = %s', [name])
+        return cursor.fetchone()[0]
+
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return ' | '.join(row[-1] for row in cursor.fetchall())
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+class TestPartialIndexes:
+    """
+    الفهارس الجزئية لحالات "مفتوحة" و"بانتظار المراجعة" و"إشعار غير مقروء" مقارنة
+    بالفهارس المركبة الكاملة التي حلت محلها، على بيانات أغلبها مغلق/مراجَع/مقروء.
+
+    الرسائل تُقرأ بتحريك علامة قراءة المحادثة فيبقى is_read=False لأغلبها، كما في
+    الإنتاج؛ غير المقروء منها هو ما بعد العلامة ويُقرأ كنطاق في message_sender_timeline_idx.
+    """
+
+    # الفهرس الجزئي، والفهرس المركب الكامل الذي يخدم نفس الاستعلام بدون شرط
+    INDEXES = {
+        'conversation': ('conversation_open_idx', Conversation, ['is_closed', 'last_message_at']),
+        'report': ('report_unreviewed_idx', MessageReport, ['is_reviewed', 'created_at']),
+        'notification': ('notification_unread_idx', SystemNotification, ['user_id', 'is_read', 'created_at']),
+    }
+
+    @pytest.fixture
+    def dataset(self):
+        representative = UserFactory()
+        citizens = User.objects.bulk_create(User(username=f'citizen{n}') for n in range(2000))
+        now = timezone.now()
+
+        conversations = Conversation.objects.bulk_create(
+            Conversation(
+                citizen=citizen, representative=representative, subject=f'محادثة {n}',
+                is_closed=n % 10 != 0, last_message_at=now - timedelta(minutes=n),
+            )
+            for n, citizen in enumerate(citizens)
+        )
+        messages = Message.objects.bulk_create(
+            (
+                Message(conversation=conversation, sender=conversation.citizen, content=f'رسالة {n}')
+                for conversation in conversations
+                for n in range(10)
+            ),
+            batch_size=1000,
+        )
+        # النائب قرأ أول تسع رسائل في كل محادثة بعلامة القراءة فقط
+        for conversation, read_up_to in zip(conversations, messages[8::10]):
+            conversation.representative_last_read_at = read_up_to.created_at
+        Conversation.objects.bulk_update(conversations, ['representative_last_read_at'], batch_size=1000)
+        MessageReport.objects.bulk_create(
+            (
+                MessageReport(message=message, reporter=representative, reason='spam', is_reviewed=n % 30 != 0)
+                for n, message in enumerate(messages[::4])
+            ),
+            batch_size=1000,
+        )
+        SystemNotification.objects.bulk_create(
+            (
+                SystemNotification(
+                    user=citizen, notification_type='system_update', title='إشعار',
+                    message='محتوى', is_read=n % 10 != 0,
+                )
+                for citizen in citizens
+                for n in range(10)
+            ),
+            batch_size=1000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return {'representative': representative, 'citizen': citizens[0], 'conversation': conversations[0]}
+
+    def hot_queries(self, dataset):
+        conversation = dataset['conversation']
+        return {
+            'conversation': lambda: Conversation.objects.filter(is_closed=False).order_by('-last_message_at')[:20],
+            'report': lambda: MessageReport.objects.filter(is_reviewed=False).order_by('-created_at')[:20],
+            'notification': lambda: SystemNotification.objects.filter(user=dataset['citizen'], is_read=False),
+        }
+
+    def test_partial_indexes_are_smaller_and_used(self, dataset):
+        """الاستعلامات الساخنة تستخدم الفهارس الجزئية، وهي أصغر من الفهارس الكاملة"""
+        queries = self.hot_queries(dataset)
+        with connection.cursor() as cursor:
+            for label, (_, model, columns) in self.INDEXES.items():
+                cursor.execute(
+                    f'CREATE INDEX "bench_full_{label}" ON "{model._meta.db_table}" ({", ".join(columns)})'
+                )
+
+        print('\nindex sizes (partial vs full composite):')
+        for label, (name, _, _) in self.INDEXES.items():
+            partial, full = index_size(name), index_size(f'bench_full_{label}')
+            plan = query_plan(queries[label]())
+            print(f'  {label:<13} {partial:>9,}B vs {full:>9,}B  plan: {plan}')
+
+            assert partial < full / 2
+            assert name in plan
+
+    def test_unread_messages_scan_past_watermark(self, dataset):
+        """
+        غير المقروء نطاق بعد العلامة في فهرس (المحادثة، المرسل، الوقت)؛ فهرس جزئي
+        بشرط NOT is_read لا يستبعد شيئاً تقريباً لأن القراءة لا تغير is_read
+        """
+        conversation = Conversation.objects.get(pk=dataset['conversation'].pk)
+        unread = conversation._unread_from(conversation.citizen_id, conversation.representative_last_read_at)
+        plan = query_plan(unread)
+        print(f'\nunread messages plan: {plan}')
+
+        assert unread.count() == 1
+        assert 'message_sender_timeline_idx' in plan
+        assert 'created_at>?' in plan
+
+        # الفهرسان يُبنيان دفعة واحدة حتى تكون المقارنة بنفس كثافة الصفحات
+        table = Message._meta.db_table
+        columns = 'conversation_id, sender_id, created_at'
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE INDEX "bench_unread_full" ON "{table}" ({columns})')
+            cursor.execute(f'CREATE INDEX "bench_unread_partial" ON "{table}" ({columns}) WHERE NOT is_read')
+        assert index_size('bench_unread_partial') == index_size('bench_unread_full')
+
+    def test_partial_index_latency(self, dataset):
+        """زمن الاستعلامات الساخنة بالفهرس الجزئي ثم بالفهرس الكامل السابق"""
+        queries = self.hot_queries(dataset)
+        results = {}
+        for label, (name, model, columns) in self.INDEXES.items():
+            partial = measure(lambda: list(queries[label]()), iterations=50)
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP INDEX "{name}"')
+                cursor.execute(
+                    f'CREATE INDEX "bench_full_{label}" ON "{model._meta.db_table}" ({", ".join(columns)})'
+                )
+                cursor.execute('ANALYZE')
+            results[f'{label}'] = partial
+            results[f'{label}/full'] = measure(lambda: list(queries[label]()), iterations=50)
+
+        report('hot predicates: partial index vs full composite', results)
@@ -0,0 +1,300 @@
+"""
+اختبارات الإشعارات الجماعية - منصة نائبك.كوم
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from conftest import UserFactory, UserProfileFactory
+from messages import broadcasts
+from messages.models import BroadcastReceipt, NotificationBroadcast, SystemNotification
+
+
+@pytest.fixture
+def citizens():
+    """مواطنون في محافظتين"""
+    users = []
+    for governorate in ['القاهرة'] * 5 + ['الجيزة'] * 2:
+        profile = UserProfileFactory(user_type='citizen', governorate=governorate)
+        users.append(profile.user)
+    return users
+
+
+@pytest.fixture
+def admin_client(api_client):
+    """عميل API لمدير النظام"""
+    admin = UserFactory(is_staff=True)
+    refresh = RefreshToken.for_user(admin)
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    return api_client
+
+
+def make_broadcast(**kwargs):
+    kwargs.setdefault('notification_type', 'system_update')
+    kwargs.setdefault('title', 'تحديث')
+    kwargs.setdefault('message', 'تم تحديث المنصة')
+    kwargs.setdefault('delivery_mode', 'fan_out')
+    return NotificationBroadcast.objects.create(**kwargs)
+
+
+@pytest.mark.django_db
+class TestBroadcastFanOut:
+    """اختبارات إرسال الإشعارات على دفعات"""
+
+    def test_fans_out_in_chunks(self, citizens, settings, django_assert_max_num_queries):
+        """اختبار الإرسال على دفعات بعدد ثابت من الاستعلامات لكل دفعة"""
+        settings.BROADCAST_CHUNK_PAUSE = 0
+        broadcast = make_broadcast(target_user_type='citizen')
+
+        # 3 دفعات × (اختيار + إدراج + تفضيلات الإرسال + تحديث المؤشر + المعاملة) + البداية والنهاية
+        with django_assert_max_num_queries(26):
+            broadcast = broadcasts.fan_out(broadcast.pk, chunk_size=3)
+
+        assert broadcast.status == 'completed'
+        assert broadcast.delivered_count == 7
+        assert broadcast.last_user_id == max(u.pk for u in citizens)
+        assert SystemNotification.objects.filter(related_object_id=broadcast.pk).count() == 7
+
+    def test_targets_segment(self, citizens, representative_user, settings):
+        """اختبار استهداف شريحة حسب نوع المستخدم والمحافظة"""
+        settings.BROADCAST_CHUNK_PAUSE = 0
+        broadcast = make_broadcast(target_user_type='citizen', target_governorate='الجيزة')
+
+        broadcasts.fan_out(broadcast.pk)
+
+        recipients = set(SystemNotification.objects.values_list('user_id', flat=True))
+        assert recipients == {u.pk for u in citizens[5:]}
+
+    def test_resumes_from_cursor(self, citizens, settings, mocker):
+        """اختبار الاستئناف من آخر مستخدم دون تكرار الإشعارات"""
+        settings.BROADCAST_CHUNK_PAUSE = 0
+        broadcast = make_broadcast(target_user_type='citizen')
+        original = SystemNotification.objects.bulk_create
+        calls = {'count': 0}
+
+        def fail_second_chunk(objs, *args, **kwargs):
+            calls['count'] += 1
+            if calls['count'] == 2:
+                raise RuntimeError('انقطاع الاتصال')
+            return original(objs, *args, **kwargs)
+
+        mocker.patch.object(SystemNotification.objects, 'bulk_create', side_effect=fail_second_chunk)
+        with pytest.raises(RuntimeError):
+            broadcasts.fan_out(broadcast.pk, chunk_size=3)
+
+        broadcast.refresh_from_db()
+        assert broadcast.status == 'failed'
+        assert broadcast.delivered_count == 3
+
+        broadcast = broadcasts.fan_out(broadcast.pk, chunk_size=3)
+
+        assert broadcast.status == 'completed'
+        assert broadcast.delivered_count == 7
+        user_ids = list(SystemNotification.objects.values_list('user_id', flat=True))
+        assert sorted(user_ids) == sorted(u.pk for u in citizens)
+
+    def test_running_broadcast_not_fanned_out_twice(self, citizens, settings):
+        """اختبار أن عاملاً ثانياً لا يرسل إشعاراً جارياً من نفس المؤشر"""
+        settings.BROADCAST_CHUNK_PAUSE = 0
+        broadcast = make_broadcast(target_user_type='citizen', status='running')
+
+        broadcasts.fan_out(broadcast.pk)
+
+        assert not SystemNotification.objects.exists()
+
+    def test_stale_running_broadcast_resumed(self, citizens, settings):
+        """اختبار استئناف إشعار جارٍ توقف عامله دون تقدم"""
+        settings.BROADCAST_CHUNK_PAUSE = 0
+        broadcast = make_broadcast(target_user_type='citizen', status='running')
+        NotificationBroadcast.objects.filter(pk=broadcast.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=settings.BROADCAST_STALE_AFTER + 1)
+        )
+
+        broadcast = broadcasts.fan_out(broadcast.pk)
+
+        assert broadcast.status == 'completed'
+        assert SystemNotification.objects.count() == 7
+
+    def test_taken_over_worker_stops(self, citizens, settings, mocker):
+        """اختبار توقف العامل إذا تقدم عامل آخر بالمؤشر أثناء الإرسال"""
+        settings.BROADCAST_CHUNK_PAUSE = 1
+        broadcast = make_broadcast(target_user_type='citizen')
+        takeover_cursor = sorted(u.pk for u in citizens)[5]
+
+        def other_worker_advances(seconds):
+            NotificationBroadcast.objects.filter(pk=broadcast.pk).update(last_user_id=takeover_cursor)
+
+        mocker.patch('messages.broadcasts.time.sleep', side_effect=other_worker_advances)
+
+        broadcast = broadcasts.fan_out(broadcast.pk, chunk_size=3)
+
+        assert broadcast.status == 'running'
+        assert broadcast.last_user_id == takeover_cursor
+        assert SystemNotification.objects.count() == 3
+
+
+@pytest.mark.django_db
+class TestBroadcastAPI:
+    """اختبارات API الإشعارات الجماعية"""
+
+    def test_create_schedules_fan_out(self, admin_client, citizens, settings, django_capture_on_commit_callbacks):
+        """اختبار إنشاء إشعار جماعي وتشغيل الإرسال بعد الحفظ"""
+        settings.BROADCAST_CHUNK_PAUSE = 0
+        url = reverse('notificationbroadcast-list')
+        data = {
+            'notification_type': 'system_update',
+            'title': 'صيانة',
+            'message': 'صيانة مجدولة',
+            'target_user_type': 'citizen',
+            'delivery_mode': 'fan_out',
+        }
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = admin_client.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        broadcast = NotificationBroadcast.objects.get(pk=response.data['id'])
+        assert broadcast.total_recipients == 7
+        assert broadcast.status == 'completed'
+        assert SystemNotification.objects.filter(title='صيانة').count() == 7
+
+    def test_requires_admin(self, authenticated_client):
+        """اختبار منع غير المديرين"""
+        url = reverse('notificationbroadcast-list')
+        response = authenticated_client.post(url, {'title': 'x', 'message': 'y'}, format='json')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_resume_completed_is_rejected(self, admin_client):
+        """اختبار رفض استئناف إشعار مكتمل"""
+        broadcast = make_broadcast(status='completed')
+        url = reverse('notificationbroadcast-resume', kwargs={'pk': broadcast.pk})
+        response = admin_client.post(url)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_resume_running_is_rejected(self, admin_client):
+        """اختبار رفض استئناف إشعار ما زال يُرسل"""
+        broadcast = make_broadcast(status='running')
+        url = reverse('notificationbroadcast-resume', kwargs={'pk': broadcast.pk})
+        response = admin_client.post(url)
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_resume_pending_is_rejected(self, admin_client):
+        """اختبار رفض استئناف إشعار ما زالت مهمة إرساله بالانتظار"""
+        broadcast = make_broadcast(status='pending')
+        url = reverse('notificationbroadcast-resume', kwargs={'pk': broadcast.pk})
+        response = admin_client.post(url)
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_resume_stale_pending(self, admin_client, citizens, settings, django_capture_on_commit_callbacks):
+        """اختبار استئناف إشعار بانتظار مهمة ضاعت قبل أن تبدأ"""
+        settings.BROADCAST_CHUNK_PAUSE = 0
+        broadcast = make_broadcast(status='pending', target_user_type='citizen')
+        NotificationBroadcast.objects.filter(pk=broadcast.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=settings.BROADCAST_STALE_AFTER + 1)
+        )
+        url = reverse('notificationbroadcast-resume', kwargs={'pk': broadcast.pk})
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = admin_client.post(url)
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert SystemNotification.objects.count() == 7
+
+    def test_resume_failed(self, admin_client, citizens, settings, django_capture_on_commit_callbacks):
+        """اختبار استئناف إشعار متوقف بخطأ"""
+        settings.BROADCAST_CHUNK_PAUSE = 0
+        broadcast = make_broadcast(status='failed', target_user_type='citizen')
+        url = reverse('notificationbroadcast-resume', kwargs={'pk': broadcast.pk})
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = admin_client.post(url)
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert SystemNotification.objects.count() == 7
+
+
+def publish_shared(**kwargs):
+    kwargs['delivery_mode'] = 'shared'
+    broadcast = make_broadcast(**kwargs)
+    broadcasts.start(broadcast)
+    return broadcast
+
+
+@pytest.mark.django_db
+class TestSharedBroadcasts:
+    """اختبارات الإشعارات الجماعية المخزنة كصف واحد"""
+
+    def test_publish_creates_no_rows(self, citizens):
+        """اختبار نشر الإشعار دون إنشاء إشعار لكل مستخدم"""
+        broadcast = publish_shared(target_user_type='citizen')
+
+        assert broadcast.status == 'completed'
+        assert SystemNotification.objects.count() == 0
+        assert NotificationBroadcast.objects.visible_to(citizens[0]).count() == 1
+
+    def test_visibility_follows_segment(self, citizens, representative_user):
+        """اختبار ظهور الإشعار للشريحة المستهدفة فقط"""
+        publish_shared(target_user_type='citizen', target_governorate='الجيزة')
+
+        assert NotificationBroadcast.objects.visible_to(citizens[5]).exists()
+        assert not NotificationBroadcast.objects.visible_to(citizens[0]).exists()
+        assert not NotificationBroadcast.objects.visible_to(representative_user).exists()
+
+    def test_list_merges_personal_and_shared(self, authenticated_client, citizen_user):
+        """اختبار دمج الإشعارات الشخصية والمشتركة في قائمة واحدة مرتبة"""
+        SystemNotification.objects.create(
+            user=citizen_user, notification_type='new_message', title='رسالة', message='رسالة جديدة'
+        )
+        broadcast = publish_shared(title='صيانة')
+
+        response = authenticated_client.get(reverse('systemnotification-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 2
+        first, second = response.data['results']
+        assert first['id'] == str(broadcast.pk)
+        assert first['is_broadcast'] is True
+        assert first['is_read'] is False
+        assert second['title'] == 'رسالة'
+        assert second['is_broadcast'] is False
+
+    def test_filters_apply_to_shared(self, authenticated_client, citizen_user):
+        """اختبار تطبيق فلتر حالة القراءة على الإشعارات المشتركة"""
+        broadcast = publish_shared()
+        BroadcastReceipt.objects.create(broadcast=broadcast, user=citizen_user)
+
+        response = authenticated_client.get(reverse('systemnotification-list'), {'is_read': 'false'})
+
+        assert response.data['count'] == 0
+
+    def test_mark_read_writes_receipt(self, authenticated_client, citizen_user):
+        """اختبار تسجيل القراءة في جدول الإيصالات وتحديث العداد"""
+        broadcast = publish_shared()
+        count_url = reverse('systemnotification-unread-count')
+        assert authenticated_client.get(count_url).data['unread_count'] == 1
+
+        url = reverse('systemnotification-mark-read', kwargs={'pk': broadcast.pk})
+        response = authenticated_client.post(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['is_read'] is True
+        assert BroadcastReceipt.objects.filter(broadcast=broadcast, user=citizen_user).count() == 1
+        assert authenticated_client.get(count_url).data['unread_count'] == 0
+
+    def test_mark_all_read_includes_shared(self, authenticated_client, citizen_user):
+        """اختبار تحديد الإشعارات الشخصية والمشتركة كمقروءة"""
+        SystemNotification.objects.create(
+            user=citizen_user, notification_type='new_message', title='رسالة', message='رسالة جديدة'
+        )
+        publish_shared()
+        publish_shared(title='إشعار آخر')
+
+        response = authenticated_client.post(reverse('systemnotification-mark-all-read'))
+
+        assert response.data['notifications_marked_read'] == 3
+        assert BroadcastReceipt.objects.filter(user=citizen_user).count() == 2
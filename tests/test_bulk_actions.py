@@ -0,0 +1,161 @@
+"""
+اختبارات تنفيذ الإجراءات الإدارية الجماعية في الخلفية - منصة نائبك.كوم
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from conftest import ConversationFactory, UserFactory
+from messages import bulk_actions
+from messages.models import AdminBulkJob, Conversation, Message, MessageReport, ReportAggregate
+
+
+def run_action(admin_client, model, action, objects):
+    return admin_client.post(
+        reverse(f'admin:naebak_messages_{model}_changelist'),
+        {'action': action, '_selected_action': [str(obj.pk) for obj in objects]},
+        follow=True,
+    )
+
+
+@pytest.mark.django_db
+class TestAdminActions:
+    """اختبارات الإجراءات من لوحة الإدارة"""
+
+    def test_small_close_has_api_side_effects(self, admin_client, admin_user):
+        """اختبار أن الإغلاق المباشر يسجل التاريخ ويضيف رسالة النظام"""
+        conversations = ConversationFactory.create_batch(2)
+
+        run_action(admin_client, 'conversation', 'close_conversations', conversations)
+
+        for conversation in conversations:
+            conversation.refresh_from_db()
+            assert conversation.is_closed
+            assert conversation.closed_at is not None
+            assert conversation.closed_by == admin_user
+            assert conversation.messages.filter(is_system_message=True).count() == 1
+        assert not AdminBulkJob.objects.exists()
+
+    def test_large_selection_runs_as_job(self, admin_client, settings, django_capture_on_commit_callbacks):
+        """اختبار تحويل الاختيار الكبير إلى مهمة خلفية تنفذ على أجزاء"""
+        settings.ADMIN_BULK_ACTION_THRESHOLD = 3
+        settings.ADMIN_BULK_JOB_CHUNK_SIZE = 2
+        settings.ADMIN_BULK_JOB_BATCH_SIZE = 1
+        conversations = ConversationFactory.create_batch(5)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = run_action(admin_client, 'conversation', 'close_conversations', conversations)
+
+        assert 'في الخلفية' in response.content.decode()
+        job = AdminBulkJob.objects.get()
+        assert (job.status, job.progress) == ('completed', 100)
+        assert (job.processed_count, job.updated_count) == (5, 5)
+        assert not Conversation.objects.filter(is_closed=False).exists()
+        assert Message.objects.filter(is_system_message=True).count() == 5
+
+    def test_mark_messages_read_sets_read_at(self, admin_client, message):
+        """اختبار تسجيل وقت القراءة عند التحديد كمقروءة"""
+        run_action(admin_client, 'message', 'mark_as_read', [message])
+
+        message.refresh_from_db()
+        assert message.is_read and message.read_at is not None
+
+    def test_review_reports_refreshes_queue(self, admin_client, message):
+        """اختبار أن مراجعة الإبلاغات تخرج الرسالة من قائمة المراجعة"""
+        reports = [MessageReport.objects.create(message=message, reporter=UserFactory(), reason='spam')]
+
+        run_action(admin_client, 'messagereport', 'mark_as_reviewed', reports)
+
+        assert ReportAggregate.objects.get(message=message).pending_count == 0
+
+
+@pytest.mark.django_db
+class TestBulkJobs:
+    """اختبارات تنفيذ المهام واستئنافها"""
+
+    def test_chunks_report_progress(self, admin_user):
+        """اختبار تقدم المهمة جزءاً بعد جزء"""
+        conversations = ConversationFactory.create_batch(5)
+        job = bulk_actions.start('close_conversations', Conversation.objects.all(), admin_user)
+
+        assert bulk_actions.run(job.pk, chunk_size=2, batch_size=1) is True
+        job.refresh_from_db()
+        assert (job.status, job.processed_count, job.progress) == ('pending', 2, 40.0)
+
+        while bulk_actions.run(job.pk, chunk_size=2, batch_size=1):
+            pass
+        job.refresh_from_db()
+        assert job.status == 'completed'
+        assert Conversation.objects.filter(pk__in=[c.pk for c in conversations], is_closed=True).count() == 5
+
+    def test_failed_job_resumes_without_repeating(self, admin_user, mocker):
+        """اختبار استئناف المهمة المتوقفة من آخر دفعة مكتملة"""
+        ConversationFactory.create_batch(4)
+        job = bulk_actions.start('close_conversations', Conversation.objects.all(), admin_user)
+        original = bulk_actions.ACTIONS['close_conversations']
+        calls = []
+
+        def flaky(ids, user):
+            calls.append(ids)
+            if len(calls) == 3:
+                raise RuntimeError('انقطع الاتصال')
+            return original(ids, user)
+
+        mocker.patch.dict(bulk_actions.ACTIONS, {'close_conversations': flaky})
+        with pytest.raises(RuntimeError):
+            bulk_actions.run(job.pk, batch_size=1)
+        job.refresh_from_db()
+        assert (job.status, job.processed_count) == ('failed', 2)
+
+        mocker.patch.dict(bulk_actions.ACTIONS, {'close_conversations': original})
+        bulk_actions.run(job.pk, batch_size=1)
+
+        job.refresh_from_db()
+        assert (job.status, job.updated_count) == ('completed', 4)
+        assert Message.objects.filter(is_system_message=True).count() == 4
+
+    def test_stuck_job_resumed_from_admin(self, admin_client, admin_user, settings):
+        """اختبار استئناف مهمة توقف عاملها وهي قيد التنفيذ"""
+        settings.ADMIN_BULK_JOB_STALE_AFTER = 600
+        ConversationFactory.create_batch(3)
+        job = bulk_actions.start('close_conversations', Conversation.objects.all(), admin_user)
+        AdminBulkJob.objects.filter(pk=job.pk).update(
+            status='running', processed_count=1, updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        run_action(admin_client, 'adminbulkjob', 'resume_jobs', [job])
+
+        job.refresh_from_db()
+        assert (job.status, job.processed_count) == ('completed', 3)
+
+    def test_running_job_not_run_twice(self, admin_client, admin_user):
+        """اختبار عدم تشغيل مهمة جارية من عامل ثانٍ"""
+        ConversationFactory.create_batch(3)
+        job = bulk_actions.start('close_conversations', Conversation.objects.all(), admin_user)
+        AdminBulkJob.objects.filter(pk=job.pk).update(status='running', updated_at=timezone.now())
+
+        assert bulk_actions.run(job.pk) is False
+        run_action(admin_client, 'adminbulkjob', 'resume_jobs', [job])
+
+        job.refresh_from_db()
+        assert (job.status, job.processed_count) == ('running', 0)
+        assert Conversation.objects.filter(is_closed=False).count() == 3
+
+    def test_taken_over_worker_stops(self, admin_user, settings, mocker):
+        """اختبار توقف العامل إذا تقدم عامل آخر بالمؤشر أثناء التنفيذ"""
+        settings.ADMIN_BULK_JOB_PAUSE = 1
+        ConversationFactory.create_batch(4)
+        job = bulk_actions.start('close_conversations', Conversation.objects.all(), admin_user)
+
+        def other_worker_advances(seconds):
+            AdminBulkJob.objects.filter(pk=job.pk).update(processed_count=3)
+
+        mocker.patch('messages.bulk_actions.time.sleep', side_effect=other_worker_advances)
+
+        assert bulk_actions.run(job.pk, batch_size=1) is False
+        job.refresh_from_db()
+        assert (job.status, job.processed_count, job.updated_count) == ('running', 3, 1)
+        assert Conversation.objects.filter(is_closed=True).count() == 1
@@ -0,0 +1,133 @@
+"""
+اختبارات التخزين المؤقت ثنائي المستوى لخدمة الرسائل - منصة نائبك.كوم
+"""
+
+import threading
+import time
+
+import pytest
+
+from messages.cache import LocalLRUCache, TwoTierCache
+from messages.integrations import ContentServiceIntegration
+
+
+class TestLocalLRUCache:
+    """اختبارات الذاكرة المحلية LRU"""
+
+    def test_evicts_least_recently_used(self):
+        """اختبار إخراج أقدم عنصر عند تجاوز الحد"""
+        lru = LocalLRUCache(max_entries=2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+        lru.set('c', 3, 60)
+
+        assert lru.get('a') == (True, 1)
+        assert lru.get('b') == (False, None)
+        assert lru.get('c') == (True, 3)
+
+    def test_entry_expires(self, mocker):
+        """اختبار انتهاء صلاحية العنصر"""
+        clock = mocker.patch('messages.cache.time.monotonic', return_value=100.0)
+        lru = LocalLRUCache()
+        lru.set('key', 'value', 5)
+
+        clock.return_value = 104.0
+        assert lru.get('key') == (True, 'value')
+
+        clock.return_value = 105.0
+        assert lru.get('key') == (False, None)
+        assert len(lru) == 0
+
+
+@pytest.mark.usefixtures('locmem_cache')
+class TestTwoTierCache:
+    """اختبارات التخزين المؤقت ثنائي المستوى"""
+
+    def test_counts_hits_per_tier(self):
+        """اختبار عدادات الإصابة والإخفاق لكل مستوى"""
+        first = TwoTierCache()
+        first.set('governorates_list', ['القاهرة'], 300)
+
+        # عامل آخر: إخفاق محلي ثم إصابة في Redis ثم إصابة محلية
+        second = TwoTierCache()
+        assert second.get('governorates_list') == ['القاهرة']
+        assert second.get('governorates_list') == ['القاهرة']
+        assert second.get('missing') is None
+
+        stats = second.stats()
+        assert stats['local'] == {'hits': 1, 'misses': 2, 'entries': 1}
+        assert stats['shared'] == {'hits': 1, 'misses': 1}
+
+    def test_invalidation_from_other_worker(self):
+        """اختبار حذف النسخة المحلية عند وصول رسالة إبطال من عامل آخر"""
+        worker = TwoTierCache()
+        worker.set('parties', ['حزب'], 300)
+
+        worker.handle_invalidation(b'other-worker:parties')
+
+        assert worker.local.get('parties') == (False, None)
+        # القيمة ما زالت في المستوى المشترك
+        assert worker.get('parties') == ['حزب']
+
+    def test_ignores_own_invalidation(self):
+        """اختبار تجاهل رسائل الإبطال الصادرة من نفس العامل"""
+        worker = TwoTierCache()
+        worker.set('parties', ['حزب'], 300)
+
+        worker.handle_invalidation(f'{worker.instance_id}:parties')
+
+        assert worker.local.get('parties') == (True, ['حزب'])
+
+    def test_single_listener_under_concurrent_requests(self, mocker):
+        """اختبار تشغيل مستمع إبطال واحد فقط عند تزامن أول الطلبات"""
+        def slow_connection():
+            time.sleep(0.01)
+            return object()
+
+        mocker.patch('messages.cache.redis_client', side_effect=slow_connection)
+        listen = mocker.patch.object(TwoTierCache, '_listen')
+        worker = TwoTierCache()
+        barrier = threading.Barrier(8)
+
+        def first_request():
+            barrier.wait()
+            worker._ensure_listener()
+
+        threads = [threading.Thread(target=first_request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        worker._listener.join()
+
+        assert listen.call_count == 1
+
+
+@pytest.mark.usefixtures('locmem_cache')
+class TestContentServiceCaching:
+    """اختبارات تخزين بيانات خدمة المحتوى"""
+
+    def test_governorates_served_from_local_tier(self, mocker):
+        """اختبار خدمة المحافظات من الذاكرة المحلية دون طلبات إضافية"""
+        service = ContentServiceIntegration()
+        request = mocker.patch.object(
+            service, '_make_request', return_value={'results': [{'id': 1, 'name': 'القاهرة'}]}
+        )
+
+        for _ in range(3):
+            assert service.get_governorates() == [{'id': 1, 'name': 'القاهرة'}]
+
+        assert request.call_count == 1
+        assert service.cache_stats()['local']['hits'] == 2
+
+    def test_invalidate_drops_both_tiers(self, mocker):
+        """اختبار إبطال المفتاح من المستويين"""
+        service = ContentServiceIntegration()
+        request = mocker.patch.object(service, '_make_request', return_value={'results': [{'id': 1}]})
+        service.get_political_parties()
+
+        service.invalidate('political_parties_list')
+        service.get_political_parties()
+
+        assert request.call_count == 2
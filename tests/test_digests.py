@@ -0,0 +1,119 @@
+"""
+اختبارات الملخص اليومي للإشعارات - منصة نائبك.كوم
+"""
+
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.core import mail
+from django.utils import timezone
+
+from conftest import ConversationFactory, UserProfileFactory
+from messages.digests import build_daily_digests
+from messages.dispatch import dispatch_pending, enqueue_for_notifications
+from messages.models import Message, NotificationDelivery, SystemNotification
+from messages.notifications import notify_new_messages
+
+
+YESTERDAY = timezone.localdate() - timedelta(days=1)
+
+
+def notify(user, notification_type='new_message', count=1, day=YESTERDAY):
+    """إنشاء إشعارات للمستخدم في اليوم المحدد"""
+    notifications = [
+        SystemNotification.objects.create(
+            user=user, notification_type=notification_type, title=f'رسالة {i}', message=f'محتوى {i}'
+        )
+        for i in range(count)
+    ]
+    moment = timezone.make_aware(datetime.combine(day, time(12)))
+    SystemNotification.objects.filter(pk__in=[n.pk for n in notifications]).update(
+        created_at=moment, updated_at=moment
+    )
+    enqueue_for_notifications(notifications)
+    return notifications
+
+
+@pytest.fixture
+def digest_user():
+    return UserProfileFactory(notification_mode='digest', sms_notifications=False).user
+
+
+@pytest.mark.django_db
+class TestDailyDigest:
+    """اختبارات وضع الملخص اليومي"""
+
+    def test_low_priority_not_sent_instantly(self, digest_user):
+        """اختبار تأجيل الإشعارات منخفضة الأولوية وإرسال غيرها فوراً"""
+        notify(digest_user, count=3)
+        maintenance, = notify(digest_user, notification_type='maintenance')
+
+        deliveries = NotificationDelivery.objects.all()
+        assert [d.notification_id for d in deliveries] == [maintenance.pk]
+
+    def test_one_digest_per_user_from_single_query(self, django_assert_num_queries):
+        """اختبار إنشاء ملخص واحد لكل مستخدم باستعلام قراءة واحد"""
+        users = [UserProfileFactory(notification_mode='digest', sms_notifications=False).user for _ in range(3)]
+        for user in users:
+            notify(user, count=4)
+        instant_user = UserProfileFactory(sms_notifications=False).user
+        notify(instant_user, count=2)
+        NotificationDelivery.objects.all().delete()
+
+        # استعلام القراءة + إدراج الملخصات
+        with django_assert_num_queries(2):
+            stats = build_daily_digests(YESTERDAY)
+
+        assert stats == {'users': 3, 'notifications': 12, 'deliveries': 3}
+        assert set(NotificationDelivery.objects.values_list('user_id', flat=True)) == {u.pk for u in users}
+
+    def test_excludes_read_and_other_days(self, digest_user):
+        """اختبار استبعاد الإشعارات المقروءة وإشعارات الأيام الأخرى"""
+        first, _ = notify(digest_user, count=2)
+        first.mark_as_read()
+        notify(digest_user, day=timezone.localdate())
+
+        stats = build_daily_digests(YESTERDAY)
+
+        assert stats['notifications'] == 1
+
+    def test_rerun_is_deduplicated(self, digest_user):
+        """اختبار أن إعادة التشغيل لنفس اليوم لا تكرر الملخص"""
+        notify(digest_user, count=2)
+
+        build_daily_digests(YESTERDAY)
+        build_daily_digests(YESTERDAY)
+
+        assert NotificationDelivery.objects.filter(notification__isnull=True).count() == 1
+
+    def test_digest_sent_through_dispatcher(self, digest_user):
+        """اختبار إرسال الملخص عبر مرسل الإشعارات المجمع"""
+        notify(digest_user, count=3)
+
+        build_daily_digests(YESTERDAY)
+        dispatch_pending()
+
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].subject == f'ملخص إشعاراتك ليوم {YESTERDAY:%Y-%m-%d}: 3 إشعار'
+        assert 'رسالة 2' in mail.outbox[0].body
+
+    def test_includes_notification_coalesced_across_days(self, digest_user):
+        """اختبار دخول إشعار أُنشئ أمس الأول وجُمعت فيه رسائل أمس في ملخص أمس"""
+        conversation = ConversationFactory(citizen=digest_user)
+        Message.objects.create(conversation=conversation, sender=conversation.representative, content='الأولى')
+        notification = notify_new_messages(conversation.pk, digest_user.pk)
+        SystemNotification.objects.filter(pk=notification.pk).update(
+            created_at=timezone.make_aware(datetime.combine(YESTERDAY - timedelta(days=1), time(12)))
+        )
+
+        Message.objects.create(conversation=conversation, sender=conversation.representative, content='الثانية')
+        notify_new_messages(conversation.pk, digest_user.pk)
+        SystemNotification.objects.filter(pk=notification.pk).update(
+            updated_at=timezone.make_aware(datetime.combine(YESTERDAY, time(12)))
+        )
+
+        stats = build_daily_digests(YESTERDAY)
+
+        assert stats == {'users': 1, 'notifications': 1, 'deliveries': 1}
+        notification.refresh_from_db()
+        assert notification.event_count == 2
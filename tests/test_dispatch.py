@@ -0,0 +1,140 @@
+"""
+اختبارات إرسال الإشعارات بالبريد الإلكتروني والرسائل النصية - منصة نائبك.كوم
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.cache import cache
+from django.utils import timezone
+
+from conftest import UserProfileFactory
+from messages import sms
+from messages.dispatch import dispatch_pending, enqueue_for_notifications
+from messages.models import NotificationDelivery, SystemNotification
+
+
+@pytest.fixture(autouse=True)
+def sms_outbox():
+    sms.outbox.clear()
+    yield sms.outbox
+    sms.outbox.clear()
+
+
+def notify(user, count=1):
+    """إنشاء إشعارات للمستخدم وجدولة إرسالها"""
+    notifications = [
+        SystemNotification.objects.create(
+            user=user, notification_type='system_update', title=f'إشعار {i}', message=f'محتوى {i}'
+        )
+        for i in range(count)
+    ]
+    enqueue_for_notifications(notifications)
+    return notifications
+
+
+@pytest.mark.django_db
+class TestNotificationDispatch:
+    """اختبارات مرسل الإشعارات المجمع"""
+
+    def test_honours_profile_preferences(self):
+        """اختبار احترام تفضيلات المستخدم لكل قناة"""
+        email_only = UserProfileFactory(email_notifications=True, sms_notifications=False).user
+        sms_only = UserProfileFactory(email_notifications=False, sms_notifications=True, phone='01012345678').user
+        notify(email_only)
+        notify(sms_only)
+
+        channels = set(NotificationDelivery.objects.values_list('user_id', 'channel'))
+        assert channels == {(email_only.pk, 'email'), (sms_only.pk, 'sms')}
+
+    def test_deduplicates_deliveries(self):
+        """اختبار عدم تكرار إرسال نفس الإشعار"""
+        user = UserProfileFactory(sms_notifications=False).user
+        notification, = notify(user)
+
+        enqueue_for_notifications([notification])
+
+        assert NotificationDelivery.objects.count() == 1
+
+    def test_batches_per_user_and_channel(self, sms_outbox):
+        """اختبار تجميع إشعارات المستخدم في رسالة واحدة لكل قناة"""
+        user = UserProfileFactory(sms_notifications=True, phone='01012345678').user
+        notify(user, count=3)
+
+        stats = dispatch_pending()
+
+        assert stats['deliveries'] == 6
+        assert stats['messages'] == 2
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].subject == 'لديك 3 إشعارات جديدة'
+        assert mail.outbox[0].to == [user.email]
+        assert len(sms_outbox) == 1
+        assert not NotificationDelivery.objects.exclude(status='sent').exists()
+
+    def test_single_connection_per_channel(self, mocker):
+        """اختبار استخدام اتصال SMTP واحد لجميع المستخدمين"""
+        for _ in range(5):
+            notify(UserProfileFactory(sms_notifications=False).user)
+        get_connection = mocker.spy(mail, 'get_connection')
+
+        dispatch_pending()
+
+        assert get_connection.call_count == 1
+        assert len(mail.outbox) == 5
+
+    def test_rate_limit_defers_excess(self, settings, locmem_cache):
+        """اختبار تأجيل ما يتجاوز حد الإرسال للقناة"""
+        settings.NOTIFICATION_RATE_LIMITS = {'email': 2}
+        for _ in range(3):
+            notify(UserProfileFactory(sms_notifications=False).user)
+
+        stats = dispatch_pending()
+
+        assert stats['messages'] == 2
+        assert stats['deferred'] == 1
+        deferred = NotificationDelivery.objects.get(status='pending')
+        assert deferred.attempts == 0
+
+    def test_rate_limit_keeps_only_granted_budget(self, settings, locmem_cache, mocker):
+        """اختبار إعادة الجزء غير الممنوح من حصة الإرسال"""
+        settings.NOTIFICATION_RATE_LIMITS = {'email': 2}
+        mocker.patch('messages.dispatch.time.time', return_value=600.0)
+        for _ in range(5):
+            notify(UserProfileFactory(sms_notifications=False).user)
+
+        dispatch_pending()
+
+        assert cache.get('notification_rate:email:10') == 2
+
+    def test_status_not_written_after_lease_lost(self, mocker):
+        """اختبار عدم تسجيل النتيجة إذا استلم عامل آخر الإرسال بعد انتهاء المهلة"""
+        notify(UserProfileFactory(sms_notifications=False).user)
+        taken_over_until = timezone.now() + timedelta(minutes=5)
+
+        def slow_send(messages):
+            NotificationDelivery.objects.update(next_attempt_at=taken_over_until)
+            return len(messages)
+
+        mocker.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=slow_send)
+        dispatch_pending()
+
+        delivery = NotificationDelivery.objects.get()
+        assert (delivery.status, delivery.next_attempt_at) == ('pending', taken_over_until)
+
+    def test_failed_send_is_retried(self, mocker):
+        """اختبار إعادة المحاولة عند فشل الإرسال"""
+        user = UserProfileFactory(sms_notifications=False).user
+        notify(user)
+        mocker.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=ConnectionError('SMTP unavailable')
+        )
+
+        stats = dispatch_pending()
+
+        assert stats['failed'] == 1
+        delivery = NotificationDelivery.objects.get()
+        assert delivery.status == 'pending'
+        assert delivery.attempts == 1
+        assert 'SMTP unavailable' in delivery.last_error
@@ -0,0 +1,109 @@
+"""
+اختبارات مفاتيح منع التكرار لطلبات الإنشاء - منصة نائبك.كوم
+"""
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from conftest import UserProfileFactory
+from messages import idempotency
+from messages.models import Conversation, Message
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('locmem_cache')
+class TestIdempotencyKeys:
+    """اختبارات إعادة الرد الأول للطلبات المكررة"""
+
+    def post_message(self, client, conversation, key, content='مرحباً'):
+        return client.post(
+            reverse('message-list'),
+            {'conversation': conversation.id, 'content': content},
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_first_response(self, authenticated_client, conversation):
+        """اختبار أن إعادة المحاولة لا تنشئ رسالة ثانية"""
+        first = self.post_message(authenticated_client, conversation, 'retry-1')
+        second = self.post_message(authenticated_client, conversation, 'retry-1')
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert second.data == first.data
+        assert second[idempotency.REPLAY_HEADER] == 'true'
+        assert Message.objects.filter(conversation=conversation).count() == 1
+        conversation.refresh_from_db()
+        assert conversation.total_messages == 1
+
+    def test_new_key_creates_new_message(self, authenticated_client, conversation):
+        """اختبار أن المفتاح الجديد ينشئ رسالة جديدة"""
+        self.post_message(authenticated_client, conversation, 'key-1')
+        self.post_message(authenticated_client, conversation, 'key-2')
+
+        assert Message.objects.filter(conversation=conversation).count() == 2
+
+    def test_without_header_not_deduplicated(self, authenticated_client, conversation):
+        """اختبار أن الطلبات بدون المفتاح تعمل كما كانت"""
+        url = reverse('message-list')
+        for _ in range(2):
+            authenticated_client.post(url, {'conversation': conversation.id, 'content': 'مرحباً'})
+
+        assert Message.objects.filter(conversation=conversation).count() == 2
+
+    def test_key_reused_with_different_payload(self, authenticated_client, conversation):
+        """اختبار رفض استخدام المفتاح نفسه مع محتوى مختلف"""
+        self.post_message(authenticated_client, conversation, 'reused', content='أولى')
+        response = self.post_message(authenticated_client, conversation, 'reused', content='ثانية')
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert Message.objects.filter(conversation=conversation).count() == 1
+
+    def test_concurrent_duplicate_rejected(self, authenticated_client, conversation, mocker):
+        """اختبار رفض الطلب المكرر أثناء معالجة الأول"""
+        mocker.patch.object(idempotency.cache, 'add', return_value=False)
+
+        response = self.post_message(authenticated_client, conversation, 'in-flight')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not Message.objects.exists()
+
+    def test_failed_attempt_not_stored(self, authenticated_client, conversation):
+        """اختبار أن الطلب الفاشل يمكن إعادته بنفس المفتاح"""
+        response = authenticated_client.post(
+            reverse('message-list'), {'conversation': conversation.id, 'content': ''},
+            HTTP_IDEMPOTENCY_KEY='fails-first',
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = self.post_message(authenticated_client, conversation, 'fails-first')
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_keys_scoped_per_user(self, authenticated_client, conversation, representative_user):
+        """اختبار أن المفتاح نفسه من مستخدم آخر لا يعيد رد غيره"""
+        representative_client = APIClient()
+        representative_client.force_authenticate(user=representative_user)
+
+        self.post_message(authenticated_client, conversation, 'shared-key')
+        response = self.post_message(representative_client, conversation, 'shared-key')
+
+        assert idempotency.REPLAY_HEADER not in response
+        assert Message.objects.filter(conversation=conversation).count() == 2
+
+    def test_conversation_create_replayed(self, representative_user):
+        """اختبار منع تكرار إنشاء المحادثة"""
+        client = APIClient()
+        client.force_authenticate(user=UserProfileFactory(user_type='citizen').user)
+        data = {
+            'representative_id': representative_user.id,
+            'subject': 'استفسار',
+            'first_message': 'مرحباً',
+        }
+
+        responses = [
+            client.post(reverse('conversation-list'), data, HTTP_IDEMPOTENCY_KEY='new-conversation')
+            for _ in range(3)
+        ]
+
+        assert {response.status_code for response in responses} == {status.HTTP_201_CREATED}
+        assert Conversation.objects.filter(representative=representative_user).count() == 1
@@ -0,0 +1,123 @@
+"""
+اختبارات التكامل مع الخدمات الأخرى - منصة نائبك.كوم
+"""
+
+import time
+
+import jwt
+import pytest
+
+from messages.cache import TwoTierCache
+from messages.integrations import AuthServiceIntegration, ContentServiceIntegration, shared_cache
+
+
+SIGNING_KEY = 'auth-service-shared-secret-for-tests'
+
+
+def make_token(lifetime=3600, key=SIGNING_KEY, **claims):
+    """إنشاء توكن موقّع للاختبار"""
+    payload = {'user_id': 7, 'exp': int(time.time()) + lifetime, **claims}
+    return jwt.encode(payload, key, algorithm='HS256')
+
+
+@pytest.mark.usefixtures('locmem_cache')
+class TestAuthServiceTokenValidation:
+    """اختبارات التحقق من التوكن"""
+
+    def test_local_verification_skips_remote_call(self, settings, mocker):
+        """اختبار التحقق المحلي دون طلب لخدمة المصادقة"""
+        settings.AUTH_JWT_VERIFYING_KEY = SIGNING_KEY
+        auth = AuthServiceIntegration()
+        remote = mocker.patch.object(auth, '_make_request')
+
+        claims = auth.validate_token(make_token())
+
+        assert claims['user_id'] == 7
+        remote.assert_not_called()
+
+    def test_local_verification_rejects_bad_tokens(self, settings):
+        """اختبار رفض التوكن المنتهي أو ذي التوقيع الخاطئ"""
+        settings.AUTH_JWT_VERIFYING_KEY = SIGNING_KEY
+        auth = AuthServiceIntegration()
+
+        assert auth.validate_token(make_token(lifetime=-10)) is None
+        assert auth.validate_token(make_token(key='another-signing-key-of-enough-length')) is None
+
+    def test_remote_result_is_cached(self, mocker):
+        """اختبار تخزين نتيجة التحقق البعيد"""
+        auth = AuthServiceIntegration()
+        remote = mocker.patch.object(auth, '_make_request', return_value={'user_id': 7})
+        token = make_token()
+
+        assert auth.validate_token(token) == {'user_id': 7}
+        assert auth.validate_token(token) == {'user_id': 7}
+        assert remote.call_count == 1
+
+    def test_cache_bounded_by_token_expiry(self, mocker):
+        """اختبار عدم تخزين النتيجة بعد انتهاء صلاحية التوكن"""
+        auth = AuthServiceIntegration()
+        cache_set = mocker.spy(auth.cache, 'set')
+        mocker.patch.object(auth, '_make_request', return_value={'user_id': 7})
+
+        auth.validate_token(make_token(lifetime=30))
+
+        timeout = cache_set.call_args.args[2]
+        assert 0 < timeout <= 30
+
+    def test_revoked_token_is_evicted(self, settings, mocker):
+        """اختبار إبطال التوكن المسحوب حتى مع التحقق المحلي"""
+        settings.AUTH_JWT_VERIFYING_KEY = SIGNING_KEY
+        auth = AuthServiceIntegration()
+        token = make_token()
+        assert auth.validate_token(token) is not None
+
+        auth.revoke_token(token)
+
+        assert auth.validate_token(token) is None
+
+    def test_revocation_wins_over_stale_local_copy(self, settings, mocker):
+        """اختبار رفض التوكن المسحوب في عامل آخر ما زال يحتفظ بنسخة محلية"""
+        settings.AUTH_JWT_VERIFYING_KEY = SIGNING_KEY
+        settings.TOKEN_REVOCATION_LOCAL_TIMEOUT = 5
+        clock = mocker.patch('messages.cache.time.monotonic', return_value=100.0)
+        worker, other_worker = AuthServiceIntegration(TwoTierCache()), AuthServiceIntegration(TwoTierCache())
+        token = make_token()
+        assert worker.validate_token(token) is not None
+
+        # لا يوجد Redis هنا، فلا يصل إشعار الإبطال إلى العامل الأول
+        other_worker.revoke_token(token)
+
+        # النسخة المحلية للتحقق ما زالت صالحة، لكن نتيجة "غير مسحوب" انتهت
+        clock.return_value = 106.0
+        assert worker.validate_token(token) is None
+
+    def test_revocation_lookup_cached_locally(self, settings, mocker):
+        """اختبار عدم سؤال Redis عن سحب التوكن في كل طلب"""
+        settings.AUTH_JWT_VERIFYING_KEY = SIGNING_KEY
+        auth = AuthServiceIntegration()
+        token = make_token()
+
+        for _ in range(3):
+            assert auth.validate_token(token) is not None
+
+        assert auth.cache.stats()['shared'] == {'hits': 0, 'misses': 2}
+
+    def test_revocation_invalidates_local_lookup(self, settings):
+        """اختبار أن إشعار الإبطال يلغي نتيجة "غير مسحوب" المحلية فوراً"""
+        settings.AUTH_JWT_VERIFYING_KEY = SIGNING_KEY
+        worker, other_worker = AuthServiceIntegration(TwoTierCache()), AuthServiceIntegration(TwoTierCache())
+        token = make_token()
+        assert worker.validate_token(token) is not None
+
+        other_worker.revoke_token(token)
+        worker.cache.handle_invalidation(
+            f"{other_worker.cache.instance_id}:auth_token_revoked_{other_worker._token_hash(token)}"
+        )
+
+        assert worker.validate_token(token) is None
+
+
+def test_integrations_share_one_cache():
+    """اختبار مشاركة التكاملات لذاكرة مؤقتة واحدة (ومستمع إبطال واحد) في العملية"""
+    assert ContentServiceIntegration().cache is shared_cache
+    assert AuthServiceIntegration().cache is shared_cache
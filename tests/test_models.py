@@ -129,6 +129,32 @@ class TestConversation:
         assert conversation.last_message_at == message.created_at
         assert conversation.last_message_by == citizen_user
         assert conversation.total_messages == 1
+    
+    def test_mark_read_by_advances_watermark(self, conversation, citizen_user, representative_user):
+        """اختبار علامة القراءة: تحديث صف واحد واشتقاق الرسائل غير المقروءة"""
+        first = Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة 1')
+        assert conversation.unread_count_for_representative == 1
+        
+        assert conversation.mark_read_by(representative_user) is True
+        second = Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة 2')
+        
+        conversation.refresh_from_db()
+        first.refresh_from_db()
+        assert first.is_read is False  # لا يتم تعديل صفوف الرسائل
+        assert first.read_by_recipient is True
+        assert second.read_by_recipient is False
+        assert conversation.unread_count_for_representative == 1
+        assert list(Message.objects.unread_for(representative_user)) == [second]
+    
+    def test_mark_read_by_never_moves_backwards(self, conversation, representative_user, user):
+        """اختبار عدم رجوع علامة القراءة للخلف وتجاهل غير المشاركين"""
+        now = timezone.now()
+        conversation.mark_read_by(representative_user, now)
+        
+        assert conversation.mark_read_by(representative_user, now - timedelta(minutes=5)) is False
+        assert conversation.mark_read_by(user) is False
+        conversation.refresh_from_db()
+        assert conversation.representative_last_read_at == now
 
 
 @pytest.mark.django_db
@@ -158,6 +184,21 @@ class TestMessage:
         assert message.is_read is True
         assert message.read_at is not None
     
+    def test_create_updates_conversation_without_counting(self, conversation, citizen_user, django_assert_num_queries):
+        """اختبار تحديث إحصائيات المحادثة دون عد رسائلها عند كل إرسال"""
+        for i in range(3):
+            Message.objects.create(conversation=conversation, sender=citizen_user, content=f'رسالة {i}')
+        
+        # إدراج الرسالة + تحديث المحادثة + تحديث المشاركين
+        with django_assert_num_queries(3):
+            message = Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة')
+        
+        conversation.refresh_from_db()
+        assert conversation.total_messages == 4
+        assert conversation.last_message_at == message.created_at
+        assert conversation.last_message_by == citizen_user
+        assert set(conversation.participants.values_list('last_message_at', flat=True)) == {message.created_at}
+    
     def test_system_message(self, conversation, citizen_user):
         """اختبار رسالة النظام"""
         message = Message.objects.create(
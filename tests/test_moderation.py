@@ -0,0 +1,171 @@
+"""
+اختبارات قائمة مراجعة الإبلاغات حسب الأولوية - منصة نائبك.كوم
+"""
+
+from datetime import timedelta
+from importlib import import_module
+
+import pytest
+from django.apps import apps
+from django.db.models.query import QuerySet
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from conftest import ConversationFactory, UserFactory
+from messages import moderation
+from messages.models import Message, MessageReport, ReportAggregate
+
+
+@pytest.fixture
+def moderator_client(api_client):
+    """عميل API لمشرف"""
+    moderator = UserFactory(is_staff=True)
+    refresh = RefreshToken.for_user(moderator)
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    return api_client
+
+
+def reported_message(reports, reason='spam'):
+    """رسالة أبلغ عنها عدد من المستخدمين"""
+    conversation = ConversationFactory()
+    message = Message.objects.create(conversation=conversation, sender=conversation.citizen, content='محتوى')
+    for _ in range(reports):
+        MessageReport.objects.create(message=message, reporter=UserFactory(), reason=reason)
+    return message
+
+
+@pytest.mark.django_db
+class TestReportAggregates:
+    """اختبارات صيانة ملخص الإبلاغات"""
+
+    def test_maintained_on_report(self):
+        """اختبار تحديث الملخص مع كل إبلاغ"""
+        message = reported_message(2, reason='spam')
+        MessageReport.objects.create(message=message, reporter=UserFactory(), reason='harassment')
+
+        aggregate = ReportAggregate.objects.get(message=message)
+        assert (aggregate.report_count, aggregate.pending_count) == (3, 3)
+        assert aggregate.reason_counts == {'spam': 2, 'harassment': 1}
+        assert aggregate.severity == 5
+        assert aggregate.priority > 0
+
+    def test_review_updates_pending(self, user):
+        """اختبار أن المراجعة تنقص الإبلاغات المعلقة"""
+        message = reported_message(2)
+        message.reports.first().mark_as_reviewed(user)
+
+        aggregate = ReportAggregate.objects.get(message=message)
+        assert (aggregate.report_count, aggregate.pending_count) == (2, 1)
+
+    def test_removed_with_last_report(self):
+        """اختبار حذف الملخص مع حذف آخر إبلاغ"""
+        message = reported_message(1)
+        message.reports.get().delete()
+
+        assert not ReportAggregate.objects.exists()
+
+    def test_new_reports_added_incrementally(self, user, mocker):
+        """اختبار أن الإبلاغ الجديد يحدّث الملخص دون إعادة التجميع وبنفس نتيجته"""
+        message = reported_message(2, reason='harassment')
+        for report in message.reports.all():
+            report.mark_as_reviewed(user)
+        refresh = mocker.spy(moderation, 'refresh_aggregates')
+
+        MessageReport.objects.create(message=message, reporter=UserFactory(), reason='spam')
+        MessageReport.objects.create(message=message, reporter=UserFactory(), reason='harassment')
+
+        refresh.assert_not_called()
+        fields = ['report_count', 'pending_count', 'pending_weight', 'reason_counts', 'severity',
+                  'first_reported_at', 'last_reported_at', 'priority']
+        incremental = ReportAggregate.objects.values(*fields).get(message=message)
+        moderation.refresh_aggregates([message.pk])
+        assert ReportAggregate.objects.values(*fields).get(message=message) == incremental
+        assert incremental['reason_counts'] == {'harassment': 3, 'spam': 1}
+
+    def test_refresh_locks_messages_first(self, mocker):
+        """اختبار قفل صفوف الرسائل قبل التجميع حتى لا يُكتب ملخص قديم"""
+        message = reported_message(1)
+        lock = mocker.spy(QuerySet, 'select_for_update')
+
+        moderation.refresh_aggregates([message.pk])
+
+        assert lock.call_count == 1
+
+    def test_migration_backfill_matches_live_aggregates(self):
+        """اختبار أن تعبئة الترحيل تطابق حساب الملخص الحي"""
+        spam, harassment = reported_message(2), reported_message(1, reason='harassment')
+        MessageReport.objects.create(message=spam, reporter=UserFactory(), reason='harassment')
+        spam.reports.first().mark_as_reviewed(UserFactory())
+        fields = ['message_id', 'report_count', 'pending_count', 'reason_counts', 'severity',
+                  'first_reported_at', 'last_reported_at', 'priority']
+        live = list(ReportAggregate.objects.order_by('message_id').values(*fields))
+        ReportAggregate.objects.all().delete()
+
+        import_module('messages.migrations.0015_report_aggregates').build_aggregates(apps, None)
+
+        assert list(ReportAggregate.objects.order_by('message_id').values(*fields)) == live
+        assert {row['message_id'] for row in live} == {spam.pk, harassment.pk}
+
+    def test_priority_orders_by_count_severity_and_recency(self):
+        """اختبار أن الأولوية تزيد بعدد الإبلاغات وخطورتها وحداثتها"""
+        now = timezone.now()
+        decay = timedelta(seconds=45000)
+
+        assert moderation.priority_for(10, now) > moderation.priority_for(2, now)
+        assert moderation.priority_for(2, now) > moderation.priority_for(2, now - decay)
+        # عشرة أضعاف الإبلاغات تعادل أن تكون أحدث بمدة التلاشي
+        assert moderation.priority_for(20, now - decay) == pytest.approx(moderation.priority_for(2, now))
+        assert moderation.priority_for(0, now) == 0
+
+
+@pytest.mark.django_db
+class TestModerationQueueAPI:
+    """اختبارات واجهة قائمة المراجعة"""
+
+    def test_grouped_and_prioritised(self, moderator_client):
+        """اختبار ظهور الرسالة مرة واحدة مع ترتيبها حسب الأولوية"""
+        few = reported_message(2, reason='spam')
+        many = reported_message(8, reason='spam')
+        severe = reported_message(3, reason='harassment')
+
+        response = moderator_client.get(reverse('moderation-queue-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 3
+        assert [item['message'] for item in response.data['results']] == [many.id, severe.id, few.id]
+        assert response.data['results'][0]['pending_count'] == 8
+
+    def test_constant_queries_per_page(self, moderator_client, django_assert_num_queries):
+        """اختبار أن عدد الاستعلامات ثابت مهما كان عدد العناصر"""
+        url = reverse('moderation-queue-list')
+        reported_message(1)
+
+        # المصادقة + العدد + الصفحة
+        with django_assert_num_queries(3):
+            moderator_client.get(url)
+
+        for reports in range(2, 13):
+            reported_message(reports)
+        with django_assert_num_queries(3):
+            response = moderator_client.get(url)
+        assert len(response.data['results']) == 12
+
+    def test_resolve_reviews_all_reports(self, moderator_client):
+        """اختبار مراجعة جميع إبلاغات الرسالة وخروجها من القائمة"""
+        message = reported_message(4)
+
+        response = moderator_client.post(
+            reverse('moderation-queue-resolve', args=[message.id]), {'action_taken': 'تم حذف الرسالة'}
+        )
+
+        assert response.data == {'reviewed_reports': 4}
+        assert not MessageReport.objects.filter(message=message, is_reviewed=False).exists()
+        assert moderator_client.get(reverse('moderation-queue-list')).data['count'] == 0
+
+    def test_requires_staff(self, authenticated_client):
+        """اختبار أن القائمة للإدارة فقط"""
+        response = authenticated_client.get(reverse('moderation-queue-list'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,100 @@
+"""
+اختبارات إشعارات الرسائل الجديدة - منصة نائبك.كوم
+"""
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from conftest import UserFactory
+from messages import notifications
+from messages.models import Conversation, Message, SystemNotification
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('locmem_cache')
+class TestNewMessageNotifications:
+    """اختبارات تجميع إشعارات الرسائل الجديدة"""
+
+    def test_burst_produces_one_notification(self, authenticated_client, conversation, representative_user,
+                                             django_capture_on_commit_callbacks):
+        """اختبار أن عشر رسائل متتالية تنتج إشعاراً واحداً محدثاً"""
+        url = reverse('message-list')
+        for i in range(10):
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.post(url, {'conversation': conversation.id, 'content': f'رسالة {i}'})
+            assert response.status_code == status.HTTP_201_CREATED
+
+        notification = SystemNotification.objects.get(user=representative_user)
+        assert notification.notification_type == 'new_message'
+        assert notification.related_object_id == conversation.id
+        assert notification.event_count == 10
+        assert notification.title == '10 رسائل جديدة'
+        assert notification.message.endswith('رسالة 9')
+
+    def test_not_created_on_request_path(self, authenticated_client, conversation, django_capture_on_commit_callbacks):
+        """اختبار أن الإنشاء يُجدول بعد حفظ المعاملة فقط"""
+        url = reverse('message-list')
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            authenticated_client.post(url, {'conversation': conversation.id, 'content': 'مرحباً'})
+
+        assert len(callbacks) == 1
+        assert not SystemNotification.objects.exists()
+
+    def test_window_schedules_single_task(self, conversation, citizen_user, mocker,
+                                          django_capture_on_commit_callbacks):
+        """اختبار جدولة مهمة واحدة لكل محادثة ومستلم خلال نافذة التجميع"""
+        task = mocker.patch('messages.tasks.notify_new_messages.apply_async')
+        with django_capture_on_commit_callbacks(execute=True):
+            for i in range(5):
+                Message.objects.create(conversation=conversation, sender=citizen_user, content=f'رسالة {i}')
+
+        assert task.call_count == 1
+
+    def test_read_notification_starts_new_one(self, conversation, citizen_user, representative_user):
+        """اختبار إنشاء إشعار جديد بعد قراءة السابق"""
+        Message.objects.create(conversation=conversation, sender=citizen_user, content='أولى')
+        first = notifications.notify_new_messages(conversation.id, representative_user.id)
+        first.mark_as_read()
+
+        Message.objects.create(conversation=conversation, sender=citizen_user, content='ثانية')
+        second = notifications.notify_new_messages(conversation.id, representative_user.id)
+
+        assert second.pk != first.pk
+        assert SystemNotification.objects.filter(user=representative_user, is_read=False).count() == 1
+
+    def test_nothing_when_already_read(self, conversation, citizen_user, representative_user):
+        """اختبار عدم إنشاء إشعار إذا قُرئت الرسائل قبل تنفيذ المهمة"""
+        Message.objects.create(conversation=conversation, sender=citizen_user, content='مرحباً')
+        conversation.mark_read_by(representative_user)
+
+        assert notifications.notify_new_messages(conversation.id, representative_user.id) is None
+        assert not SystemNotification.objects.exists()
+
+    def test_hidden_messages_not_notified(self, conversation, citizen_user, representative_user):
+        """اختبار عدم احتساب الرسائل المخفية أو نسخ نصها في الإشعار"""
+        Message.objects.create(conversation=conversation, sender=citizen_user, content='مرحباً')
+        Message.objects.create(conversation=conversation, sender=citizen_user, content='نص مسيء', is_hidden=True)
+
+        notification = notifications.notify_new_messages(conversation.id, representative_user.id)
+
+        assert notification.event_count == 1
+        assert 'مسيء' not in notification.message
+
+    def test_bulk_send_notifies_each_citizen(self, representative_client, representative_user,
+                                             django_capture_on_commit_callbacks):
+        """اختبار إشعار كل مواطن عند الرد الجماعي"""
+        citizens = [UserFactory() for _ in range(3)]
+        conversations = [
+            Conversation.objects.create(citizen=citizen, representative=representative_user, subject='استفسار')
+            for citizen in citizens
+        ]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            representative_client.post(reverse('message-bulk-send'), {
+                'content': 'تم استلام طلبكم',
+                'conversation_ids': [str(c.id) for c in conversations]
+            }, format='json')
+
+        notified = set(SystemNotification.objects.values_list('user_id', flat=True))
+        assert notified == {citizen.pk for citizen in citizens}
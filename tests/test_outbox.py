@@ -0,0 +1,138 @@
+"""
+اختبارات صندوق الصادر لخدمة الرسائل - منصة نائبك.كوم
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from messages.integrations import integration_manager
+from messages.models import OutboxEvent
+from messages.outbox import drain_outbox, enqueue_message_count_increment
+from messages.tasks import drain_outbox as drain_outbox_task
+
+
+@pytest.mark.django_db
+class TestOutbox:
+    """اختبارات تسليم أحداث صندوق الصادر"""
+
+    def test_coalesces_increments_per_representative(self, mocker):
+        """اختبار دمج الزيادات في طلب واحد لكل نائب"""
+        increment = mocker.patch.object(
+            integration_manager.content_service, 'increment_message_count', return_value=True
+        )
+        for _ in range(3):
+            enqueue_message_count_increment(11)
+        enqueue_message_count_increment(12)
+
+        stats = drain_outbox()
+
+        assert stats == {'events': 4, 'calls': 2, 'delivered': 4, 'failed': 0}
+        counts = {call.args[0]: call.kwargs['count'] for call in increment.call_args_list}
+        assert counts == {'11': 3, '12': 1}
+        assert not OutboxEvent.objects.filter(processed_at__isnull=True).exists()
+
+    def test_failed_delivery_is_retried_with_backoff(self, mocker):
+        """اختبار إعادة المحاولة مع تأخير متزايد عند الفشل"""
+        increment = mocker.patch.object(
+            integration_manager.content_service, 'increment_message_count', return_value=False
+        )
+        event = enqueue_message_count_increment(11)
+
+        drain_outbox()
+        event.refresh_from_db()
+        assert event.processed_at is None
+        assert event.attempts == 1
+        assert event.next_attempt_at > timezone.now()
+
+        # لم يحن موعد المحاولة التالية بعد
+        assert drain_outbox()['events'] == 0
+
+        OutboxEvent.objects.update(next_attempt_at=timezone.now())
+        increment.return_value = True
+        drain_outbox()
+        event.refresh_from_db()
+        assert event.processed_at is not None
+
+    def test_idempotency_key_is_stable_for_a_batch(self, mocker):
+        """اختبار ثبات مفتاح عدم التكرار عند إعادة إرسال نفس الدفعة"""
+        increment = mocker.patch.object(
+            integration_manager.content_service, 'increment_message_count', return_value=False
+        )
+        enqueue_message_count_increment(11)
+        enqueue_message_count_increment(11)
+
+        drain_outbox()
+        OutboxEvent.objects.update(next_attempt_at=timezone.now())
+        drain_outbox()
+
+        first, second = increment.call_args_list
+        assert first.kwargs['idempotency_key'] == second.kwargs['idempotency_key']
+
+    def test_dead_lettered_after_max_attempts(self, mocker, settings):
+        """اختبار التوقف عن المحاولة بعد استنفاد الحد الأقصى"""
+        settings.OUTBOX_MAX_ATTEMPTS = 2
+        mocker.patch.object(
+            integration_manager.content_service, 'increment_message_count', return_value=False
+        )
+        event = enqueue_message_count_increment(11)
+
+        for _ in range(2):
+            OutboxEvent.objects.update(next_attempt_at=timezone.now())
+            drain_outbox()
+
+        event.refresh_from_db()
+        assert (event.attempts, event.processed_at) == (2, None)
+        assert event.failed_at is not None
+        OutboxEvent.objects.update(next_attempt_at=timezone.now())
+        assert drain_outbox()['events'] == 0
+
+    def test_attempts_counted_per_event_in_a_group(self, mocker, settings):
+        """اختبار أن الحدث الجديد المدمج مع حدث قديم فاشل لا يتوقف معه"""
+        settings.OUTBOX_MAX_ATTEMPTS = 3
+        mocker.patch.object(
+            integration_manager.content_service, 'increment_message_count', return_value=False
+        )
+        old = enqueue_message_count_increment(11)
+        OutboxEvent.objects.filter(pk=old.pk).update(attempts=2)
+        new = enqueue_message_count_increment(11)
+
+        drain_outbox()
+
+        old.refresh_from_db()
+        new.refresh_from_db()
+        assert (old.attempts, new.attempts) == (3, 1)
+        assert old.failed_at is not None
+        assert new.failed_at is None
+        assert new.next_attempt_at < old.next_attempt_at
+
+    def test_result_not_written_after_lease_lost(self, mocker):
+        """اختبار عدم كتابة النتيجة إذا انتهت المهلة واستلم عامل آخر الحدث"""
+        event = enqueue_message_count_increment(11)
+        taken_over_until = timezone.now() + timedelta(minutes=5)
+
+        def slow_delivery(*args, **kwargs):
+            # عامل آخر استلم الحدث بعد انتهاء مهلة هذا العامل
+            OutboxEvent.objects.update(next_attempt_at=taken_over_until)
+            return False
+
+        mocker.patch.object(
+            integration_manager.content_service, 'increment_message_count', side_effect=slow_delivery
+        )
+        drain_outbox()
+
+        event.refresh_from_db()
+        assert event.attempts == 0
+        assert event.next_attempt_at == taken_over_until
+
+    def test_task_drains_outbox(self, mocker):
+        """اختبار مهمة Celery لتفريغ صندوق الصادر"""
+        mocker.patch.object(
+            integration_manager.content_service, 'increment_message_count', return_value=True
+        )
+        enqueue_message_count_increment(11)
+
+        drain_outbox_task.delay()
+
+        assert OutboxEvent.objects.filter(processed_at__isnull=False).count() == 1
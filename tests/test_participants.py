@@ -0,0 +1,123 @@
+"""
+اختبارات جدول المشاركين في المحادثات - منصة نائبك.كوم
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from conftest import ConversationFactory, UserFactory
+from messages.models import Conversation, ConversationParticipant, Message
+
+
+@pytest.mark.django_db
+class TestConversationParticipants:
+    """اختبارات صيانة صفوف المشاركة واستخدامها في الاستعلامات"""
+
+    def test_created_with_conversation(self, conversation, citizen_user, representative_user):
+        """اختبار إنشاء صف لكل طرف عند إنشاء المحادثة"""
+        participants = dict(conversation.participants.values_list('user_id', 'role'))
+
+        assert participants == {citizen_user.id: 'citizen', representative_user.id: 'representative'}
+
+    def test_resynced_when_party_changes(self, conversation, citizen_user, representative_user):
+        """اختبار نقل صف المشاركة عند تغيير النائب (مثلاً من لوحة الإدارة)"""
+        new_representative = UserFactory()
+        conversation = Conversation.objects.get(pk=conversation.pk)
+        conversation.representative = new_representative
+        conversation.save()
+
+        participants = dict(conversation.participants.values_list('user_id', 'role'))
+        assert participants == {citizen_user.id: 'citizen', new_representative.id: 'representative'}
+        assert not Conversation.objects.filter(participants__user=representative_user).exists()
+
+    def test_unchanged_parties_not_resynced(self, conversation, django_assert_num_queries):
+        """اختبار عدم إعادة مطابقة المشاركين عند حفظ لا يغير الطرفين"""
+        conversation = Conversation.objects.get(pk=conversation.pk)
+        conversation.subject = 'موضوع جديد'
+
+        # الحفظ + مزامنة آخر رسالة لدى المشاركين
+        with django_assert_num_queries(2):
+            conversation.save()
+
+    def test_bulk_create_adds_participants(self, citizen_user, representative_user):
+        """اختبار إنشاء صفوف المشاركة للمحادثات المنشأة بـ bulk_create"""
+        conversations = Conversation.objects.bulk_create([
+            Conversation(citizen=citizen_user, representative=representative_user, subject=f'محادثة {i}')
+            for i in range(3)
+        ])
+
+        for conversation in conversations:
+            assert set(conversation.participants.values_list('user_id', flat=True)) == {
+                citizen_user.id, representative_user.id
+            }
+
+    def test_last_message_at_follows_conversation(self, conversation, citizen_user):
+        """اختبار تحديث آخر رسالة لدى المشاركين عند إرسال رسالة"""
+        message = Message.objects.create(conversation=conversation, sender=citizen_user, content='مرحباً')
+
+        assert set(conversation.participants.values_list('last_message_at', flat=True)) == {message.created_at}
+
+    def test_bulk_send_updates_participants(self, representative_client, representative_user):
+        """اختبار تحديث آخر رسالة لدى المشاركين في الإرسال الجماعي"""
+        conversations = [ConversationFactory(representative=representative_user) for _ in range(3)]
+
+        response = representative_client.post(reverse('message-bulk-send'), {
+            'conversation_ids': [str(c.id) for c in conversations],
+            'content': 'رد موحد',
+        }, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+
+        for conversation in conversations:
+            conversation.refresh_from_db()
+            assert set(conversation.participants.values_list('last_message_at', flat=True)) == {
+                conversation.last_message_at
+            }
+
+    def test_conversation_list_without_or_and_distinct(self, authenticated_client, conversation):
+        """اختبار أن قائمة المحادثات تستخدم جدول المشاركين بدون OR أو DISTINCT"""
+        ConversationFactory()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get(reverse('conversation-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data['results']] == [str(conversation.id)]
+        sql = ' '.join(query['sql'] for query in queries.captured_queries if 'naebak_messages_conversation"' in query['sql'])
+        assert 'conversationparticipant' in sql
+        assert 'DISTINCT' not in sql
+        assert ' OR ' not in sql
+
+    def test_message_list_scoped_to_participant(self, authenticated_client, message):
+        """اختبار أن المستخدم يرى رسائل محادثاته فقط"""
+        other = ConversationFactory()
+        Message.objects.create(conversation=other, sender=other.citizen, content='ليست لك')
+
+        response = authenticated_client.get(reverse('message-list'))
+
+        assert [item['id'] for item in response.data['results']] == [str(message.id)]
+
+    def test_my_conversations_ordered_by_last_message(self, authenticated_client, citizen_user):
+        """اختبار ترتيب محادثات المستخدم حسب آخر رسالة"""
+        older, newer = ConversationFactory(citizen=citizen_user), ConversationFactory(citizen=citizen_user)
+        Message.objects.create(conversation=older, sender=citizen_user, content='أحدث رسالة')
+
+        response = authenticated_client.get(reverse('conversation-my-conversations'))
+
+        assert [item['id'] for item in response.data['results']] == [str(older.id), str(newer.id)]
+
+    def test_unread_for_uses_participants(self, conversation, citizen_user, representative_user):
+        """اختبار الرسائل غير المقروءة عبر جدول المشاركين"""
+        Message.objects.create(conversation=conversation, sender=citizen_user, content='واردة')
+        Message.objects.create(conversation=conversation, sender=representative_user, content='صادرة')
+
+        assert Message.objects.unread_for(representative_user).count() == 1
+        assert Message.objects.unread_for(UserFactory()).count() == 0
+
+    def test_deleted_with_conversation(self, conversation):
+        """اختبار حذف صفوف المشاركة مع المحادثة"""
+        Conversation.objects.filter(pk=conversation.pk).delete()
+
+        assert not ConversationParticipant.objects.exists()
@@ -0,0 +1,52 @@
+"""
+اختبارات تقسيم جدول الرسائل شهرياً - منصة نائبك.كوم
+"""
+
+from datetime import date
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from messages import partitioning
+
+
+class TestPartitionLayout:
+    """اختبارات أسماء وحدود الأقسام الشهرية"""
+
+    def test_month_arithmetic(self):
+        """اختبار الانتقال بين الأشهر عبر نهاية السنة"""
+        assert partitioning.add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+        assert partitioning.add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+        assert partitioning.month_bounds(date(2026, 12, 15)) == (date(2026, 12, 1), date(2027, 1, 1))
+
+    def test_partition_names_sort_chronologically(self):
+        """اختبار أن ترتيب الأسماء يطابق الترتيب الزمني"""
+        names = [partitioning.partition_name(date(2026, month, 1)) for month in (2, 10, 11)]
+        assert names == sorted(names)
+        assert names[1] == 'naebak_messages_message_y2026m10'
+
+    def test_create_partition_sql(self):
+        """اختبار جملة إنشاء القسم"""
+        sql = partitioning.create_partition_sql(date(2026, 10, 19))
+        assert sql == (
+            'CREATE TABLE IF NOT EXISTS "naebak_messages_message_y2026m10" '
+            'PARTITION OF "naebak_messages_message" '
+            "FOR VALUES FROM ('2026-10-01') TO ('2026-11-01')"
+        )
+
+
+@pytest.mark.django_db
+class TestNonPostgresBackends:
+    """اختبارات السلوك على قواعد البيانات الأخرى"""
+
+    def test_operations_are_noops(self):
+        """اختبار أن العمليات لا تفعل شيئاً خارج PostgreSQL"""
+        assert partitioning.is_partitioned() is False
+        assert partitioning.ensure_partitions() == []
+        assert partitioning.detach_expired(retention_months=12) == []
+        assert partitioning.convert_to_partitioned() is False
+
+    def test_command_requires_postgres(self):
+        """اختبار رفض أمر الإدارة على قواعد البيانات الأخرى"""
+        with pytest.raises(CommandError):
+            call_command('manage_message_partitions', '--convert')
@@ -0,0 +1,138 @@
+"""
+اختبارات تجميع إيصالات القراءة - منصة نائبك.كوم
+"""
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from messages import receipts
+from messages.models import Message
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('fake_redis')
+class TestReadReceiptBuffer:
+    """اختبارات مخزن إيصالات القراءة"""
+
+    def test_mark_read_is_buffered(self, representative_client, conversation, citizen_user):
+        """اختبار قبول الإيصال فوراً دون تحديث قاعدة البيانات"""
+        message = Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة')
+
+        url = reverse('message-mark-read', kwargs={'pk': message.id})
+        response = representative_client.post(url)
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['is_read'] is True
+        message.refresh_from_db()
+        assert message.is_read is False
+
+    def test_reads_observe_buffered_state(self, representative_client, conversation, citizen_user):
+        """اختبار أن القراءة والعدادات تعكس الإيصالات المعلقة"""
+        first = Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة 1')
+        Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة 2')
+
+        representative_client.post(reverse('message-mark-read', kwargs={'pk': first.id}))
+
+        detail = representative_client.get(reverse('message-detail', kwargs={'pk': first.id}))
+        assert detail.data['is_read'] is True
+        assert detail.data['read_at'] is not None
+
+        count = representative_client.get(reverse('message-unread-count'))
+        assert count.data['unread_count'] == 1
+
+    def test_flush_applies_one_update_per_conversation(
+        self, representative_client, conversation, citizen_user, representative_user,
+        django_assert_num_queries
+    ):
+        """اختبار كتابة الإيصالات بجملة UPDATE واحدة لكل محادثة"""
+        messages = [
+            Message.objects.create(conversation=conversation, sender=citizen_user, content=f'رسالة {i}')
+            for i in range(5)
+        ]
+        for message in messages:
+            representative_client.post(reverse('message-mark-read', kwargs={'pk': message.id}))
+
+        with django_assert_num_queries(1):
+            stats = receipts.flush()
+
+        assert stats == {'conversations': 1, 'messages': 5}
+        assert Message.objects.filter(conversation=conversation, is_read=False).count() == 0
+        assert receipts.pending_for_reader(representative_user) == set()
+        # لا شيء متبقٍ للكتابة
+        assert receipts.flush() == {'conversations': 0, 'messages': 0}
+
+    def test_failed_flush_is_retried(self, conversation, citizen_user, representative_user, fake_redis, mocker):
+        """اختبار بقاء الإيصالات في قائمة الانتظار إذا فشلت الكتابة"""
+        message = Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة')
+        receipts.record(message, representative_user)
+        assert fake_redis.ttl(receipts._conversation_key(conversation.pk)) > 0
+
+        original = receipts._flush_conversation
+        mocker.patch.object(
+            receipts, '_flush_conversation', side_effect=RuntimeError('قاعدة البيانات مشغولة')
+        )
+        assert receipts.flush() == {'conversations': 0, 'messages': 0}
+        assert fake_redis.sismember(receipts.PENDING_KEY, str(conversation.pk))
+
+        receipts._flush_conversation.side_effect = original
+        assert receipts.flush() == {'conversations': 1, 'messages': 1}
+        message.refresh_from_db()
+        assert message.is_read is True
+
+    def test_pending_receipts_excluded_from_unread_counts(self, representative_client, conversation, citizen_user):
+        """اختبار استثناء الإيصالات المعلقة من عداد المحادثة وفلتر has_unread"""
+        message = Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة')
+
+        representative_client.post(reverse('message-mark-read', kwargs={'pk': message.id}))
+
+        detail = representative_client.get(reverse('conversation-detail', kwargs={'pk': conversation.pk}))
+        assert detail.data['unread_count'] == 0
+        unread = representative_client.get(reverse('conversation-list'), {'has_unread': True})
+        assert unread.data['count'] == 0
+
+    def test_repeated_receipt_keeps_first_read_time(self, conversation, citizen_user, representative_user):
+        """اختبار أن تكرار الإيصال لا يغير وقت القراءة الأول"""
+        message = Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة')
+
+        first_read_at = receipts.record(message, representative_user)
+        receipts.record(message, representative_user)
+        receipts.flush()
+
+        message.refresh_from_db()
+        assert message.is_read is True
+        assert abs((message.read_at - first_read_at).total_seconds()) < 0.001
+
+
+@pytest.fixture
+def redis_down(mocker):
+    """Redis معطل: كل أمر يرفع خطأ اتصال"""
+    import fakeredis
+    server = fakeredis.FakeServer()
+    server.connected = False
+    return mocker.patch('django_redis.get_redis_connection', return_value=fakeredis.FakeRedis(server=server))
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('redis_down')
+class TestRedisUnavailable:
+    """اختبارات العمل دون المخزن عند تعطل Redis"""
+
+    def test_mark_read_written_directly(self, representative_client, conversation, citizen_user):
+        """اختبار كتابة القراءة في قاعدة البيانات مباشرة"""
+        message = Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة')
+
+        response = representative_client.post(reverse('message-mark-read', kwargs={'pk': message.id}))
+
+        assert response.status_code == status.HTTP_200_OK
+        message.refresh_from_db()
+        assert message.is_read is True
+
+    def test_reads_and_counts_still_served(self, representative_client, conversation, citizen_user):
+        """اختبار عرض الرسائل والعدادات من قاعدة البيانات فقط"""
+        Message.objects.create(conversation=conversation, sender=citizen_user, content='رسالة')
+
+        assert representative_client.get(reverse('message-list')).status_code == status.HTTP_200_OK
+        assert representative_client.get(reverse('message-unread-count')).data['unread_count'] == 1
+        assert representative_client.get(reverse('conversation-list')).status_code == status.HTTP_200_OK
+        assert receipts.flush() == {'conversations': 0, 'messages': 0}
@@ -0,0 +1,117 @@
+"""
+اختبارات سياسة الاحتفاظ بالإشعارات - منصة نائبك.كوم
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from messages.models import NotificationDelivery, SystemNotification
+from messages.retention import policy_for, purge_notifications
+
+
+def notification(user, notification_type='system_update', age_days=0, read_days_ago=None):
+    """إنشاء إشعار بعمر محدد"""
+    instance = SystemNotification.objects.create(
+        user=user, notification_type=notification_type, title='إشعار', message='محتوى'
+    )
+    now = timezone.now()
+    SystemNotification.objects.filter(pk=instance.pk).update(
+        created_at=now - timedelta(days=age_days),
+        is_read=read_days_ago is not None,
+        read_at=now - timedelta(days=read_days_ago) if read_days_ago is not None else None
+    )
+    return instance
+
+
+@pytest.fixture
+def retention(settings):
+    settings.NOTIFICATION_RETENTION = {
+        'default': {'read': 30, 'unread': 90},
+        'new_message': {'read': 7},
+        'maintenance': {'unread': None},
+    }
+    return settings.NOTIFICATION_RETENTION
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('retention')
+class TestNotificationRetention:
+    """اختبارات حذف الإشعارات المنتهية"""
+
+    def test_policy_merges_default(self):
+        """اختبار دمج سياسة النوع مع السياسة الافتراضية"""
+        assert policy_for('new_message') == {'read': 7, 'unread': 90}
+        assert policy_for('maintenance') == {'read': 30, 'unread': None}
+
+    def test_purges_per_type_and_state(self, user):
+        """اختبار الحذف حسب النوع وحالة القراءة"""
+        keep = [
+            notification(user, age_days=100, read_days_ago=10),
+            notification(user, age_days=60),
+            notification(user, 'new_message', age_days=10, read_days_ago=3),
+            notification(user, 'maintenance', age_days=1000),
+        ]
+        notification(user, age_days=100, read_days_ago=40)
+        notification(user, age_days=120)
+        notification(user, 'new_message', age_days=10, read_days_ago=8)
+
+        stats = purge_notifications(pause=0)
+
+        assert stats['total'] == 3
+        assert stats['removed'] == {
+            'new_message:read': 1, 'system_update:read': 1, 'system_update:unread': 1
+        }
+        assert set(SystemNotification.objects.values_list('pk', flat=True)) == {n.pk for n in keep}
+
+    def test_deletes_in_batches(self, user, mocker):
+        """اختبار الحذف على دفعات مع التوقف بينها"""
+        for _ in range(5):
+            notification(user, age_days=200)
+        sleep = mocker.patch('messages.retention.time.sleep')
+
+        stats = purge_notifications(batch_size=2, pause=0.5)
+
+        assert stats['total'] == 5
+        assert stats['batches'] == 3
+        assert sleep.call_count == 2
+
+    def test_batches_follow_creation_order(self, user, django_assert_max_num_queries):
+        """اختبار التقدم بمؤشر (created_at, id) حتى مع تساوي أوقات الإنشاء"""
+        for _ in range(5):
+            notification(user, age_days=200)
+        SystemNotification.objects.update(created_at=timezone.now() - timedelta(days=200))
+
+        with django_assert_max_num_queries(50) as captured:
+            stats = purge_notifications(batch_size=2, pause=0)
+
+        assert stats['total'] == 5
+        assert not SystemNotification.objects.exists()
+        selects = [q['sql'] for q in captured.captured_queries
+                   if q['sql'].startswith('SELECT') and "'system_update'" in q['sql'] and 'NOT' in q['sql']]
+        assert len(selects) == 3
+        assert all('ORDER BY "naebak_messages_systemnotification"."created_at" ASC' in sql for sql in selects)
+        assert all('"naebak_messages_systemnotification"."id" > ' in sql for sql in selects[1:])
+
+    def test_cascades_to_deliveries(self, user):
+        """اختبار حذف عمليات الإرسال المرتبطة مع الإشعار"""
+        expired = notification(user, age_days=200)
+        NotificationDelivery.objects.create(user=user, notification=expired, channel='email', dedupe_key='email:x')
+
+        stats = purge_notifications(pause=0)
+
+        assert stats['total'] == 1
+        assert not NotificationDelivery.objects.exists()
+
+    def test_command_dry_run(self, user):
+        """اختبار أمر الإدارة في وضع العرض فقط"""
+        notification(user, age_days=200)
+        out = StringIO()
+
+        call_command('purge_notifications', '--dry-run', stdout=out)
+
+        assert 'system_update:unread: 1' in out.getvalue()
+        assert SystemNotification.objects.count() == 1
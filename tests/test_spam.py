@@ -0,0 +1,188 @@
+"""
+اختبارات اكتشاف الرسائل المزعجة شبه المتطابقة - منصة نائبك.كوم
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from conftest import ConversationFactory, UserFactory
+from messages import spam
+from messages.models import Message, SpamCluster
+
+CAMPAIGN = 'مبروك! ربحت جائزة مليون جنيه، اضغط على الرابط {} لاستلامها الآن'
+
+
+@pytest.fixture(autouse=True)
+def clean_local_index():
+    spam.local_index.clear()
+    yield
+    spam.local_index.clear()
+
+
+def post_campaign(count, template=CAMPAIGN):
+    """إرسال نص الحملة مع اختلافات بسيطة إلى محادثات مختلفة"""
+    messages = []
+    for i in range(count):
+        conversation = ConversationFactory()
+        messages.append(Message.objects.create(
+            conversation=conversation, sender=conversation.citizen, content=template.format(f'bit.ly/x{i}')
+        ))
+    return messages
+
+
+class TestFingerprints:
+    """اختبارات تطبيع النص وبصمات MinHash"""
+
+    def test_normalize_arabic_variants(self):
+        """اختبار توحيد التشكيل وصور الألف والتطويل"""
+        assert spam.normalize('أهـــلاً   بِكُم!!') == spam.normalize('اهلا بكم')
+
+    def test_near_duplicates_are_similar(self):
+        """اختبار تشابه النصوص شبه المتطابقة واختلاف غيرها"""
+        first = spam.signature_for(CAMPAIGN.format('bit.ly/a'))
+        second = spam.signature_for(CAMPAIGN.format('bit.ly/b') + '!!')
+        other = spam.signature_for('أرجو متابعة شكوى انقطاع المياه في شارع النيل منذ أسبوع')
+
+        assert spam.similarity(first, second) >= 0.8
+        assert spam.similarity(first, other) < 0.2
+
+    def test_short_texts_skipped(self):
+        """اختبار تجاهل النصوص القصيرة مثل "شكراً" """
+        assert spam.signature_for('شكراً جزيلاً') is None
+
+
+@pytest.mark.django_db
+class TestSpamScan:
+    """اختبارات فحص الرسائل الجديدة وتجميعها"""
+
+    def test_campaign_flagged_in_one_cluster(self):
+        """اختبار تجميع الحملة في مجموعة واحدة دون الرسائل العادية"""
+        campaign = post_campaign(6)
+        conversation = ConversationFactory()
+        normal = Message.objects.create(
+            conversation=conversation, sender=conversation.citizen,
+            content='أرجو متابعة شكوى انقطاع المياه في شارع النيل منذ أسبوع'
+        )
+
+        stats = spam.scan_new_messages()
+
+        assert stats == {'scanned': 7, 'flagged': 6, 'clusters': 1}
+        cluster = SpamCluster.objects.get()
+        assert set(cluster.messages.values_list('id', flat=True)) == {m.id for m in campaign}
+        assert (cluster.message_count, cluster.conversation_count, cluster.sender_count) == (6, 6, 6)
+        normal.refresh_from_db()
+        assert normal.spam_cluster is None
+
+    def test_small_groups_not_flagged(self, settings):
+        """اختبار عدم الإبلاغ قبل بلوغ الحد الأدنى من المرسلين"""
+        settings.SPAM_CLUSTER_MIN_SIZE = 5
+        post_campaign(4)
+
+        assert spam.scan_new_messages()['clusters'] == 0
+        assert not SpamCluster.objects.exists()
+
+    def test_single_sender_not_flagged(self, settings):
+        """اختبار عدم الإبلاغ عن مرسل واحد كرر رسالته في عدة محادثات"""
+        settings.SPAM_CLUSTER_MIN_SIZE = 5
+        citizen = UserFactory()
+        for i in range(6):
+            conversation = ConversationFactory(citizen=citizen)
+            Message.objects.create(conversation=conversation, sender=citizen, content=CAMPAIGN.format(i))
+
+        assert spam.scan_new_messages()['clusters'] == 0
+        assert not SpamCluster.objects.exists()
+
+    def test_matches_across_batches(self):
+        """اختبار اكتشاف التكرار عبر الدفعات من خلال الفهرس"""
+        post_campaign(6)
+
+        stats = spam.scan_new_messages(batch_size=2)
+
+        assert stats['flagged'] == 6
+        assert SpamCluster.objects.count() == 1
+
+    def test_later_copies_join_cluster(self):
+        """اختبار انضمام النسخ اللاحقة إلى المجموعة الموجودة"""
+        post_campaign(5)
+        spam.scan_new_messages()
+        cluster = SpamCluster.objects.get()
+
+        late = post_campaign(1)[0]
+        spam.scan_new_messages()
+
+        late.refresh_from_db()
+        assert late.spam_cluster == cluster
+        cluster.refresh_from_db()
+        assert cluster.message_count == 6
+
+    def test_candidates_capped_per_message(self, settings, mocker):
+        """اختبار أن عدد المقارنات لكل رسالة محدود مهما كبرت الحملة"""
+        settings.SPAM_MAX_CANDIDATES = 3
+        post_campaign(20)
+        compare = mocker.patch.object(spam, 'similarity', wraps=spam.similarity)
+
+        stats = spam.scan_new_messages(batch_size=7)
+
+        assert stats == {'scanned': 20, 'flagged': 20, 'clusters': 1}
+        assert compare.call_count <= 20 * 3
+
+    def test_index_candidates_most_recent_first(self, settings, mocker):
+        """اختبار أن مرشحي الفهرس هم الأحدث إضافة ومرتبون من الأحدث"""
+        clock = mocker.patch('messages.spam.time.time', return_value=1000.0)
+        signature = spam.signature_for(CAMPAIGN.format('bit.ly/x'))
+        for i in range(5):
+            clock.return_value = 1000.0 + i
+            spam.local_index.add({f'm{i}': signature})
+
+        found = spam.local_index.candidates({'new': signature}, 3)
+
+        assert found['new'] == ['m4', 'm3', 'm2']
+
+    def test_late_committed_message_scanned(self, locmem_cache):
+        """اختبار فحص رسالة حُفظت معاملتها بعد أن تجاوزها المؤشر"""
+        campaign = post_campaign(5)
+        spam.scan_new_messages()
+        cluster = SpamCluster.objects.get()
+
+        late = post_campaign(1)[0]
+        Message.objects.filter(pk=late.pk).update(created_at=campaign[-1].created_at - timedelta(seconds=30))
+        stats = spam.scan_new_messages()
+
+        assert stats['scanned'] == 1
+        late.refresh_from_db()
+        assert late.spam_cluster == cluster
+
+    def test_overlapping_runs_skipped(self, locmem_cache):
+        """اختبار تخطي الفحص إذا كان فحص آخر ما زال يعمل"""
+        post_campaign(6)
+        locmem_cache.add(spam.LOCK_KEY, 1)
+
+        assert spam.scan_new_messages() == {'scanned': 0, 'flagged': 0, 'clusters': 0}
+        assert not SpamCluster.objects.exists()
+
+        locmem_cache.delete(spam.LOCK_KEY)
+        assert spam.scan_new_messages()['clusters'] == 1
+
+    def test_representative_bulk_replies_ignored(self, representative_user):
+        """اختبار تجاهل ردود النواب الجماعية"""
+        for i in range(6):
+            conversation = ConversationFactory(representative=representative_user)
+            Message.objects.create(
+                conversation=conversation, sender=representative_user, content=CAMPAIGN.format(i)
+            )
+
+        assert spam.scan_new_messages()['scanned'] == 0
+
+    def test_redis_index(self, fake_redis, locmem_cache):
+        """اختبار الفهرس في Redis واستئناف الفحص من المؤشر"""
+        post_campaign(3)
+        assert spam.scan_new_messages()['clusters'] == 0
+        assert fake_redis.keys('spam:lsh:*')
+        assert not spam.local_index.entries
+
+        post_campaign(3)
+        stats = spam.scan_new_messages()
+
+        assert stats['scanned'] == 3
+        assert stats['flagged'] == 6
@@ -0,0 +1,136 @@
+"""
+اختبارات تحديد معدل الطلبات وحصة المحادثات - منصة نائبك.كوم
+"""
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from conftest import ConversationFactory, UserFactory, UserProfileFactory
+from messages import throttling
+
+
+class TestTokenBucket:
+    """اختبارات دلو الرموز في Redis"""
+
+    def test_parse_rate(self):
+        """اختبار تحويل المعدل إلى سعة ومعدل تعبئة"""
+        assert throttling.parse_rate('120/min') == (120, 2.0)
+        assert throttling.parse_rate('5/hour') == (5, 5 / 3600)
+        assert throttling.parse_rate(None) is None
+
+    def test_burst_then_refill(self, fake_redis, mocker):
+        """اختبار السماح بالدفعة ثم الرفض حتى تعاد التعبئة"""
+        clock = mocker.patch('messages.throttling.time.time', return_value=1000.0)
+
+        results = [throttling.take_token('message_send:1', 3, 1.0) for _ in range(4)]
+        assert [allowed for allowed, _ in results] == [True, True, True, False]
+        assert results[-1][1] == pytest.approx(1.0)
+
+        clock.return_value = 1001.5
+        assert throttling.take_token('message_send:1', 3, 1.0)[0] is True
+
+    def test_buckets_are_per_key(self, fake_redis):
+        """اختبار استقلال الدلاء لكل مستخدم وإجراء"""
+        assert throttling.take_token('message_send:1', 1, 0.01)[0] is True
+        assert throttling.take_token('message_send:1', 1, 0.01)[0] is False
+        assert throttling.take_token('message_send:2', 1, 0.01)[0] is True
+        assert throttling.take_token('report_create:1', 1, 0.01)[0] is True
+
+    def test_allows_without_redis(self):
+        """اختبار السماح بالطلبات عند عدم توفر Redis"""
+        assert throttling.take_token('message_send:1', 1, 0.01) == (True, 0.0)
+        assert throttling.take_token('message_send:1', 1, 0.01) == (True, 0.0)
+
+
+@pytest.mark.django_db
+class TestThrottledEndpoints:
+    """اختبارات تطبيق الحدود على نقاط الإنشاء"""
+
+    def test_message_send_throttled(self, settings, fake_redis, authenticated_client, conversation):
+        """اختبار رفض الرسائل بعد استنفاد الرصيد"""
+        settings.MESSAGING_THROTTLE_RATES = {'message_send': {'citizen': '2/min'}}
+        url = reverse('message-list')
+
+        codes = [
+            authenticated_client.post(url, {'conversation': conversation.id, 'content': f'رسالة {i}'}).status_code
+            for i in range(3)
+        ]
+
+        assert codes == [status.HTTP_201_CREATED, status.HTTP_201_CREATED, status.HTTP_429_TOO_MANY_REQUESTS]
+
+    def test_limits_per_user_type(self, settings, fake_redis, representative_client, conversation):
+        """اختبار أن لكل نوع مستخدم حده الخاص"""
+        settings.MESSAGING_THROTTLE_RATES = {'message_send': {'citizen': '1/min', 'representative': '5/min'}}
+        url = reverse('message-list')
+
+        for i in range(3):
+            response = representative_client.post(url, {'conversation': conversation.id, 'content': f'رد {i}'})
+            assert response.status_code == status.HTTP_201_CREATED
+
+    def test_retry_after_header(self, settings, fake_redis, authenticated_client, conversation):
+        """اختبار إرجاع وقت الانتظار في الرد المرفوض"""
+        settings.MESSAGING_THROTTLE_RATES = {'message_send': {'citizen': '1/min'}}
+        url = reverse('message-list')
+        authenticated_client.post(url, {'conversation': conversation.id, 'content': 'أولى'})
+
+        response = authenticated_client.post(url, {'conversation': conversation.id, 'content': 'ثانية'})
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert 0 < int(response['Retry-After']) <= 60
+
+    def test_reads_not_throttled(self, settings, fake_redis, authenticated_client, message):
+        """اختبار أن القراءة لا تستهلك الرصيد"""
+        settings.MESSAGING_THROTTLE_RATES = {'message_send': {'citizen': '1/min'}}
+
+        for _ in range(3):
+            assert authenticated_client.get(reverse('message-list')).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('locmem_cache')
+class TestConversationQuota:
+    """اختبارات حصة المحادثات المفتوحة"""
+
+    def create(self, client, representative):
+        return client.post(reverse('conversation-list'), {
+            'representative_id': representative.id,
+            'subject': 'استفسار',
+            'first_message': 'مرحباً',
+        })
+
+    def test_quota_enforced(self, settings, authenticated_client, representative_user):
+        """اختبار رفض المحادثة بعد بلوغ الحد"""
+        settings.MAX_CONVERSATIONS_PER_USER = 2
+
+        codes = [self.create(authenticated_client, representative_user).status_code for _ in range(3)]
+
+        assert codes == [status.HTTP_201_CREATED, status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST]
+
+    def test_closing_frees_quota(self, settings, authenticated_client, citizen_user, representative_user):
+        """اختبار أن إغلاق محادثة يسمح بفتح أخرى"""
+        settings.MAX_CONVERSATIONS_PER_USER = 1
+        conversation = ConversationFactory(citizen=citizen_user, representative=representative_user)
+        assert self.create(authenticated_client, representative_user).status_code == status.HTTP_400_BAD_REQUEST
+
+        authenticated_client.post(reverse('conversation-close', args=[conversation.id]))
+
+        assert self.create(authenticated_client, representative_user).status_code == status.HTTP_201_CREATED
+
+    def test_counter_read_from_cache(self, citizen_user, django_assert_num_queries):
+        """اختبار قراءة العداد من الذاكرة المؤقتة بعد أول حساب"""
+        ConversationFactory(citizen=citizen_user)
+        assert throttling.open_conversation_count(citizen_user) == 1
+
+        ConversationFactory(citizen=citizen_user)
+        with django_assert_num_queries(0):
+            assert throttling.open_conversation_count(citizen_user) == 2
+
+    def test_other_users_unaffected(self, settings, representative_user):
+        """اختبار أن الحصة لكل مواطن على حدة"""
+        settings.MAX_CONVERSATIONS_PER_USER = 1
+        busy, idle = UserProfileFactory().user, UserFactory()
+        ConversationFactory(citizen=busy)
+
+        assert throttling.conversation_quota_exceeded(busy)
+        assert not throttling.conversation_quota_exceeded(idle)